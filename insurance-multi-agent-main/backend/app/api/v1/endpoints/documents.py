@@ -5,18 +5,20 @@ with the policy vector search system for indexing uploaded documents.
 """
 from __future__ import annotations
 
-import json
 import logging
-import shutil
 import uuid
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import Any, Callable, Dict, Iterable, List, Literal, Optional
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, status, Query
+from fastapi import APIRouter, HTTPException, Request, status, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse, FileResponse
 from pydantic import BaseModel
 
+from app.services.document_store import MAX_PAGE_SIZE, get_document_store
+from app.services.ingest_queue import get_ingest_queue
+from app.services.uploads import ReceivedUpload, openapi_upload_body, receive_uploads
 from app.workflow.policy_search import get_policy_search
 from app.workflow.pdf_processor import get_pdf_processor
 
@@ -26,7 +28,6 @@ router = APIRouter(tags=["documents"])
 # Document storage paths
 WORKFLOW_DATA_DIR = Path(__file__).resolve().parents[3] / "workflow" / "data"
 UPLOADED_DOCS_DIR = WORKFLOW_DATA_DIR / "uploaded_docs"
-METADATA_FILE = WORKFLOW_DATA_DIR / "document_metadata.json"
 
 # Ensure directories exist
 UPLOADED_DOCS_DIR.mkdir(parents=True, exist_ok=True)
@@ -34,6 +35,14 @@ UPLOADED_DOCS_DIR.mkdir(parents=True, exist_ok=True)
 (UPLOADED_DOCS_DIR / "regulations").mkdir(exist_ok=True)
 (UPLOADED_DOCS_DIR / "reference").mkdir(exist_ok=True)
 
+# Accepted upload formats, by declared content type or file extension
+ALLOWED_CONTENT_TYPES = {
+    'text/plain', 'text/markdown', 'application/pdf',
+    'application/msword',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+}
+ALLOWED_EXTENSIONS = {'.txt', '.md', '.pdf', '.doc', '.docx'}
+
 # Pydantic models
 class DocumentMetadata(BaseModel):
     id: str
@@ -45,6 +54,10 @@ class DocumentMetadata(BaseModel):
     upload_date: datetime
     indexed: bool = False
     metadata: Dict[str, Any] = {}
+    blob: Optional[str] = None  # content-addressed file, shared by identical uploads
+    # Background ingest: queued -> extracting -> embedding -> indexed | failed;
+    # None if the document was never queued
+    ingest_status: Optional[Literal["queued", "extracting", "embedding", "indexed", "failed", "cancelled"]] = None
 
 class DocumentUploadResponse(BaseModel):
     success: bool
@@ -53,7 +66,8 @@ class DocumentUploadResponse(BaseModel):
 
 class DocumentListResponse(BaseModel):
     documents: List[DocumentMetadata]
-    total: int
+    total: int  # documents matching the filters, across all pages
+    next_cursor: Optional[str] = None  # pass as ``cursor`` for the next page; None on the last
 
 class StatusResponse(BaseModel):
     success: bool
@@ -64,23 +78,12 @@ class DocumentResponse(BaseModel):
     content: Optional[str] = None
 
 # Helper functions
-def load_document_metadata() -> Dict[str, DocumentMetadata]:
-    """Load document metadata from JSON file."""
-    if not METADATA_FILE.exists():
-        return {}
-    
-    try:
-        with open(METADATA_FILE, 'r') as f:
-            data = json.load(f)
-        return {doc_id: DocumentMetadata(**doc_data) for doc_id, doc_data in data.items()}
-    except Exception:
-        return {}
-
-def save_document_metadata(metadata_dict: Dict[str, DocumentMetadata]):
-    """Save document metadata to JSON file."""
-    data = {doc_id: doc.model_dump() for doc_id, doc in metadata_dict.items()}
-    with open(METADATA_FILE, 'w') as f:
-        json.dump(data, f, indent=2, default=str)
+def get_document_metadata(document_id: str) -> DocumentMetadata:
+    """Metadata of one uploaded document; 404 if there is none."""
+    doc = get_document_store().get(document_id)
+    if doc is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+    return DocumentMetadata(**doc)
 
 def get_category_dir(category: str) -> Path:
     """Get the directory path for a document category."""
@@ -91,180 +94,297 @@ def get_category_dir(category: str) -> Path:
     }
     return category_dirs.get(category, UPLOADED_DOCS_DIR / "policies")
 
+def get_document_path(doc: DocumentMetadata) -> Path:
+    """Where a document's file is stored: its blob, or for documents uploaded
+    before content addressing, its category directory."""
+    if doc.blob:
+        return get_document_store().blob_path(doc.blob)
+    return get_category_dir(doc.category) / doc.filename
+
+def get_index_metadata(category: str, original_filename: str) -> Dict[str, Any]:
+    """Chunk metadata for an uploaded document, used by filtered policy search.
+
+    Stored files are named by document id, so the policy type is derived from
+    the original filename instead.
+    """
+    return {
+        "category": category,
+        "policy_type": Path(original_filename).stem.replace("_", " ").replace("-", " ").title(),
+        "original_filename": original_filename,
+    }
+
+def record_ingest_result(metadata: Dict[str, Any], file_path: Path, indexed: bool) -> None:
+    """Clear or set a document's ``ingest_error`` after an indexing attempt.
+
+    The error carries the ``reason`` a PDF was rejected by the extraction
+    sandbox (e.g. ``invalid``, ``timeout``, ``too_many_pages``) – the same
+    one validating it on upload reports – its ``detail`` and when.
+    """
+    if indexed:
+        metadata.pop("ingest_error", None)
+        return
+    failure = None
+    if not file_path.is_file():
+        failure = {"reason": "missing", "detail": "Document file not found"}
+    elif file_path.suffix.lower() == '.pdf':
+        # Answered from the processor's memo when indexing already rejected it
+        failure = get_pdf_processor().validate(file_path)
+    metadata["ingest_error"] = {
+        **(failure or {"reason": "not_indexed", "detail": "No content could be indexed"}),
+        "at": datetime.now().isoformat(),
+    }
+
+def add_to_index(policy_search, doc: DocumentMetadata) -> bool:
+    """Index an uploaded document under its id.
+
+    A document whose blob another indexed document shares reuses that
+    document's chunks and vectors rather than being extracted and embedded
+    again.
+    """
+    metadata = get_index_metadata(doc.category, doc.original_filename)
+    if doc.blob:
+        copy = get_document_store().find_indexed_copy(doc.blob, doc.id)
+        if copy is not None and policy_search.add_duplicate_to_index(doc.id, copy["id"], metadata):
+            return True
+    return policy_search.add_document_to_index(get_document_path(doc), document_id=doc.id,
+                                               metadata=metadata)
+
+def record_indexing(doc: DocumentMetadata, indexed: bool) -> None:
+    """Record the outcome of indexing a document on it and in the store.
+
+    A document deleted (or being deleted) meanwhile is taken out of the
+    index again: its chunks were committed after the deletion removed them.
+    """
+    record_ingest_result(doc.metadata, get_document_path(doc), indexed)
+    if indexed:
+        doc.indexed = True
+    doc.ingest_status = "indexed" if indexed else "failed"
+    # A failed re-index leaves the previous chunks, so the flag stays as it was
+    recorded = get_document_store().update(doc.id, indexed=True if indexed else None,
+                                           metadata=doc.metadata, ingest_status=doc.ingest_status)
+    if indexed and not recorded:
+        get_policy_search().delete_document_from_index(doc.id)
+        logger.info(f"Removed document {doc.id} from index again: it was deleted during its ingest")
+
+def _index_uploaded(policy_search, doc: DocumentMetadata) -> bool:
+    """Add an uploaded document to the index and record the outcome on it."""
+    indexed = add_to_index(policy_search, doc)
+    record_indexing(doc, indexed)
+    return indexed
+
+def index_documents(docs: List[DocumentMetadata], *,
+                    on_embedding: Optional[Callable[[List[str]], None]] = None,
+                    keep: Optional[Callable[[List[str]], Iterable[str]]] = None) -> Dict[str, bool]:
+    """Index a batch of uploaded documents, recording each one's outcome.
+
+    New files are extracted, embedded in one pass and committed to the index
+    together; copies of a file that is indexed – or in this batch – reuse
+    its index entries afterwards. ``on_embedding`` and ``keep`` are passed
+    to `PolicyVectorSearch.add_documents_to_index`.
+
+    Returns:
+        Whether each document (by id) was indexed
+    """
+    store = get_document_store()
+    policy_search = get_policy_search()
+    batch: List[DocumentMetadata] = []
+    copies: List[DocumentMetadata] = []
+    blobs = set()
+    indexed: Dict[str, bool] = {}
+    for doc in docs:
+        if doc.blob and (doc.blob in blobs or store.find_indexed_copy(doc.blob, doc.id)):
+            copies.append(doc)
+            continue
+        blobs.add(doc.blob)
+        batch.append(doc)
+    if batch:
+        results = policy_search.add_documents_to_index(
+            [(get_document_path(doc), doc.id, get_index_metadata(doc.category, doc.original_filename))
+             for doc in batch],
+            on_embedding=on_embedding, keep=keep)
+        for doc in batch:
+            indexed[doc.id] = results[doc.id]
+            record_indexing(doc, indexed[doc.id])
+    for doc in copies:
+        indexed[doc.id] = add_to_index(policy_search, doc)
+        record_indexing(doc, indexed[doc.id])
+    logger.info("Indexed %s documents (%s copies of indexed files)", len(docs), len(copies))
+    return indexed
+
+def ingest_documents(docs: List[Dict[str, Any]]) -> None:
+    """Index a batch of queued documents (run by the ingest queue workers).
+
+    Documents deleted while they are being ingested are not committed.
+    """
+    store = get_document_store()
+    index_documents([DocumentMetadata(**data) for data in docs],
+                    on_embedding=lambda ids: store.set_ingest_status(ids, "embedding"),
+                    keep=store.ingesting)
+
+def _check_upload_format(filename: str, content_type: Optional[str]) -> None:
+    """Refuse a file before it is received unless its declared type or
+    extension is a supported document format."""
+    if content_type not in ALLOWED_CONTENT_TYPES and Path(filename).suffix.lower() not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File \"{filename}\" has an unsupported format. Supported formats: PDF, Markdown, Text, Word documents."
+        )
+
+def _discard_uploads(uploads: List[ReceivedUpload]) -> None:
+    for upload in uploads:
+        upload.path.unlink(missing_ok=True)
+
 # API endpoints
-@router.post("/documents/upload", response_model=DocumentUploadResponse)
+@router.post("/documents/upload", response_model=DocumentUploadResponse,
+             openapi_extra=openapi_upload_body())
 async def upload_documents_for_indexing(
-    files: List[UploadFile] = File(...),
+    request: Request,
     category: str = Query("policy", description="Document category: policy, regulation, or reference"),
     auto_index: bool = Query(True, description="Automatically add to search index")
 ) -> DocumentUploadResponse:
     """Upload documents for persistent storage and optional indexing.
     
-    Documents are stored in categorized directories and can be automatically
-    added to the search index for policy queries.
+    Documents can be automatically added to the search index for policy
+    queries: they are queued for the background ingest workers and the
+    response returns once the files are stored (follow ``ingest_status``).
+    The multipart ``files`` are streamed to disk, hashed on the way, within
+    the configured upload size limits (413 beyond them), and stored by
+    content: a file that is already stored is not stored, validated or
+    embedded again – the new document shares it and its index entries.
     """
-    if not files:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No files uploaded")
-    
     if category not in ["policy", "regulation", "reference"]:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid category")
     
-    # Load existing metadata
-    metadata_dict = load_document_metadata()
-    uploaded_docs = []
+    store = get_document_store()
     
-    category_dir = get_category_dir(category)
+    uploads = await receive_uploads(
+        request, lambda filename: store.incoming_path(Path(filename).suffix),
+        check=_check_upload_format)
+    if not uploads:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No files uploaded")
     
-    for upload in files:
-        try:
-            # Validate file
-            if not upload.filename:
-                continue
-                
-            # Check file type (allow common document formats)
-            allowed_types = {
-                'text/plain', 'text/markdown', 'application/pdf',
-                'application/msword', 
-                'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-            }
-            
-            # Also check by file extension for better PDF support
-            file_extension = Path(upload.filename).suffix.lower()
-            allowed_extensions = {'.txt', '.md', '.pdf', '.doc', '.docx'}
-            
-            if upload.content_type not in allowed_types and file_extension not in allowed_extensions:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"File \"{upload.filename}\" has an unsupported format. Supported formats: PDF, Markdown, Text, Word documents."
-                )
-            
-            # Special validation for PDF files
-            if file_extension == '.pdf' or upload.content_type == 'application/pdf':
-                # We'll validate the PDF after saving it temporarily
-                pass
-            
-            # Generate unique ID and filename
-            doc_id = str(uuid.uuid4())
-            file_extension = Path(upload.filename).suffix
-            stored_filename = f"{doc_id}{file_extension}"
-            file_path = category_dir / stored_filename
-            
-            # Save file
-            with open(file_path, 'wb') as f:
-                shutil.copyfileobj(upload.file, f)
-            
-            # Validate PDF files after saving
-            if file_extension == '.pdf' or upload.content_type == 'application/pdf':
+    uploaded_docs = []
+    try:
+        for upload in uploads:
+            blob = store.blob_name(upload.sha256, upload.path.suffix)
+            # Validate new PDF files after saving, in a sandbox worker so a
+            # hostile file cannot stall the API, unless they are queued for
+            # indexing: the ingest workers extract them anyway and record a
+            # rejected file as failed. A stored blob was checked before.
+            if ((upload.path.suffix == '.pdf' or upload.content_type == 'application/pdf')
+                    and not auto_index and not store.blob_refs(blob)):
                 pdf_processor = get_pdf_processor()
-                if not pdf_processor.is_valid_pdf(file_path):
-                    # Clean up invalid file
-                    file_path.unlink()
+                failure = await run_in_threadpool(pdf_processor.validate, upload.path)
+                if failure is not None:
                     raise HTTPException(
                         status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"File \"{upload.filename}\" is not a valid PDF or cannot be processed."
+                        detail=f"File \"{upload.filename}\" is not a valid PDF or cannot be processed "
+                               f"({failure['reason']}: {failure['detail']})."
                     )
             
-            # Create metadata
-            doc_metadata = DocumentMetadata(
-                id=doc_id,
-                filename=stored_filename,
+            uploaded_docs.append(DocumentMetadata(
+                id=str(uuid.uuid4()),
+                filename=Path(blob).name,
                 original_filename=upload.filename,
                 category=category,
-                size=file_path.stat().st_size,
-                content_type=upload.content_type or "application/octet-stream",
+                size=upload.size,
+                content_type=upload.content_type,
                 upload_date=datetime.now(),
-                indexed=False
-            )
-            
-            metadata_dict[doc_id] = doc_metadata
-            uploaded_docs.append(doc_metadata)
-            
-        except Exception as e:
-            # Clean up on error
-            if 'file_path' in locals() and file_path.exists():
-                file_path.unlink()
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to upload {upload.filename}: {str(e)}"
-            )
-        finally:
-            await upload.close()
-    
-    # Save metadata
-    save_document_metadata(metadata_dict)
+                indexed=False,
+                metadata={"sha256": upload.sha256},
+                blob=blob,
+                ingest_status="queued" if auto_index else None,
+            ))
+        
+        # Moves the files into place and commits them: blocking I/O
+        reused = await run_in_threadpool(
+            store.add, [(doc.model_dump(), upload.path) for doc, upload in zip(uploaded_docs, uploads)])
+        
+    except Exception as e:
+        # Nothing of a rejected request is kept
+        await run_in_threadpool(_discard_uploads, uploads)
+        if isinstance(e, HTTPException):
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to store the uploaded documents: {str(e)}"
+        )
     
-    # Auto-index if requested
-    if auto_index and uploaded_docs:
-        try:
-            policy_search = get_policy_search()
-            indexed_count = 0
-            
-            for doc in uploaded_docs:
-                file_path = get_category_dir(doc.category) / doc.filename
-                if policy_search.add_document_to_index(file_path):
-                    # Update metadata to mark as indexed
-                    metadata_dict[doc.id].indexed = True
-                    indexed_count += 1
-            
-            if indexed_count > 0:
-                # Save updated metadata
-                save_document_metadata(metadata_dict)
-                logger.info(f"Successfully indexed {indexed_count} out of {len(uploaded_docs)} documents")
-            
-        except Exception as e:
-            logger.error(f"Failed to auto-index documents: {e}")
-            # Don't fail upload if indexing fails, but log the error
+    # Auto-index if requested: the documents are already queued
+    if auto_index:
+        get_ingest_queue().notify()
     
+    duplicates = sum(reused)
     return DocumentUploadResponse(
         success=True,
         documents=uploaded_docs,
         message=f"Successfully uploaded {len(uploaded_docs)} document(s)"
+                + (f" ({duplicates} already stored)" if duplicates else "")
+                + (", queued for indexing" if auto_index else "")
     )
 
 @router.get("/documents", response_model=DocumentListResponse)
 async def list_documents(
     category: Optional[str] = Query(None, description="Filter by category"),
-    indexed_only: bool = Query(False, description="Show only indexed documents")
+    indexed_only: bool = Query(False, description="Show only indexed documents"),
+    indexed: Optional[bool] = Query(None, description="Filter by indexed state (overrides indexed_only)"),
+    q: Optional[str] = Query(None, description="Original filename prefix (case-insensitive)"),
+    sort: Literal["upload_date", "original_filename", "size"] = Query("upload_date"),
+    order: Literal["asc", "desc"] = Query("desc"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page")
 ) -> DocumentListResponse:
-    """List all uploaded documents with optional filtering."""
-    metadata_dict = load_document_metadata()
-    documents = list(metadata_dict.values())
-    
-    # Apply filters
-    if category:
-        documents = [doc for doc in documents if doc.category == category]
+    """List uploaded documents a page at a time, filtered and sorted in the store.
     
-    if indexed_only:
-        documents = [doc for doc in documents if doc.indexed]
-    
-    # Sort by upload date (newest first)
-    documents.sort(key=lambda x: x.upload_date, reverse=True)
+    Pages are keyed by cursor rather than offset, so every page costs the
+    same however far into the library it is.
+    """
+    store = get_document_store()
+    if indexed is None and indexed_only:
+        indexed = True
+    filters = {"category": category or None, "indexed": indexed, "prefix": q or None}
+    try:
+        total = store.count(**filters)
+        documents, next_cursor = store.page(**filters, sort=sort, descending=order == "desc",
+                                            limit=limit, cursor=cursor, total=total)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
     return DocumentListResponse(
-        documents=documents,
-        total=len(documents)
+        documents=[DocumentMetadata(**doc) for doc in documents],
+        total=total,
+        next_cursor=next_cursor
     )
 
 @router.delete("/documents/{document_id}", response_model=StatusResponse)
 async def delete_document(document_id: str) -> StatusResponse:
     """Delete a document and its metadata."""
-    metadata_dict = load_document_metadata()
-    
-    if document_id not in metadata_dict:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+    doc_metadata = get_document_metadata(document_id)
+    store = get_document_store()
     
-    doc_metadata = metadata_dict[document_id]
+    # Withdraw it from the ingest queue, so a worker indexing it now does not
+    # add its vectors back after they are removed
+    store.cancel_ingest(document_id)
     
-    # Delete file
-    category_dir = get_category_dir(doc_metadata.category)
-    file_path = category_dir / doc_metadata.filename
+    # Remove its vectors first so a deleted document is never searchable
+    try:
+        removed = await run_in_threadpool(get_policy_search().delete_document_from_index, document_id)
+        if removed:
+            logger.info(f"Removed {removed} indexed chunks for document {document_id}")
+    except Exception as e:
+        logger.error(f"Failed to remove document {document_id} from index: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to remove document from search index: {str(e)}"
+        )
     
-    if file_path.exists():
-        file_path.unlink()
+    # Remove from metadata; a shared blob file goes with its last document
+    store.delete(document_id)
     
-    # Remove from metadata
-    del metadata_dict[document_id]
-    save_document_metadata(metadata_dict)
+    if not doc_metadata.blob:
+        file_path = get_document_path(doc_metadata)
+        if file_path.exists():
+            file_path.unlink()
     
     return StatusResponse(
         success=True,
@@ -274,17 +394,11 @@ async def delete_document(document_id: str) -> StatusResponse:
 @router.get("/documents/{document_id}", response_model=DocumentResponse)
 async def get_document(document_id: str, include_content: bool = Query(False)) -> DocumentResponse:
     """Get document metadata and optionally its content."""
-    metadata_dict = load_document_metadata()
-    
-    if document_id not in metadata_dict:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
-    
-    doc_metadata = metadata_dict[document_id]
+    doc_metadata = get_document_metadata(document_id)
     content = None
     
     if include_content:
-        category_dir = get_category_dir(doc_metadata.category)
-        file_path = category_dir / doc_metadata.filename
+        file_path = get_document_path(doc_metadata)
         
         if file_path.exists() and doc_metadata.content_type.startswith('text/'):
             try:
@@ -301,14 +415,8 @@ async def get_document(document_id: str, include_content: bool = Query(False)) -
 @router.get("/documents/{document_id}/download")
 async def download_document(document_id: str):
     """Download a document file."""
-    metadata_dict = load_document_metadata()
-    
-    if document_id not in metadata_dict:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
-    
-    doc_metadata = metadata_dict[document_id]
-    category_dir = get_category_dir(doc_metadata.category)
-    file_path = category_dir / doc_metadata.filename
+    doc_metadata = get_document_metadata(document_id)
+    file_path = get_document_path(doc_metadata)
     
     if not file_path.exists():
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
@@ -321,14 +429,12 @@ async def download_document(document_id: str):
 
 @router.post("/documents/{document_id}/index", response_model=StatusResponse)
 async def index_document(document_id: str) -> StatusResponse:
-    """Manually add a specific document to the search index."""
-    metadata_dict = load_document_metadata()
-    
-    if document_id not in metadata_dict:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
-    
-    doc_metadata = metadata_dict[document_id]
-    file_path = get_category_dir(doc_metadata.category) / doc_metadata.filename
+    """Manually add a specific document to the search index.
+
+    Re-indexing an already indexed document replaces its previous chunks.
+    """
+    doc_metadata = get_document_metadata(document_id)
+    file_path = get_document_path(doc_metadata)
     
     if not file_path.exists():
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document file not found")
@@ -336,19 +442,17 @@ async def index_document(document_id: str) -> StatusResponse:
     try:
         policy_search = get_policy_search()
         
-        if policy_search.add_document_to_index(file_path):
-            # Update metadata to mark as indexed
-            metadata_dict[document_id].indexed = True
-            save_document_metadata(metadata_dict)
-            
+        if await run_in_threadpool(_index_uploaded, policy_search, doc_metadata):
             return StatusResponse(
                 success=True,
                 message=f"Document '{doc_metadata.original_filename}' successfully added to search index"
             )
         else:
+            error = doc_metadata.metadata["ingest_error"]
             return StatusResponse(
                 success=False,
-                message=f"Failed to add document '{doc_metadata.original_filename}' to search index"
+                message=f"Failed to add document '{doc_metadata.original_filename}' to search index "
+                        f"({error['reason']}: {error['detail']})"
             )
             
     except Exception as e:
@@ -7,37 +7,37 @@ paths can then be forwarded to other endpoints (e.g., claim assessment) as
 """
 from __future__ import annotations
 
+import os
 import tempfile
-import shutil
 from pathlib import Path
 from typing import List
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, status
 from fastapi.responses import JSONResponse
 
+from app.services.uploads import openapi_upload_body, receive_uploads
+
 router = APIRouter(tags=["files"])
 
 
-@router.post("/files/upload", response_class=JSONResponse)
-async def upload_files(files: List[UploadFile] = File(...)) -> dict[str, List[str]]:
+def _temporary_path(filename: str) -> Path:
+    """A new, empty file in the temporary directory, keeping the extension."""
+    fd, name = tempfile.mkstemp(suffix=Path(filename).suffix)
+    os.close(fd)
+    return Path(name)
+
+
+@router.post("/files/upload", response_class=JSONResponse, openapi_extra=openapi_upload_body())
+async def upload_files(request: Request) -> dict[str, List[str]]:
     """Upload one or more files and return their temporary filesystem paths.
 
-    The files are stored in the host's temporary directory. It is the
+    The files are stored in the host's temporary directory, streamed to disk
+    within the configured upload size limits (413 beyond them). It is the
     caller's responsibility to manage lifecycle (e.g., cleanup) of these files
     after they are consumed.
     """
-    if not files:
+    uploads = await receive_uploads(request, _temporary_path)
+    if not uploads:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No files uploaded")
 
-    stored_paths: list[str] = []
-    for upload in files:
-        # Create a secure temporary file; use suffix from original filename to keep extension
-        suffix = Path(upload.filename).suffix if upload.filename else ""
-        try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-                shutil.copyfileobj(upload.file, tmp)
-                stored_paths.append(tmp.name)
-        finally:
-            await upload.close()
-
-    return {"paths": stored_paths}
+    return {"paths": [str(upload.path) for upload in uploads]}
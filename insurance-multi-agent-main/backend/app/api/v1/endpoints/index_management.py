@@ -12,19 +12,33 @@ from pathlib import Path
 from typing import List, Dict, Any, Optional
 
 from fastapi import APIRouter, HTTPException, status, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
+from app.services.document_store import INGEST_ACTIVE, get_document_store
+from app.workflow.index_snapshot import SNAPSHOT_FILES
 from app.workflow.policy_search import get_policy_search, PolicyVectorSearch
+from app.api.v1.endpoints.documents import DocumentMetadata, index_documents
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["index"])
 
 # Paths
 WORKFLOW_DATA_DIR = Path(__file__).resolve().parents[3] / "workflow" / "data"
-METADATA_FILE = WORKFLOW_DATA_DIR / "document_metadata.json"
 INDEX_STATUS_FILE = WORKFLOW_DATA_DIR / "index_status.json"
 
 # Pydantic models
+class IndexBuildProgress(BaseModel):
+    stage: str = "idle"  # idle, embedding, saving, done, error
+    chunks_done: int = 0
+    chunks_total: int = 0
+    batches_done: int = 0
+    batches_total: int = 0
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    eta_seconds: Optional[float] = None
+    error: Optional[str] = None
+
 class IndexStatus(BaseModel):
     is_built: bool
     last_rebuild: Optional[datetime] = None
@@ -33,7 +47,11 @@ class IndexStatus(BaseModel):
     uploaded_docs_count: int = 0
     indexed_uploaded_count: int = 0
     index_size_mb: Optional[float] = None
+    index_type: Optional[str] = None  # flat, hnsw, ivf_flat, ivf_pq
+    index_compression: Optional[str] = None  # none, sq8, pq
+    index_version: Optional[str] = None  # version served by this worker
     status: str = "unknown"  # building, ready, error, empty
+    build_progress: Optional[IndexBuildProgress] = None
 
 class IndexRebuildResponse(BaseModel):
     success: bool
@@ -55,6 +73,12 @@ class IndexUpdateResponse(BaseModel):
     added_count: int
     failed_count: int
 
+class IndexRemoveResponse(BaseModel):
+    success: bool
+    message: str
+    removed_count: int
+    removed_chunks: int
+
 # Helper functions
 def get_index_status() -> IndexStatus:
     """Get current index status information."""
@@ -62,11 +86,10 @@ def get_index_status() -> IndexStatus:
         policy_search = get_policy_search()
         
         # Check if index exists and is loaded
-        index_path = policy_search.index_path
-        index_file = index_path / "index.faiss"
-        meta_file = index_path / "index.pkl"
+        version = policy_search.store.current_version()
+        index_path = policy_search.store.version_dir(version) if version else None
         
-        is_built = index_file.exists() and meta_file.exists() and policy_search.vectorstore is not None
+        is_built = version is not None and policy_search.vectorstore is not None
         
         # Count original policies
         original_policies_count = 0
@@ -74,23 +97,17 @@ def get_index_status() -> IndexStatus:
             original_policies_count = len(list(policy_search.policies_dir.glob("*.md")))
         
         # Count uploaded documents
-        uploaded_docs_count = 0
-        indexed_uploaded_count = 0
-        
-        if METADATA_FILE.exists():
-            try:
-                with open(METADATA_FILE, 'r') as f:
-                    metadata = json.load(f)
-                uploaded_docs_count = len(metadata)
-                indexed_uploaded_count = sum(1 for doc in metadata.values() if doc.get('indexed', False))
-            except Exception:
-                pass
+        document_store = get_document_store()
+        uploaded_docs_count = document_store.count()
+        indexed_uploaded_count = document_store.count(indexed=True)
         
         # Calculate index size
         index_size_mb = None
-        if index_file.exists():
+        if index_path is not None:
             try:
-                index_size_mb = round(index_file.stat().st_size / (1024 * 1024), 2)
+                index_size_mb = round(sum(
+                    (index_path / name).stat().st_size for name in SNAPSHOT_FILES
+                    if (index_path / name).exists()) / (1024 * 1024), 2)
             except Exception:
                 pass
         
@@ -107,7 +124,10 @@ def get_index_status() -> IndexStatus:
                 pass
         
         # Determine status
-        if not is_built:
+        build_progress = IndexBuildProgress(**policy_search.build_progress.as_dict())
+        if policy_search.build_progress.is_running:
+            status_str = "building"
+        elif not is_built:
             status_str = "empty"
         elif policy_search.vectorstore is None:
             status_str = "error"
@@ -124,7 +144,11 @@ def get_index_status() -> IndexStatus:
             uploaded_docs_count=uploaded_docs_count,
             indexed_uploaded_count=indexed_uploaded_count,
             index_size_mb=index_size_mb,
-            status=status_str
+            index_type=policy_search.vectorstore.index_type if policy_search.vectorstore else None,
+            index_compression=policy_search.vectorstore.compression if policy_search.vectorstore else None,
+            index_version=policy_search.version,
+            status=status_str,
+            build_progress=build_progress
         )
         
     except Exception as e:
@@ -151,21 +175,28 @@ def save_index_status(status: IndexStatus):
     except Exception as e:
         logger.error(f"Error saving index status: {e}")
 
-def load_document_metadata() -> Dict[str, Any]:
-    """Load document metadata from JSON file."""
-    if not METADATA_FILE.exists():
-        return {}
-    
-    try:
-        with open(METADATA_FILE, 'r') as f:
-            return json.load(f)
-    except Exception:
-        return {}
+def is_settled(doc_data: Dict[str, Any]) -> bool:
+    """Whether no ingest worker has the document queued, in progress or
+    cancelled, so it may be (re-)indexed here."""
+    return doc_data["ingest_status"] not in INGEST_ACTIVE + ("cancelled",)
+
+def index_uploaded_documents(docs: List[DocumentMetadata]) -> Dict[str, bool]:
+    """Add uploaded documents to the index under their document ids.
 
-def save_document_metadata(metadata_dict: Dict[str, Any]):
-    """Save document metadata to JSON file."""
-    with open(METADATA_FILE, 'w') as f:
-        json.dump(metadata_dict, f, indent=2, default=str)
+    Runs `index_documents` over batches of ``INGEST_BATCH_MAX_DOCS``, each
+    embedded in one pass; copies of an already indexed file reuse its index
+    entries. Why a document could not be indexed is recorded as
+    ``ingest_error`` in its metadata, and cleared once it is.
+
+    Returns:
+        Whether each document (by id) was indexed
+    """
+    from app.core.config import get_settings
+    batch_size = get_settings().ingest_batch_max_docs
+    indexed: Dict[str, bool] = {}
+    for start in range(0, len(docs), batch_size):
+        indexed.update(index_documents(docs[start:start + batch_size]))
+    return indexed
 
 def rebuild_index_sync(include_uploaded: bool = True) -> IndexStatus:
     """Synchronously rebuild the index."""
@@ -175,14 +206,15 @@ def rebuild_index_sync(include_uploaded: bool = True) -> IndexStatus:
         # Force rebuild the index
         policy_search.create_index(force_rebuild=True)
         
-        # If including uploaded documents, we need to extend the functionality
+        # The rebuild starts from the original policies only, so uploaded
+        # documents are flagged as not indexed and re-added to match, in
+        # batches embedded together. Documents the ingest workers still have
+        # queued or in progress are left to them.
+        document_store = get_document_store()
+        document_store.set_indexed(None, False)
         if include_uploaded:
-            # For now, mark all uploaded docs as indexed
-            # In a full implementation, we'd actually add them to the index
-            metadata_dict = load_document_metadata()
-            for doc_id, doc_data in metadata_dict.items():
-                doc_data['indexed'] = True
-            save_document_metadata(metadata_dict)
+            index_uploaded_documents([DocumentMetadata(**doc_data) for doc_data in document_store.list()
+                                      if is_settled(doc_data)])
         
         # Update status
         status = get_index_status()
@@ -221,6 +253,13 @@ async def rebuild_index(
     try:
         current_status = get_index_status()
         
+        if current_status.status == "building":
+            return IndexRebuildResponse(
+                success=False,
+                message="An index build is already in progress. Poll /index/status for progress.",
+                status=current_status
+            )
+        
         # Check if rebuild is needed
         if not force and current_status.is_built and current_status.status == "ready":
             return IndexRebuildResponse(
@@ -229,10 +268,10 @@ async def rebuild_index(
                 status=current_status
             )
         
-        # For now, do synchronous rebuild
-        # In production, you'd want to use background tasks for large indexes
+        # Run the rebuild off the event loop so /index/status can report
+        # build progress while it is embedding
         logger.info("Starting index rebuild...")
-        new_status = rebuild_index_sync(include_uploaded=include_uploaded)
+        new_status = await run_in_threadpool(rebuild_index_sync, include_uploaded=include_uploaded)
         
         if new_status.status == "ready":
             return IndexRebuildResponse(
@@ -263,13 +302,10 @@ async def reset_index_to_original() -> IndexResetResponse:
     """
     try:
         # Mark all uploaded documents as not indexed
-        metadata_dict = load_document_metadata()
-        for doc_id, doc_data in metadata_dict.items():
-            doc_data['indexed'] = False
-        save_document_metadata(metadata_dict)
+        get_document_store().set_indexed(None, False)
         
         # Rebuild index with only original policies
-        new_status = rebuild_index_sync(include_uploaded=False)
+        new_status = await run_in_threadpool(rebuild_index_sync, include_uploaded=False)
         
         if new_status.status == "ready":
             return IndexResetResponse(
@@ -295,27 +331,33 @@ async def reset_index_to_original() -> IndexResetResponse:
 async def add_documents_to_index(document_ids: List[str]) -> IndexUpdateResponse:
     """Add specific uploaded documents to the search index.
     
-    This is a placeholder for incremental index updates.
-    In the current implementation, it marks documents as indexed
-    but requires a full rebuild to actually include them.
+    Documents are embedded in batches and added incrementally under their
+    document id; documents that are already indexed have their chunks
+    replaced. Documents the ingest workers have queued or in progress are
+    skipped, as they are being indexed already.
     """
     try:
-        metadata_dict = load_document_metadata()
-        added_count = 0
-        failed_count = 0
+        document_store = get_document_store()
+        docs: List[DocumentMetadata] = []
+        missing = skipped = 0
         
-        for doc_id in document_ids:
-            if doc_id in metadata_dict:
-                metadata_dict[doc_id]['indexed'] = True
-                added_count += 1
+        for doc_id in dict.fromkeys(document_ids):
+            doc_data = document_store.get(doc_id)
+            if doc_data is None:
+                missing += 1
+            elif not is_settled(doc_data):
+                skipped += 1
             else:
-                failed_count += 1
+                docs.append(DocumentMetadata(**doc_data))
         
-        save_document_metadata(metadata_dict)
+        indexed = await run_in_threadpool(index_uploaded_documents, docs)
+        added_count = sum(indexed.values())
+        failed_count = missing + len(docs) - added_count
         
         return IndexUpdateResponse(
-            success=True,
-            message=f"Marked {added_count} documents for indexing. Run rebuild to update search index.",
+            success=failed_count == 0,
+            message=f"Added {added_count} documents to the search index ({failed_count} failed"
+                    + (f", {skipped} already being ingested" if skipped else "") + ")",
             added_count=added_count,
             failed_count=failed_count
         )
@@ -325,4 +367,35 @@ async def add_documents_to_index(document_ids: List[str]) -> IndexUpdateResponse
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to add documents to index: {str(e)}"
-        ) 
\ No newline at end of file
+        ) 
+
+@router.post("/index/remove-documents", response_model=IndexRemoveResponse)
+async def remove_documents_from_index(document_ids: List[str]) -> IndexRemoveResponse:
+    """Remove specific documents from the search index, keeping the files."""
+    try:
+        policy_search = get_policy_search()
+        removed_count = 0
+        removed_chunks = 0
+        
+        for doc_id in document_ids:
+            # Index lock, delta-log fsync and compaction run off the event loop
+            chunks = await run_in_threadpool(policy_search.delete_document_from_index, doc_id)
+            if chunks:
+                removed_count += 1
+                removed_chunks += chunks
+        
+        get_document_store().set_indexed(document_ids, False)
+        
+        return IndexRemoveResponse(
+            success=True,
+            message=f"Removed {removed_count} documents ({removed_chunks} chunks) from the search index",
+            removed_count=removed_count,
+            removed_chunks=removed_chunks
+        )
+        
+    except Exception as e:
+        logger.error(f"Error in remove_documents_from_index endpoint: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to remove documents from index: {str(e)}"
+        )
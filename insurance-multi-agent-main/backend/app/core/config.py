@@ -26,6 +26,134 @@ class Settings(BaseSettings):  # noqa: D101
         default="gpt-4o", alias="AZURE_OPENAI_DEPLOYMENT_NAME")
     azure_openai_embedding_model: str | None = Field(
         default="text-embedding-ada-002", alias="AZURE_OPENAI_EMBEDDING_MODEL")
+    # Output dimension for models that support it (text-embedding-3-*)
+    azure_openai_embedding_dimensions: int | None = Field(
+        default=None, alias="AZURE_OPENAI_EMBEDDING_DIMENSIONS")
+
+    # Policy index maintenance
+    policy_index_compaction_ratio: float = Field(
+        default=0.5, alias="POLICY_INDEX_COMPACTION_RATIO")
+    policy_index_compaction_min_bytes: int = Field(
+        default=8 * 1024 * 1024, alias="POLICY_INDEX_COMPACTION_MIN_BYTES")
+    # Seconds between checks for versions/changes published by other workers; 0 = off
+    policy_index_watch_interval: float = Field(
+        default=2.0, alias="POLICY_INDEX_WATCH_INTERVAL")
+
+    # Policy index type (auto, flat, hnsw, ivf_flat, ivf_pq) and build parameters
+    policy_index_type: str = Field(
+        default="auto", alias="POLICY_INDEX_TYPE")
+    policy_index_flat_max_vectors: int = Field(
+        default=10_000, alias="POLICY_INDEX_FLAT_MAX_VECTORS")
+    policy_index_hnsw_max_vectors: int = Field(
+        default=100_000, alias="POLICY_INDEX_HNSW_MAX_VECTORS")
+    policy_index_ivf_flat_max_vectors: int = Field(
+        default=1_000_000, alias="POLICY_INDEX_IVF_FLAT_MAX_VECTORS")
+    policy_index_hnsw_m: int = Field(
+        default=32, alias="POLICY_INDEX_HNSW_M")
+    policy_index_hnsw_ef_construction: int = Field(
+        default=200, alias="POLICY_INDEX_HNSW_EF_CONSTRUCTION")
+    policy_index_hnsw_ef_search: int = Field(
+        default=64, alias="POLICY_INDEX_HNSW_EF_SEARCH")
+    # IVF cell count; 0 = derive from data
+    policy_index_ivf_nlist: int = Field(
+        default=0, alias="POLICY_INDEX_IVF_NLIST")
+    policy_index_ivf_nprobe: int = Field(
+        default=16, alias="POLICY_INDEX_IVF_NPROBE")
+    # PQ sub-quantizers per vector; 0 = derive from data
+    policy_index_pq_m: int = Field(
+        default=0, alias="POLICY_INDEX_PQ_M")
+    policy_index_pq_nbits: int = Field(
+        default=8, alias="POLICY_INDEX_PQ_NBITS")
+    # Vector compression (none, sq8, pq); compressed hits are re-ranked with exact vectors
+    policy_index_compression: str = Field(
+        default="none", alias="POLICY_INDEX_COMPRESSION")
+    policy_index_rerank_depth: int = Field(
+        default=50, alias="POLICY_INDEX_RERANK_DEPTH")
+
+    # Ingest chunking: chunks follow section boundaries; only sections longer than
+    # the chunk size are split (with overlap), shorter ones merge into the next
+    policy_chunk_size: int = Field(
+        default=1000, alias="POLICY_CHUNK_SIZE")
+    policy_chunk_overlap: int = Field(
+        default=200, alias="POLICY_CHUNK_OVERLAP")
+    policy_chunk_min_size: int = Field(
+        default=200, alias="POLICY_CHUNK_MIN_SIZE")
+    # Chunks at least this similar (estimated Jaccard of word shingles) are
+    # stored and embedded once, listing every source; 0 = off
+    policy_dedup_threshold: float = Field(
+        default=0.9, alias="POLICY_DEDUP_THRESHOLD")
+
+    # Embedding ingest pipeline (rate limits of 0 mean unlimited)
+    embedding_batch_max_tokens: int = Field(
+        default=16_000, alias="EMBEDDING_BATCH_MAX_TOKENS")
+    embedding_batch_max_size: int = Field(
+        default=256, alias="EMBEDDING_BATCH_MAX_SIZE")
+    embedding_max_concurrency: int = Field(
+        default=4, alias="EMBEDDING_MAX_CONCURRENCY")
+    embedding_requests_per_minute: int = Field(
+        default=0, alias="EMBEDDING_REQUESTS_PER_MINUTE")
+    embedding_tokens_per_minute: int = Field(
+        default=0, alias="EMBEDDING_TOKENS_PER_MINUTE")
+
+    # PDF extraction: sandboxed worker processes; 0 = one per CPU (up to 8)
+    pdf_extract_workers: int = Field(
+        default=0, alias="PDF_EXTRACT_WORKERS")
+    # Extractions with fewer pages in total run as one task per file
+    pdf_parallel_min_pages: int = Field(
+        default=64, alias="PDF_PARALLEL_MIN_PAGES")
+    # Extracted text cached by file SHA-256 so unchanged PDFs are parsed once; 0 = off
+    pdf_extraction_cache_max_mb: int = Field(
+        default=512, alias="PDF_EXTRACTION_CACHE_MAX_MB")
+    # PDF sandbox limits, 0 = unlimited: pages and size of a file, seconds per
+    # worker task (a worker that overruns is killed), address space per worker
+    pdf_max_pages: int = Field(
+        default=5000, alias="PDF_MAX_PAGES")
+    pdf_max_mb: int = Field(
+        default=100, alias="PDF_MAX_MB")
+    pdf_task_timeout: float = Field(
+        default=60.0, alias="PDF_TASK_TIMEOUT")
+    pdf_worker_memory_mb: int = Field(
+        default=1024, alias="PDF_WORKER_MEMORY_MB")
+
+    # Upload limits, enforced while the body streams in (413), 0 = unlimited:
+    # size of one file, of the whole request, files per request
+    upload_max_file_mb: int = Field(
+        default=100, alias="UPLOAD_MAX_FILE_MB")
+    upload_max_request_mb: int = Field(
+        default=500, alias="UPLOAD_MAX_REQUEST_MB")
+    upload_max_files: int = Field(
+        default=50, alias="UPLOAD_MAX_FILES")
+
+    # Background ingest of uploads: worker threads per API process, documents
+    # coalesced into one embedding pass and index commit, how long a worker
+    # waits for more uploads to join a batch, and how long a claim on queued
+    # documents outlives its last renewal before others requeue them (seconds)
+    ingest_workers: int = Field(
+        default=1, alias="INGEST_WORKERS")
+    ingest_batch_max_docs: int = Field(
+        default=16, alias="INGEST_BATCH_MAX_DOCS")
+    ingest_batch_wait: float = Field(
+        default=0.5, alias="INGEST_BATCH_WAIT")
+    ingest_lease: float = Field(
+        default=60.0, alias="INGEST_LEASE")
+
+    # Policy search
+    query_embedding_cache_size: int = Field(
+        default=4096, alias="QUERY_EMBEDDING_CACHE_SIZE")
+    query_embedding_cache_persist: bool = Field(
+        default=True, alias="QUERY_EMBEDDING_CACHE_PERSIST")
+    policy_search_mode: str = Field(
+        default="hybrid", alias="POLICY_SEARCH_MODE")  # hybrid, dense, lexical
+    policy_search_candidate_depth: int = Field(
+        default=20, alias="POLICY_SEARCH_CANDIDATE_DEPTH")
+    policy_search_rrf_k: int = Field(
+        default=60, alias="POLICY_SEARCH_RRF_K")
+    # Relevance/novelty trade-off of diversified (MMR) searches; 1.0 = relevance only
+    policy_search_mmr_lambda: float = Field(
+        default=0.5, alias="POLICY_SEARCH_MMR_LAMBDA")
+    # Threads ranking async searches (FAISS/BM25) off the event loop
+    policy_search_max_threads: int = Field(
+        default=4, alias="POLICY_SEARCH_MAX_THREADS")
 
     # FastAPI
     app_name: str = "Insurance Multi-Agent Backend"
@@ -5,6 +5,7 @@ import os
 
 from app.api.v1.endpoints import workflow as workflow_endpoints
 from app.api.v1.endpoints import files as files_endpoints
+from app.services.ingest_queue import get_ingest_queue
 from app.workflow.policy_search import get_policy_search
 
 # Configure logging
@@ -69,6 +70,9 @@ async def startup_event():
         logger.error("❌ Failed to initialize policy search index: %s", e)
         # Don't raise - let the app start but log the error
 
+    # Resume indexing uploads that were queued before a restart
+    get_ingest_queue().start()
+
 # Root
 
 
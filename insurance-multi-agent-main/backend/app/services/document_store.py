@@ -0,0 +1,568 @@
+"""SQLite store of uploaded-document metadata.
+
+Document metadata used to live in ``document_metadata.json``: every request
+re-read and parsed the whole file, every change rewrote it, and the
+documents and index endpoints both wrote it without locking, so concurrent
+uploads lost each other's updates. It now lives in a SQLite table (WAL, so
+readers never wait for a writer) with one row per document:
+
+* lookups go by primary key; listings are served a page at a time (see
+  `DocumentStore.page`), walking an index in sort order from a cursor, so
+  a page costs the same however many documents there are;
+* document counts per category and indexed state are kept up to date by
+  triggers, so totals are read from a handful of rows, not counted;
+* writes touch only the rows they change, each in its own transaction, so
+  concurrent requests – and API worker processes – no longer overwrite
+  each other.
+
+Uploaded files are stored by content: each is a blob named by its SHA-256
+under ``uploaded_docs/blobs``, and every document row referencing it counts
+towards its ``refs`` (kept by triggers, like the counts). Uploading a file
+that is already stored only adds a row; the blob is removed with its last
+reference (see `DocumentStore.add` and `DocumentStore.delete`).
+
+Documents also serve as the background ingest queue: ``ingest_status``
+moves from ``queued`` through ``extracting`` and ``embedding`` to
+``indexed`` or ``failed`` (or ``cancelled``, when the document is deleted
+before it finishes), and ingest workers claim queued documents in a
+transaction (see `DocumentStore.claim_queued`), so every API worker
+process can share the queue and it survives restarts. A claim is a lease
+that its worker keeps renewing; documents are only queued again once
+their lease has expired, i.e. their worker is gone.
+
+An existing JSON file is imported once on first open and renamed to
+``document_metadata.json.migrated``.
+"""
+from __future__ import annotations
+
+import base64
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "workflow" / "data"
+DEFAULT_PATH = DATA_DIR / "documents.sqlite"
+LEGACY_JSON = DATA_DIR / "document_metadata.json"
+BLOB_DIR = DATA_DIR / "uploaded_docs" / "blobs"
+
+# ``blob`` is the document's file relative to the blob directory; None for
+# documents uploaded before content addressing, kept in their category folder.
+# ``ingest_status`` is one of INGEST_STATES, None if never queued.
+_COLUMNS = ("id", "filename", "original_filename", "category", "size", "content_type",
+            "upload_date", "indexed", "metadata", "blob", "ingest_status")
+# Stored columns: ``name_key`` is the lower-cased original filename, for
+# case-insensitive sorting and prefix search
+_STORED = _COLUMNS + ("name_key",)
+_UPSERT = (f"INSERT INTO documents ({', '.join(_STORED)}) VALUES ({', '.join('?' * len(_STORED))}) "
+           f"ON CONFLICT (id) DO UPDATE SET "
+           + ", ".join(f"{column} = excluded.{column}" for column in _STORED[1:]))
+
+INGEST_STATES = ("queued", "extracting", "embedding", "indexed", "failed", "cancelled")
+# States of a document whose ingest has not finished
+INGEST_ACTIVE = ("queued", "extracting", "embedding")
+
+# Sort keys of `DocumentStore.page` -> column; each has an index ending in id
+SORT_COLUMNS = {"upload_date": "upload_date", "original_filename": "name_key", "size": "size"}
+MAX_PAGE_SIZE = 200
+# A prefix matching more documents than this is filtered while walking the
+# sort index, rather than collecting and sorting every match
+_PREFIX_SORT_LIMIT = 2000
+
+# Schema migrations by ``PRAGMA user_version``; each runs in one transaction
+_MIGRATIONS = (
+    (
+        """CREATE TABLE IF NOT EXISTS documents (
+            id TEXT PRIMARY KEY, filename TEXT NOT NULL, original_filename TEXT NOT NULL,
+            category TEXT NOT NULL, size INTEGER NOT NULL, content_type TEXT NOT NULL,
+            upload_date TEXT NOT NULL, indexed INTEGER NOT NULL DEFAULT 0,
+            metadata TEXT NOT NULL DEFAULT '{}')""",
+        "CREATE INDEX IF NOT EXISTS documents_by_date ON documents (upload_date, id)",
+        "CREATE INDEX IF NOT EXISTS documents_by_category ON documents (category, upload_date, id)",
+        "CREATE INDEX IF NOT EXISTS documents_by_indexed ON documents (indexed, upload_date, id)",
+    ),
+    (
+        "ALTER TABLE documents ADD COLUMN name_key TEXT NOT NULL DEFAULT ''",
+        "CREATE INDEX documents_by_name ON documents (name_key, id)",
+        "CREATE INDEX documents_by_size ON documents (size, id)",
+        "CREATE INDEX documents_by_category_name ON documents (category, name_key, id)",
+        "CREATE INDEX documents_by_category_size ON documents (category, size, id)",
+        """CREATE TABLE document_counts (
+            category TEXT NOT NULL, indexed INTEGER NOT NULL, n INTEGER NOT NULL,
+            PRIMARY KEY (category, indexed))""",
+        """CREATE TRIGGER documents_counted_insert AFTER INSERT ON documents BEGIN
+            INSERT INTO document_counts (category, indexed, n) VALUES (NEW.category, NEW.indexed, 1)
+                ON CONFLICT (category, indexed) DO UPDATE SET n = n + 1;
+        END""",
+        """CREATE TRIGGER documents_counted_delete AFTER DELETE ON documents BEGIN
+            UPDATE document_counts SET n = n - 1
+                WHERE category = OLD.category AND indexed = OLD.indexed;
+        END""",
+        """CREATE TRIGGER documents_counted_update AFTER UPDATE OF category, indexed ON documents
+            WHEN OLD.category IS NOT NEW.category OR OLD.indexed IS NOT NEW.indexed BEGIN
+            UPDATE document_counts SET n = n - 1
+                WHERE category = OLD.category AND indexed = OLD.indexed;
+            INSERT INTO document_counts (category, indexed, n) VALUES (NEW.category, NEW.indexed, 1)
+                ON CONFLICT (category, indexed) DO UPDATE SET n = n + 1;
+        END""",
+        """INSERT INTO document_counts (category, indexed, n)
+            SELECT category, indexed, COUNT(*) FROM documents GROUP BY category, indexed""",
+    ),
+    (
+        "ALTER TABLE documents ADD COLUMN blob TEXT",
+        "CREATE INDEX documents_by_blob ON documents (blob, indexed)",
+        "CREATE TABLE blobs (name TEXT PRIMARY KEY, refs INTEGER NOT NULL)",
+        """CREATE TRIGGER documents_blob_insert AFTER INSERT ON documents
+            WHEN NEW.blob IS NOT NULL BEGIN
+            INSERT INTO blobs (name, refs) VALUES (NEW.blob, 1)
+                ON CONFLICT (name) DO UPDATE SET refs = refs + 1;
+        END""",
+        """CREATE TRIGGER documents_blob_delete AFTER DELETE ON documents
+            WHEN OLD.blob IS NOT NULL BEGIN
+            UPDATE blobs SET refs = refs - 1 WHERE name = OLD.blob;
+            DELETE FROM blobs WHERE name = OLD.blob AND refs <= 0;
+        END""",
+        """CREATE TRIGGER documents_blob_update AFTER UPDATE OF blob ON documents
+            WHEN OLD.blob IS NOT NEW.blob BEGIN
+            UPDATE blobs SET refs = refs - 1 WHERE name = OLD.blob;
+            DELETE FROM blobs WHERE name = OLD.blob AND refs <= 0;
+            INSERT INTO blobs (name, refs) SELECT NEW.blob, 1 WHERE NEW.blob IS NOT NULL
+                ON CONFLICT (name) DO UPDATE SET refs = refs + 1;
+        END""",
+    ),
+    (
+        "ALTER TABLE documents ADD COLUMN ingest_status TEXT",
+        "CREATE INDEX documents_by_ingest_status ON documents (ingest_status, upload_date, id)",
+        "UPDATE documents SET ingest_status = 'indexed' WHERE indexed = 1",
+    ),
+    (
+        # Worker holding an ingest claim, and when (epoch seconds) it lapses
+        "ALTER TABLE documents ADD COLUMN ingest_owner TEXT",
+        "ALTER TABLE documents ADD COLUMN ingest_lease REAL",
+    ),
+)
+
+
+def _iso(value: Any) -> str:
+    """ISO-8601 timestamp, so dates sort as text (the JSON file held ``str(datetime)``)."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return datetime.fromisoformat(str(value)).isoformat()
+
+
+def _row(doc: Dict[str, Any]) -> tuple:
+    original_filename = doc.get("original_filename") or doc["filename"]
+    return (doc["id"], doc["filename"], original_filename,
+            doc.get("category", "policy"), int(doc.get("size", 0)),
+            doc.get("content_type") or "application/octet-stream", _iso(doc["upload_date"]),
+            int(bool(doc.get("indexed", False))), json.dumps(doc.get("metadata") or {}),
+            doc.get("blob"), doc.get("ingest_status"), original_filename.lower())
+
+
+def _document(row: tuple) -> Dict[str, Any]:
+    doc = dict(zip(_COLUMNS, row))
+    doc["upload_date"] = datetime.fromisoformat(doc["upload_date"])
+    doc["indexed"] = bool(doc["indexed"])
+    doc["metadata"] = json.loads(doc["metadata"])
+    return doc
+
+
+class DocumentStore:
+    """Uploaded-document metadata by document id (thread-safe).
+
+    Documents are plain dictionaries with the fields of the documents
+    API's ``DocumentMetadata``. The blob files under ``blob_dir`` are placed
+    and removed inside the write transaction that adds or drops their
+    references, which SQLite serialises across worker processes, so a blob
+    is never removed while another upload is reusing it.
+    """
+
+    def __init__(self, path: str | Path = DEFAULT_PATH, legacy_json: str | Path | None = LEGACY_JSON,
+                 blob_dir: str | Path = BLOB_DIR):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.blob_dir = Path(blob_dir)
+        self._lock = threading.Lock()
+        # Shared by every API worker: WAL lets readers run alongside a writer
+        self._db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False,
+                                   isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._upgrade()
+        if legacy_json is not None and Path(legacy_json).exists():
+            self._import_json(Path(legacy_json))
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        """One write transaction (the connection is in autocommit mode)."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def _upgrade(self) -> None:
+        """Bring the schema up to date; concurrent workers take turns."""
+        while True:
+            with self._transaction():
+                version = self._db.execute("PRAGMA user_version").fetchone()[0]
+                if version >= len(_MIGRATIONS):
+                    return
+                for statement in _MIGRATIONS[version]:
+                    self._db.execute(statement)
+                if version == 1:
+                    # Rows from before ``name_key`` existed
+                    self._db.executemany("UPDATE documents SET name_key = ? WHERE id = ?", [
+                        (name.lower(), doc_id) for doc_id, name in
+                        self._db.execute("SELECT id, original_filename FROM documents").fetchall()])
+                self._db.execute(f"PRAGMA user_version = {version + 1}")
+
+    def _import_json(self, legacy_json: Path) -> None:
+        """Import the JSON metadata file, once; existing rows win."""
+        try:
+            with open(legacy_json, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not read %s for migration: %s", legacy_json, e)
+            return
+        rows = []
+        for doc_id, doc in data.items():
+            try:
+                rows.append(_row({**doc, "id": doc_id}))
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning("Skipping document %s in %s: %s", doc_id, legacy_json.name, e)
+        with self._transaction():
+            self._db.executemany(
+                f"INSERT OR IGNORE INTO documents ({', '.join(_STORED)}) "
+                f"VALUES ({', '.join('?' * len(_STORED))})", rows)
+        try:
+            legacy_json.rename(legacy_json.with_name(legacy_json.name + ".migrated"))
+        except FileNotFoundError:
+            pass  # another worker migrated it at the same time
+        logger.info("Migrated %s documents from %s to %s", len(rows), legacy_json.name, self.path.name)
+
+    # ------------------------------------------------------------------
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM documents WHERE id = ?", (doc_id,)).fetchone()
+        return _document(row) if row is not None else None
+
+    def list(self, category: str | None = None, indexed: bool | None = None) -> List[Dict[str, Any]]:
+        """All documents, newest first, optionally of one category and/or
+        indexed state (for batch jobs; the API pages with `page`)."""
+        clauses, params = self._filters(category, indexed, None)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM documents{self._where(clauses)} "
+                f"ORDER BY upload_date DESC, id DESC", params).fetchall()
+        return [_document(row) for row in rows]
+
+    def page(self, category: str | None = None, indexed: bool | None = None, prefix: str | None = None,
+             sort: str = "upload_date", descending: bool = True, limit: int = 50,
+             cursor: str | None = None, total: int | None = None
+             ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of documents and the cursor of the next (``None`` at the end).
+
+        Args:
+            category, indexed: Filters, as for `list`
+            prefix: Only documents whose original filename starts with this
+                (case-insensitive)
+            sort: ``upload_date``, ``original_filename`` or ``size``; ties
+                are broken by id, so the order is total and stable
+            descending: Sort direction
+            limit: Page size, at most ``MAX_PAGE_SIZE``
+            cursor: ``next_cursor`` of the previous page, for the same
+                filters and sort
+            total: `count` of the same filters, if the caller already has
+                it; otherwise a prefix search counts its matches itself
+
+        Raises:
+            ValueError: Unknown sort key or a cursor not issued for this sort
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort by {sort!r}; use one of {', '.join(SORT_COLUMNS)}")
+        column = SORT_COLUMNS[sort]
+        direction = "DESC" if descending else "ASC"
+        # ``+name_key`` keeps SQLite off the name index for a common prefix
+        walk = bool(prefix) and column != "name_key" and (
+            total if total is not None else self.count(category, indexed, prefix)) > _PREFIX_SORT_LIMIT
+        clauses, params = self._filters(category, indexed, prefix, name_key="+name_key" if walk else "name_key")
+        if cursor is not None:
+            value, last_id = self._decode_cursor(cursor, sort, descending)
+            # Row-value comparison: walks the (column, id) index from the cursor
+            clauses.append(f"({column}, id) {'<' if descending else '>'} (?, ?)")
+            params += [value, last_id]
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(_COLUMNS)}, {column} FROM documents{self._where(clauses)} "
+                f"ORDER BY {column} {direction}, id {direction} LIMIT ?", (*params, limit + 1)).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self._encode_cursor(sort, descending, rows[-1][-1], rows[-1][0])
+        return [_document(row[:-1]) for row in rows], next_cursor
+
+    @staticmethod
+    def _encode_cursor(sort: str, descending: bool, value: Any, last_id: str) -> str:
+        payload = json.dumps([sort, descending, value, last_id], separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def _decode_cursor(cursor: str, sort: str, descending: bool) -> Tuple[Any, str]:
+        try:
+            payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            cursor_sort, cursor_descending, value, last_id = json.loads(payload)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Invalid cursor: {e}") from None
+        if cursor_sort != sort or cursor_descending != descending or not isinstance(last_id, str):
+            raise ValueError("Cursor does not belong to this sort order")
+        return value, last_id
+
+    def count(self, category: str | None = None, indexed: bool | None = None,
+              prefix: str | None = None) -> int:
+        """Documents matching the filters; without ``prefix`` read from the
+        trigger-maintained counts instead of counting rows."""
+        if prefix:
+            clauses, params = self._filters(category, indexed, prefix)
+            sql = f"SELECT COUNT(*) FROM documents{self._where(clauses)}"
+        else:
+            clauses, params = self._filters(category, indexed, None)
+            sql = f"SELECT COALESCE(SUM(n), 0) FROM document_counts{self._where(clauses)}"
+        with self._lock:
+            return self._db.execute(sql, params).fetchone()[0]
+
+    @staticmethod
+    def _filters(category: str | None, indexed: bool | None, prefix: str | None,
+                 name_key: str = "name_key") -> Tuple[List[str], List[Any]]:
+        clauses: List[str] = []
+        params: List[Any] = []
+        if category is not None:
+            clauses.append("category = ?")
+            params.append(category)
+        if indexed is not None:
+            clauses.append("indexed = ?")
+            params.append(int(indexed))
+        if prefix:
+            # A range on the name index; U+10FFFF sorts after any continuation
+            key = prefix.lower()
+            clauses.append(f"{name_key} >= ? AND {name_key} < ?")
+            params += [key, key + "\U0010ffff"]
+        return clauses, params
+
+    @staticmethod
+    def _where(clauses: List[str]) -> str:
+        return " WHERE " + " AND ".join(clauses) if clauses else ""
+
+    # ------------------------------------------------------------------
+    def put(self, doc: Dict[str, Any]) -> None:
+        """Insert or replace one document."""
+        self.put_many([doc])
+
+    def put_many(self, docs: Iterable[Dict[str, Any]]) -> None:
+        """Insert or replace documents in one transaction."""
+        rows = [_row(doc) for doc in docs]
+        # An upsert rather than INSERT OR REPLACE, whose implicit delete
+        # would not fire the count triggers
+        with self._transaction():
+            self._db.executemany(_UPSERT, rows)
+
+    def update(self, doc_id: str, *, indexed: bool | None = None,
+               metadata: Dict[str, Any] | None = None, ingest_status: str | None = None) -> bool:
+        """Set a document's indexed flag, metadata and/or ingest status;
+        False if it does not exist or its ingest was cancelled (it is being
+        deleted)."""
+        assignments, params = [], []
+        if indexed is not None:
+            assignments.append("indexed = ?")
+            params.append(int(indexed))
+        if metadata is not None:
+            assignments.append("metadata = ?")
+            params.append(json.dumps(metadata))
+        if ingest_status is not None:
+            assignments.append("ingest_status = ?")
+            params.append(ingest_status)
+        if not assignments:
+            doc = self.get(doc_id)
+            return doc is not None and doc["ingest_status"] != "cancelled"
+        with self._transaction():
+            cursor = self._db.execute(
+                f"UPDATE documents SET {', '.join(assignments)} "
+                f"WHERE id = ? AND ingest_status IS NOT 'cancelled'", (*params, doc_id))
+        return cursor.rowcount > 0
+
+    def set_indexed(self, doc_ids: Iterable[str] | None, indexed: bool) -> int:
+        """Set the indexed flag of several documents (all when ``doc_ids`` is None).
+
+        A finished ingest status follows the flag. Documents still being
+        ingested (or cancelled) are left alone: their worker records the
+        outcome.
+        """
+        sql = ("UPDATE documents SET indexed = ?, ingest_status = CASE WHEN ? THEN 'indexed' END "
+               "WHERE (ingest_status IS NULL OR ingest_status IN ('indexed', 'failed'))")
+        with self._transaction():
+            if doc_ids is None:
+                cursor = self._db.execute(sql, (int(indexed), int(indexed)))
+            else:
+                cursor = self._db.executemany(f"{sql} AND id = ?",
+                                              [(int(indexed), int(indexed), doc_id) for doc_id in doc_ids])
+        return cursor.rowcount
+
+    # Ingest queue -------------------------------------------------------------
+    def claim_queued(self, limit: int, owner: str = "", lease: float = 60.0) -> List[Dict[str, Any]]:
+        """Take up to ``limit`` queued documents, oldest first, marking them
+        ``extracting``; no other worker will claim them while ``owner``
+        renews its lease (see `renew_leases`) within ``lease`` seconds."""
+        with self._transaction():
+            rows = self._db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM documents WHERE ingest_status = 'queued' "
+                f"ORDER BY upload_date, id LIMIT ?", (limit,)).fetchall()
+            self._db.executemany(
+                "UPDATE documents SET ingest_status = 'extracting', ingest_owner = ?, "
+                "ingest_lease = ? WHERE id = ?",
+                [(owner, time.time() + lease, row[0]) for row in rows])
+        docs = [_document(row) for row in rows]
+        for doc in docs:
+            doc["ingest_status"] = "extracting"
+        return docs
+
+    def set_ingest_status(self, doc_ids: Iterable[str], ingest_status: str) -> int:
+        """Move those of the documents still being ingested to ``ingest_status``;
+        finished and cancelled ones keep theirs."""
+        with self._transaction():
+            cursor = self._db.executemany(
+                "UPDATE documents SET ingest_status = ? WHERE id = ? "
+                f"AND ingest_status IN ({', '.join('?' * len(INGEST_ACTIVE))})",
+                [(ingest_status, doc_id, *INGEST_ACTIVE) for doc_id in doc_ids])
+        return cursor.rowcount
+
+    def ingesting(self, doc_ids: Iterable[str]) -> List[str]:
+        """The given documents that still exist and are being ingested."""
+        doc_ids = list(doc_ids)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT id FROM documents WHERE id IN ({', '.join('?' * len(doc_ids))}) "
+                "AND ingest_status IN ('extracting', 'embedding')", doc_ids).fetchall()
+        return [row[0] for row in rows]
+
+    def cancel_ingest(self, doc_id: str) -> bool:
+        """Withdraw a document from the ingest queue (before deleting it):
+        workers drop it or, if they already indexed it, remove it again."""
+        with self._transaction():
+            cursor = self._db.execute(
+                "UPDATE documents SET ingest_status = 'cancelled' "
+                f"WHERE id = ? AND ingest_status IN ({', '.join('?' * len(INGEST_ACTIVE))})",
+                (doc_id, *INGEST_ACTIVE))
+        return cursor.rowcount > 0
+
+    def renew_leases(self, owner: str, lease: float) -> int:
+        """Extend ``owner``'s claims on the documents it is still ingesting."""
+        with self._transaction():
+            cursor = self._db.execute(
+                "UPDATE documents SET ingest_lease = ? WHERE ingest_owner = ? "
+                "AND ingest_status IN ('extracting', 'embedding')", (time.time() + lease, owner))
+        return cursor.rowcount
+
+    def requeue_interrupted(self) -> int:
+        """Queue again documents whose ingest was cut short: their worker's
+        lease lapsed (it stopped or died) or they were claimed before leases."""
+        with self._transaction():
+            cursor = self._db.execute(
+                "UPDATE documents SET ingest_status = 'queued', ingest_owner = NULL, "
+                "ingest_lease = NULL WHERE ingest_status IN ('extracting', 'embedding') "
+                "AND (ingest_lease IS NULL OR ingest_lease < ?)", (time.time(),))
+        return cursor.rowcount
+
+    def delete(self, doc_id: str) -> bool:
+        """Delete a document, and its blob file with the last reference to it."""
+        with self._transaction():
+            row = self._db.execute("SELECT blob FROM documents WHERE id = ?", (doc_id,)).fetchone()
+            if row is None:
+                return False
+            self._db.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+            if row[0] is not None and self._db.execute(
+                    "SELECT 1 FROM blobs WHERE name = ?", (row[0],)).fetchone() is None:
+                self.blob_path(row[0]).unlink(missing_ok=True)
+        return True
+
+    # Blobs ------------------------------------------------------------------
+    @staticmethod
+    def blob_name(sha256: str, suffix: str) -> str:
+        """Blob of a file with this content and extension (kept for its type)."""
+        return f"{sha256[:2]}/{sha256}{suffix.lower()}"
+
+    def blob_path(self, name: str) -> Path:
+        return self.blob_dir / name
+
+    def incoming_path(self, suffix: str) -> Path:
+        """A fresh path to receive an upload at, on the blobs' file system
+        so `add` can move it into place."""
+        incoming = self.blob_dir / "incoming"
+        incoming.mkdir(parents=True, exist_ok=True)
+        return incoming / f"{uuid.uuid4().hex}{suffix.lower()}"
+
+    def blob_refs(self, name: str) -> int:
+        """Documents referencing a blob."""
+        with self._lock:
+            row = self._db.execute("SELECT refs FROM blobs WHERE name = ?", (name,)).fetchone()
+        return row[0] if row is not None else 0
+
+    def find_indexed_copy(self, name: str, exclude_id: str) -> Optional[Dict[str, Any]]:
+        """Another indexed document with the same blob, whose index entries
+        a new copy can reuse; None if there is none."""
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM documents "
+                f"WHERE blob = ? AND indexed = 1 AND id != ? LIMIT 1", (name, exclude_id)).fetchone()
+        return _document(row) if row is not None else None
+
+    def add(self, uploads: Iterable[Tuple[Dict[str, Any], Path]]) -> List[bool]:
+        """Insert documents with their uploaded files, in one transaction.
+
+        Each document's ``blob`` names where its file belongs; the uploaded
+        file is moved there, or deleted when the blob is already stored.
+
+        Returns:
+            Per document, whether its blob was already stored
+        """
+        uploads = list(uploads)
+        rows = [_row(doc) for doc, _ in uploads]
+        reused = []
+        with self._transaction():
+            self._db.executemany(_UPSERT, rows)
+            for doc, source in uploads:
+                path = self.blob_path(doc["blob"])
+                if path.exists():
+                    source.unlink(missing_ok=True)
+                    reused.append(True)
+                else:
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    os.replace(source, path)
+                    reused.append(False)
+        return reused
+
+
+# Singleton instance for easy access
+_document_store_singleton: DocumentStore | None = None
+_singleton_lock = threading.Lock()
+
+
+def get_document_store() -> DocumentStore:
+    """Get the singleton document metadata store."""
+    global _document_store_singleton
+    with _singleton_lock:
+        if _document_store_singleton is None:
+            _document_store_singleton = DocumentStore()
+        return _document_store_singleton
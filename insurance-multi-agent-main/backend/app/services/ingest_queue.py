@@ -0,0 +1,144 @@
+"""Background ingest of uploaded documents.
+
+Uploads used to be indexed inside the upload request – extraction,
+embedding and the index commit all before the response. Now the upload only
+marks its documents ``queued`` in the document store and wakes the ingest
+workers, which:
+
+* wait ``INGEST_BATCH_WAIT`` for further uploads, then claim up to
+  ``INGEST_BATCH_MAX_DOCS`` queued documents at once;
+* hand them to the batch processor, which extracts each, embeds them in one
+  pass and commits them to the index together, moving each document's
+  ``ingest_status`` along (``extracting``, ``embedding``, then ``indexed`` or
+  ``failed``).
+
+The queue itself is the document store, so workers of every API process
+share it (the workers also poll, for uploads received by other processes).
+Claims are leases renewed by each queue's heartbeat thread; once a lease
+lapses – its process died or was restarted – any queue puts the documents
+back in line, while claims of live workers elsewhere are left alone.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.document_store import DocumentStore, get_document_store
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks for documents queued by other processes
+_POLL_INTERVAL = 5.0
+
+
+class IngestQueue:
+    """Worker threads that index queued documents in batches.
+
+    ``process`` receives a claimed batch of documents (store dictionaries)
+    and records each one's outcome in the store. The queue's claims carry
+    its ``owner`` id and last ``lease`` seconds past each renewal.
+    """
+
+    def __init__(self, store: DocumentStore, process: Callable[[List[Dict[str, Any]]], None],
+                 workers: int = 1, batch_size: int = 16, batch_wait: float = 0.5,
+                 lease: float = 60.0):
+        self.store = store
+        self.process = process
+        self.workers = max(workers, 1)
+        self.batch_size = max(batch_size, 1)
+        self.batch_wait = batch_wait
+        self.lease = lease
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start the workers (once), resuming ingests whose worker is gone."""
+        with self._lock:
+            if self._threads:
+                return
+            self._requeue_interrupted()
+            self._stop.clear()
+            self._threads = [threading.Thread(target=self._run, name=f"ingest-{n}", daemon=True)
+                             for n in range(self.workers)]
+            self._threads.append(
+                threading.Thread(target=self._heartbeat, name="ingest-lease", daemon=True))
+            for thread in self._threads:
+                thread.start()
+        self._wake.set()
+
+    def notify(self) -> None:
+        """Documents were queued: wake a worker (starting them if needed)."""
+        self.start()
+        self._wake.set()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the workers after their current batch."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+            self._stop.set()
+            self._wake.set()
+        for thread in threads:
+            thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(_POLL_INTERVAL)
+            self._wake.clear()
+            # Let uploads arriving together share a batch
+            if self._stop.wait(self.batch_wait):
+                return
+            while not self._stop.is_set():
+                docs = self.store.claim_queued(self.batch_size, self.owner, self.lease)
+                if not docs:
+                    break
+                if len(docs) == self.batch_size:
+                    self._wake.set()  # more waiting: let another worker claim too
+                try:
+                    self.process(docs)
+                except Exception as e:
+                    logger.error("Ingest of %s documents failed: %s", len(docs), e)
+                    # Documents recorded before the error keep their outcome
+                    self.store.set_ingest_status([doc["id"] for doc in docs], "failed")
+
+    def _heartbeat(self) -> None:
+        """Renew this queue's claims and take back those of vanished workers."""
+        while not self._stop.wait(self.lease / 3):
+            try:
+                self.store.renew_leases(self.owner, self.lease)
+                if self._requeue_interrupted():
+                    self._wake.set()
+            except Exception as e:
+                logger.warning("Could not renew ingest leases: %s", e)
+
+    def _requeue_interrupted(self) -> int:
+        requeued = self.store.requeue_interrupted()
+        if requeued:
+            logger.info("Re-queued %s documents whose ingest was interrupted", requeued)
+        return requeued
+
+
+# Singleton instance for easy access
+_ingest_queue_singleton: IngestQueue | None = None
+_singleton_lock = threading.Lock()
+
+
+def get_ingest_queue() -> IngestQueue:
+    """Get the singleton ingest queue of uploaded documents."""
+    global _ingest_queue_singleton
+    with _singleton_lock:
+        if _ingest_queue_singleton is None:
+            from app.api.v1.endpoints.documents import ingest_documents
+            from app.core.config import get_settings
+            settings = get_settings()
+            _ingest_queue_singleton = IngestQueue(
+                get_document_store(), ingest_documents, workers=settings.ingest_workers,
+                batch_size=settings.ingest_batch_max_docs, batch_wait=settings.ingest_batch_wait,
+                lease=settings.ingest_lease)
+        return _ingest_queue_singleton
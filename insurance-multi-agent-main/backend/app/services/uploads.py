@@ -0,0 +1,330 @@
+"""Streaming multipart uploads: straight to disk, hashed, size-limited.
+
+Declaring ``UploadFile`` parameters makes the framework read the whole
+request body into spooled temporary files before the handler runs, after
+which the handlers copied every file again with blocking calls on the event
+loop. `receive_uploads` instead parses ``request.stream()`` itself and
+writes each file part directly to its final path:
+
+* choosing each file's path, file writes and SHA-256 hashing run in the
+  thread pool, batched to ``_FLUSH_BYTES``, so the event loop only parses;
+* the per-file, per-request and file-count limits (`UploadLimits`) are
+  checked as bytes arrive – a declared ``Content-Length`` over the request
+  limit is refused before the body is read at all – and answered with 413;
+* the content type is sniffed from each file's first bytes rather than
+  trusted from the client;
+* a ``check`` callback sees each file's name and declared type before any
+  of its bytes are written, so unsupported files are refused early.
+
+If the request fails for any reason, every file it wrote is removed.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import anyio
+from fastapi import HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+
+try:
+    import python_multipart as multipart
+    from python_multipart.multipart import parse_options_header
+except ModuleNotFoundError:  # older python-multipart releases
+    import multipart  # type: ignore[no-redef]
+    from multipart.multipart import parse_options_header  # type: ignore[no-redef]
+
+logger = logging.getLogger(__name__)
+
+# Buffered file data is written out (and hashed) once this much is pending
+_FLUSH_BYTES = 256 * 1024
+# Bytes of each file kept for content sniffing
+_SNIFF_BYTES = 8192
+
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+class UploadLimits(NamedTuple):
+    """Size limits of one upload request; 0 means unlimited."""
+
+    max_file_bytes: int = 0
+    max_request_bytes: int = 0
+    max_files: int = 0
+
+    @classmethod
+    def from_settings(cls) -> "UploadLimits":
+        from app.core.config import get_settings
+        settings = get_settings()
+        return cls(max_file_bytes=settings.upload_max_file_mb * 1024 * 1024,
+                   max_request_bytes=settings.upload_max_request_mb * 1024 * 1024,
+                   max_files=settings.upload_max_files)
+
+
+def sniff_content_type(head: bytes, filename: str) -> Optional[str]:
+    """Content type of a file from its first bytes; None if they are inconclusive."""
+    suffix = Path(filename).suffix.lower()
+    if head.startswith(b"%PDF-"):
+        return "application/pdf"
+    if head.startswith(b"PK\x03\x04"):
+        return DOCX_TYPE if suffix == ".docx" else "application/zip"
+    if head.startswith(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"):  # OLE2, legacy Office
+        return "application/msword" if suffix == ".doc" else None
+    if b"\x00" in head:
+        return None
+    try:
+        head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off by the sniff window is still text
+        if e.start < len(head) - 3 or len(head) < _SNIFF_BYTES:
+            return None
+    return "text/markdown" if suffix in (".md", ".markdown") else "text/plain"
+
+
+class ReceivedUpload:
+    """One file of a multipart request, as written to disk.
+
+    ``content_type`` is the sniffed type, or the one the client declared
+    when sniffing is inconclusive; ``sha256`` is the hex digest of the
+    contents. ``path`` is chosen by ``target`` when the file is first
+    written.
+    """
+
+    def __init__(self, filename: str, declared_content_type: Optional[str],
+                 target: Callable[[str], Path]):
+        self.filename = filename
+        self.declared_content_type = declared_content_type
+        self.path: Optional[Path] = None
+        self._target = target
+        self.size = 0
+        self.sha256 = ""
+        self.content_type = declared_content_type or "application/octet-stream"
+        self._head = bytearray()
+        self._hash = hashlib.sha256()
+        self._handle = None
+
+    # Run in the thread pool ------------------------------------------------
+    def _open(self) -> None:
+        if self._handle is None:
+            self.path = self._target(self.filename)
+            self._handle = open(self.path, "wb")
+
+    def _write(self, data: bytes) -> None:
+        self._open()
+        self._handle.write(data)
+        self._hash.update(data)
+
+    def _finish(self) -> None:
+        self._open()  # empty files are only opened here
+        self._handle.close()
+        self.sha256 = self._hash.hexdigest()
+        self.content_type = (sniff_content_type(bytes(self._head), self.filename)
+                             or self.content_type)
+        self._head = bytearray()
+
+    def _discard(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
+
+
+class _Receiver:
+    """python-multipart callbacks that queue file writes for the thread pool."""
+
+    def __init__(self, field: str, limits: UploadLimits,
+                 target: Callable[[str], Path],
+                 check: Optional[Callable[[str, Optional[str]], None]]):
+        self.field = field
+        self.limits = limits
+        self.target = target
+        self.check = check
+        self.files: List[ReceivedUpload] = []
+        # (upload, data) to write, or (upload, None) to close, in order
+        self.pending: List[Tuple[ReceivedUpload, Optional[bytearray]]] = []
+        self.pending_bytes = 0
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+        self._current: Optional[ReceivedUpload] = None
+
+    def callbacks(self) -> Dict[str, Any]:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self) -> None:
+        self._headers = {}
+        self._current = None
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._headers[bytes(self._header_field).lower()] = bytes(self._header_value)
+        self._header_field.clear()
+        self._header_value.clear()
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        filename = options.get(b"filename", b"").decode("utf-8", "replace")
+        # Other form fields, and empty file inputs, are skipped
+        if name != self.field or not filename:
+            return
+        if self.limits.max_files and len(self.files) >= self.limits.max_files:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                detail=f"At most {self.limits.max_files} files per request")
+        declared = self._headers.get(b"content-type", b"").decode("latin-1").strip() or None
+        if self.check is not None:
+            self.check(filename, declared)
+        self._current = ReceivedUpload(filename, declared, self.target)
+        self.files.append(self._current)
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        upload = self._current
+        if upload is None:
+            return
+        upload.size += end - start
+        if self.limits.max_file_bytes and upload.size > self.limits.max_file_bytes:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File \"{upload.filename}\" exceeds the limit of "
+                       f"{self.limits.max_file_bytes} bytes")
+        if len(upload._head) < _SNIFF_BYTES:
+            upload._head += data[start:min(end, start + _SNIFF_BYTES - len(upload._head))]
+        if self.pending and self.pending[-1][0] is upload and self.pending[-1][1] is not None:
+            self.pending[-1][1].extend(data[start:end])
+        else:
+            self.pending.append((upload, bytearray(data[start:end])))
+        self.pending_bytes += end - start
+
+    def on_part_end(self) -> None:
+        if self._current is not None:
+            self.pending.append((self._current, None))
+            self._current = None
+
+    async def flush(self, force: bool = False) -> None:
+        """Write out the queued data if there is enough of it (or ``force``)."""
+        if not self.pending or (not force and self.pending_bytes < _FLUSH_BYTES):
+            return
+        pending, self.pending, self.pending_bytes = self.pending, [], 0
+        await run_in_threadpool(_apply, pending)
+
+    async def discard(self) -> None:
+        """Close and delete every file written so far."""
+        self.pending = []
+        # Also runs when the request is cancelled (client gone)
+        with anyio.CancelScope(shield=True):
+            await run_in_threadpool(_discard, self.files)
+
+
+def _apply(pending: List[Tuple[ReceivedUpload, Optional[bytearray]]]) -> None:
+    for upload, data in pending:
+        if data is None:
+            upload._finish()
+        else:
+            upload._write(data)
+
+
+def _discard(uploads: List[ReceivedUpload]) -> None:
+    for upload in uploads:
+        upload._discard()
+
+
+async def receive_uploads(
+    request: Request,
+    target: Callable[[str], Path],
+    *,
+    field: str = "files",
+    limits: Optional[UploadLimits] = None,
+    check: Optional[Callable[[str, Optional[str]], None]] = None,
+) -> List[ReceivedUpload]:
+    """Stream the file parts named ``field`` of a multipart request to disk.
+
+    Args:
+        request: The incoming ``multipart/form-data`` request; its body must
+            not have been read yet.
+        target: Called (in the thread pool) with each file's client-side
+            name; returns the path to write it to.
+        field: Form field holding the files; other fields are ignored.
+        limits: Size limits; defaults to the configured ones.
+        check: Called with each file's name and declared content type before
+            it is written; raises (e.g. ``HTTPException``) to refuse it.
+
+    Returns:
+        The files received, in request order, fully written and closed.
+
+    Raises:
+        HTTPException: 400 for a malformed request, 413 when a limit is
+            exceeded; nothing written by the request is left on disk.
+    """
+    limits = limits or UploadLimits.from_settings()
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or not options.get(b"boundary"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Expected a multipart/form-data request")
+    declared_length = request.headers.get("content-length", "")
+    if (limits.max_request_bytes and declared_length.isdigit()
+            and int(declared_length) > limits.max_request_bytes):
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"Request exceeds the limit of {limits.max_request_bytes} bytes")
+
+    receiver = _Receiver(field, limits, target, check)
+    parser = multipart.MultipartParser(options[b"boundary"], receiver.callbacks())
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if limits.max_request_bytes and received > limits.max_request_bytes:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Request exceeds the limit of {limits.max_request_bytes} bytes")
+            try:
+                parser.write(chunk)
+            except multipart.exceptions.MultipartParseError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                    detail=f"Malformed multipart body: {e}")
+            await receiver.flush()
+        parser.finalize()
+        if receiver._current is not None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail="Multipart body ended in the middle of a file")
+        await receiver.flush(force=True)
+    except BaseException:
+        await receiver.discard()
+        raise
+    logger.info("Received %d upload(s), %d bytes", len(receiver.files), received)
+    return receiver.files
+
+
+def openapi_upload_body(field: str = "files", **properties: Any) -> Dict[str, Any]:
+    """``openapi_extra`` describing a multipart body of files under ``field``,
+    for handlers that read the body with `receive_uploads`."""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": [field],
+                        "properties": {
+                            field: {"type": "array", "items": {"type": "string", "format": "binary"}},
+                            **properties,
+                        },
+                    }
+                }
+            },
+        }
+    }
@@ -1,6 +1,15 @@
 """Workflow package exposing supervisor processing utilities."""
-from .supervisor import process_lead_with_json  # noqa: F401
+from typing import Any
 
 __all__ = [
     "process_lead_with_json",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    # Imported on first use: the supervisor builds its agents at import time,
+    # which PDF extraction worker processes importing this package must not do.
+    if name == "process_lead_with_json":
+        from .supervisor import process_lead_with_json
+        return process_lead_with_json
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
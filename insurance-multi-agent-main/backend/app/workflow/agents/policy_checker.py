@@ -1,20 +1,21 @@
 """Policy Checker agent factory."""
 from langgraph.prebuilt import create_react_agent
 
-from ..tools import get_policy_details, search_policy_documents
+from ..tools import get_policy_details, lookup_policy_coverage, search_policy_documents
 
 
 def create_policy_checker_agent(llm):  # noqa: D401
     """Return a configured Policy Checker agent using the shared LLM."""
     return create_react_agent(
         model=llm,
-        tools=[get_policy_details, search_policy_documents],
+        tools=[get_policy_details, lookup_policy_coverage, search_policy_documents],
         prompt="""You are a policy-verification specialist. Your task is to decide whether the reported loss is covered under the customer's policy.
 
 MANDATORY STEPS
 1. Call `get_policy_details` to confirm the policy is in-force and gather limits / deductibles.
-2. Craft one or more focused queries for `search_policy_documents` to locate wording that applies (coverage, exclusions, definitions, limits).
-3. If initial searches return no results, try alternative search terms (e.g., "collision", "damage", "vehicle", "exclusions", "coverage").
+2. Call `lookup_policy_coverage` with the policy type (e.g. "Comprehensive Auto Insurance") for its covered perils, limits, deductibles and exclusions in one call; each entry names the section to cite. Only search for what these tables do not answer.
+3. Craft one or more focused queries for `search_policy_documents` to locate wording that applies (coverage, exclusions, definitions, limits). Pass several queries together as a list in a single call (e.g. ["collision coverage", "exclusions", "deductible"]) instead of calling the tool once per query. For exact identifiers (policy numbers such as "UNAuto-02", policy codes, section numbers) set `search_mode="lexical"`. When the policy type or language is known, pass `policy_type` (e.g. "Motorcycle Policy") or `language` ("nl"/"en") to search only those documents.
+4. If initial searches return no results, try alternative search terms (e.g., "collision", "damage", "vehicle", "exclusions", "coverage").
 
 LANGUAGE-SPECIFIC POLICY SEARCH STRATEGY
 • DUTCH CLAIMS: If the claim contains Dutch text, names, locations, or policy numbers starting with "UNAuto", prioritize Dutch policy terms:
@@ -0,0 +1,303 @@
+"""FAISS index types for policy vector search.
+
+The bundled policies fit a flat (exact) index, but uploaded policy PDFs and
+regulations can grow the corpus to hundreds of thousands of chunks, where an
+exhaustive scan per query gets slow. This module builds the approximate
+index types we support and maps the query-time knobs onto FAISS search
+parameters:
+
+* ``flat``     – exact L2 scan; best recall, cost grows linearly.
+* ``hnsw``     – graph index; fast and high recall, no physical removal.
+* ``ivf_flat`` – inverted lists over k-means cells; ``nprobe`` trades recall
+  for speed.
+* ``ivf_pq``   – IVF with product-quantised codes; a fraction of the memory.
+
+``auto`` picks a type from the corpus size. Independently, vectors can be
+compressed: ``sq8`` stores one byte per dimension (4x smaller), ``pq`` about
+one byte per eight dimensions (~32x). Compressed distances are approximate,
+so `rerank_exact` re-scores the top candidates against full-precision
+vectors kept on disk.
+
+Snapshot indexes are never modified: removed vectors are tombstoned by
+`PolicyIndex` and left out of searches, and compaction rebuilds the index
+without them.
+"""
+from __future__ import annotations
+
+import logging
+import math
+from dataclasses import dataclass
+from typing import Mapping, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("auto", "flat", "hnsw", "ivf_flat", "ivf_pq")
+COMPRESSIONS = ("none", "sq8", "pq")
+
+# k-means wants roughly this many training points per IVF cell
+_MIN_POINTS_PER_CELL = 39
+
+
+def _faiss():
+    from langchain_community.vectorstores.faiss import dependable_faiss_import
+    return dependable_faiss_import()
+
+
+@dataclass
+class AnnIndexConfig:
+    """Build parameters and query-time knobs for the policy index.
+
+    Zero for ``ivf_nlist`` / ``pq_m`` means "derive from the data".
+    """
+
+    index_type: str = "auto"
+    compression: str = "none"
+    flat_max_vectors: int = 10_000
+    hnsw_max_vectors: int = 100_000
+    ivf_flat_max_vectors: int = 1_000_000
+    hnsw_m: int = 32
+    hnsw_ef_construction: int = 200
+    hnsw_ef_search: int = 64
+    ivf_nlist: int = 0
+    ivf_nprobe: int = 16
+    pq_m: int = 0
+    pq_nbits: int = 8
+    rerank_depth: int = 50
+
+    @classmethod
+    def from_settings(cls) -> "AnnIndexConfig":
+        from app.core.config import get_settings
+        settings = get_settings()
+
+        return cls(
+            index_type=settings.policy_index_type,
+            compression=settings.policy_index_compression,
+            flat_max_vectors=settings.policy_index_flat_max_vectors,
+            hnsw_max_vectors=settings.policy_index_hnsw_max_vectors,
+            ivf_flat_max_vectors=settings.policy_index_ivf_flat_max_vectors,
+            hnsw_m=settings.policy_index_hnsw_m,
+            hnsw_ef_construction=settings.policy_index_hnsw_ef_construction,
+            hnsw_ef_search=settings.policy_index_hnsw_ef_search,
+            ivf_nlist=settings.policy_index_ivf_nlist,
+            ivf_nprobe=settings.policy_index_ivf_nprobe,
+            pq_m=settings.policy_index_pq_m,
+            pq_nbits=settings.policy_index_pq_nbits,
+            rerank_depth=settings.policy_index_rerank_depth,
+        )
+
+    # ------------------------------------------------------------------
+    def resolve_type(self, num_vectors: int) -> str:
+        """Concrete index type for a corpus of ``num_vectors`` chunks.
+
+        Raises:
+            ValueError: If ``index_type`` is not one of `INDEX_TYPES`
+        """
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(
+                f"Unknown index type '{self.index_type}' – expected one of {INDEX_TYPES}")
+        index_type = self.index_type
+        if index_type == "auto":
+            if num_vectors <= self.flat_max_vectors:
+                index_type = "flat"
+            elif num_vectors <= self.hnsw_max_vectors:
+                index_type = "hnsw"
+            elif num_vectors <= self.ivf_flat_max_vectors:
+                index_type = "ivf_flat"
+            else:
+                index_type = "ivf_pq"
+        if index_type.startswith("ivf") and self.nlist_for(num_vectors) < 2:
+            # Too few vectors to train a coarse quantizer
+            return "flat"
+        return index_type
+
+    def resolve_compression(self, index_type: str, num_vectors: int) -> str:
+        """Vector encoding for an index of ``index_type`` over ``num_vectors``.
+
+        Raises:
+            ValueError: If ``compression`` is not one of `COMPRESSIONS`
+        """
+        if self.compression not in COMPRESSIONS:
+            raise ValueError(
+                f"Unknown compression '{self.compression}' – expected one of {COMPRESSIONS}")
+        compression = "pq" if index_type == "ivf_pq" else self.compression
+        if compression == "pq" and num_vectors < 2 ** self.pq_nbits:
+            # Too few vectors to train the PQ codebooks
+            return "sq8"
+        return compression
+
+    def nlist_for(self, num_vectors: int) -> int:
+        nlist = self.ivf_nlist or int(4 * math.sqrt(num_vectors))
+        return max(1, min(nlist, num_vectors // _MIN_POINTS_PER_CELL))
+
+    def pq_m_for(self, dim: int) -> int:
+        """Sub-quantizer count; must divide ``dim`` (auto: ~8 dims per code byte)."""
+        if self.pq_m:
+            if dim % self.pq_m:
+                raise ValueError(f"pq_m={self.pq_m} does not divide embedding dimension {dim}")
+            return self.pq_m
+        target = max(1, dim // 8)
+        return max(m for m in range(1, target + 1) if dim % m == 0)
+
+
+# ---------------------------------------------------------------------------
+def build_index(config: AnnIndexConfig, vectors: np.ndarray, index_type: str | None = None,
+                compression: str | None = None):
+    """Create, train and fill an index of ``index_type`` (resolved if omitted).
+
+    Vectors are added in order, so FAISS ids equal row positions.
+    """
+    faiss = _faiss()
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    num_vectors, dim = vectors.shape
+    if index_type is None:
+        index_type, compression = target_layout(config, num_vectors)
+    compression = compression or config.resolve_compression(index_type, num_vectors)
+    sq8 = faiss.ScalarQuantizer.QT_8bit
+
+    if index_type == "flat":
+        if compression == "sq8":
+            index = faiss.IndexScalarQuantizer(dim, sq8)
+        elif compression == "pq":
+            index = faiss.IndexPQ(dim, config.pq_m_for(dim), config.pq_nbits)
+        else:
+            index = faiss.IndexFlatL2(dim)
+    elif index_type == "hnsw":
+        if compression == "sq8":
+            index = faiss.IndexHNSWSQ(dim, sq8, config.hnsw_m)
+        elif compression == "pq":
+            index = faiss.IndexHNSWPQ(dim, config.pq_m_for(dim), config.hnsw_m, config.pq_nbits)
+        else:
+            index = faiss.IndexHNSWFlat(dim, config.hnsw_m)
+        index.hnsw.efConstruction = config.hnsw_ef_construction
+        index.hnsw.efSearch = config.hnsw_ef_search
+    elif index_type in ("ivf_flat", "ivf_pq"):
+        nlist = config.nlist_for(num_vectors)
+        quantizer = faiss.IndexFlatL2(dim)
+        if compression == "sq8":
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, sq8)
+        elif compression == "pq":
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, config.pq_m_for(dim), config.pq_nbits)
+        else:
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+        index.nprobe = config.ivf_nprobe
+    else:
+        raise ValueError(f"Unknown index type '{index_type}' – expected one of {INDEX_TYPES}")
+
+    if not index.is_trained:
+        index.train(vectors)
+    if num_vectors:
+        index.add(vectors)
+    logger.info("Built %s index (%s) over %s vectors (dim %s)",
+                index_type, compression, num_vectors, dim)
+    return index
+
+
+def index_type_of(index) -> str:
+    """Name of a (possibly deserialised) index's type."""
+    faiss = _faiss()
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+
+def compression_of(index) -> str:
+    """Vector encoding of an index: ``none``, ``sq8`` or ``pq``."""
+    faiss = _faiss()
+    if isinstance(index, faiss.IndexHNSW):
+        index = faiss.downcast_index(index.storage)
+    if isinstance(index, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        return "sq8"
+    if isinstance(index, (faiss.IndexPQ, faiss.IndexIVFPQ)):
+        return "pq"
+    return "none"
+
+
+def prepare_index(index, config: AnnIndexConfig):
+    """Apply the configured query-time knobs to a loaded index."""
+    index_type = index_type_of(index)
+    if index_type == "hnsw":
+        index.hnsw.efSearch = config.hnsw_ef_search
+    elif index_type.startswith("ivf"):
+        index.nprobe = config.ivf_nprobe
+    return index
+
+
+def search_parameters(index, config: AnnIndexConfig, selector=None,
+                      selectivity: float = 1.0) -> Optional[object]:
+    """FAISS search parameters for ``index`` with an optional ID selector.
+
+    ``selectivity`` is the fraction of the index the selector lets through.
+    HNSW and IVF only meet filtered-out vectors after visiting them, so
+    ``efSearch`` and ``nprobe`` grow in inverse proportion to it, otherwise a
+    narrow filter leaves the search with few or no hits.
+
+    Returns ``None`` when the index defaults already apply (flat, no selector).
+    """
+    faiss = _faiss()
+    index_type = index_type_of(index)
+    widen = 1.0 / min(max(selectivity, 1e-6), 1.0)
+    if index_type == "hnsw":
+        ef_search = min(math.ceil(config.hnsw_ef_search * widen), max(index.ntotal, 1))
+        return faiss.SearchParametersHNSW(sel=selector,
+                                          efSearch=max(ef_search, config.hnsw_ef_search))
+    if index_type.startswith("ivf"):
+        nprobe = min(math.ceil(config.ivf_nprobe * widen), index.nlist)
+        return faiss.SearchParametersIVF(sel=selector, nprobe=max(nprobe, 1))
+    if selector is not None:
+        return faiss.SearchParameters(sel=selector)
+    return None
+
+
+def rerank_exact(queries: np.ndarray, distances: np.ndarray, positions: np.ndarray,
+                 exact: Mapping[int, np.ndarray], k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Re-score candidate rows with exact vectors and keep the best ``k``.
+
+    ``exact`` maps positions to full-precision vectors; candidates missing
+    from it keep their approximate distance.
+    """
+    out_d = np.full((len(queries), k), np.inf, dtype=np.float32)
+    out_p = np.full((len(queries), k), -1, dtype=np.int64)
+    for row, query in enumerate(queries):
+        scored = []
+        for distance, position in zip(distances[row], positions[row]):
+            if position == -1:
+                continue
+            vector = exact.get(int(position))
+            if vector is not None:
+                distance = float(np.sum((vector - query) ** 2))
+            scored.append((distance, position))
+        scored.sort()
+        for col, (distance, position) in enumerate(scored[:k]):
+            out_d[row, col] = distance
+            out_p[row, col] = position
+    return out_d, out_p
+
+
+def target_layout(config: AnnIndexConfig, num_vectors: int, index=None) -> Tuple[str, str]:
+    """(index type, compression) for ``num_vectors``, optionally replacing ``index``.
+
+    In ``auto`` mode an existing index only ever moves up the size ladder, so
+    a corpus hovering around a threshold does not flip between types.
+    """
+    target = config.resolve_type(num_vectors)
+    if index is not None and config.index_type == "auto":
+        current = index_type_of(index)
+        ladder = INDEX_TYPES[1:]
+        if ladder.index(target) < ladder.index(current):
+            target = current
+    compression = config.resolve_compression(target, num_vectors)
+    # IVF over PQ codes is what we call ivf_pq, whatever asked for it
+    if target.startswith("ivf"):
+        target = "ivf_pq" if compression == "pq" else "ivf_flat"
+    return target, compression
+
+
+def needs_migration(config: AnnIndexConfig, index, num_vectors: int) -> bool:
+    """Whether compaction should rebuild ``index`` with a different layout."""
+    return (index_type_of(index), compression_of(index)) != target_layout(config, num_vectors, index)
@@ -0,0 +1,364 @@
+"""Structure-aware chunking of policy documents.
+
+Each document is parsed once into a section map – markdown headings, or the
+PDF outline and page breaks – and chunks are cut on those boundaries, so a
+chunk never straddles two sections and knows which section (and PDF page) it
+came from. Subsections are packed together up to the chunk size; sections
+longer than that are split further, with overlap only between pieces of the
+same section. Every chunk records its token count so callers can pack
+results into a context budget.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+
+from .embedding_pipeline import count_tokens
+from .pdf_processor import get_pdf_processor
+
+logger = logging.getLogger(__name__)
+
+_HEADING_RE = re.compile(r"^(#{1,6})[ \t]+(.+?)[ \t#]*$", re.MULTILINE)
+_FENCE_RE = re.compile(r"^(?:```|~~~)", re.MULTILINE)
+# "Section 2.1: Collision Coverage" headings are labelled by their number
+_NUMBERED_RE = re.compile(r"^Section\s+([\w.]+)\s*:", re.IGNORECASE)
+_PAGE_SEPARATOR = "\n\n"
+# Headings this deep or shallower (``#``/``##``) always start a new chunk
+_BREAK_LEVEL = 2
+_SEPARATORS = ["\n\n", "\n", ".", "!", "?", ",", " ", ""]
+
+# (level, title, 1-based page) entries as returned by PyMuPDF's `get_toc()`
+Outline = Sequence[Tuple[int, str, int]]
+
+
+@dataclass(frozen=True)
+class Section:
+    """Span ``[start, end)`` of a document's text under one heading."""
+
+    start: int
+    end: int
+    label: str  # stored as the chunk's `section`
+    title: str = ""  # heading text; empty before the first heading
+    level: int = 0
+    page: Optional[int] = None
+
+
+def _label(title: str) -> str:
+    numbered = _NUMBERED_RE.match(title)
+    return numbered.group(1) if numbered else title
+
+
+def markdown_sections(text: str) -> List[Section]:
+    """Section map of a markdown document, one entry per heading.
+
+    Text before the first heading becomes a "General" section; headings in
+    fenced code blocks are ignored.
+    """
+    fences = [m.start() for m in _FENCE_RE.finditer(text)]
+    fenced = list(zip(fences[::2], fences[1::2] + [len(text)]))
+    headings = [m for m in _HEADING_RE.finditer(text)
+                if not any(start < m.start() < end for start, end in fenced)]
+
+    sections: List[Section] = []
+    if not headings or headings[0].start() > 0:
+        sections.append(Section(0, headings[0].start() if headings else len(text), "General"))
+    for i, heading in enumerate(headings):
+        end = headings[i + 1].start() if i + 1 < len(headings) else len(text)
+        title = heading.group(2).strip()
+        sections.append(Section(heading.start(), end, _label(title), title, len(heading.group(1))))
+    return sections
+
+
+class TextWindow:
+    """Text of a document that arrives piece by piece, sliced by document offset.
+
+    Stands in for the document string when it is read as a stream:
+    ``window[start:end]`` works as on the full text, for offsets not yet
+    released. `release` drops the text before an offset once nothing reads
+    it any more, so only a window of the document is held.
+    """
+
+    def __init__(self) -> None:
+        self.start = 0  # document offset of the first character held
+        self._parts: List[str] = []
+        self._text = ""
+        self._held = 0
+
+    def append(self, text: str) -> None:
+        self._parts.append(text)
+        self._held += len(text)
+
+    @property
+    def end(self) -> int:
+        """Document offset just past the text appended so far."""
+        return self.start + self._held
+
+    @property
+    def size(self) -> int:
+        """Characters currently held."""
+        return self._held
+
+    def _joined(self) -> str:
+        if self._parts:
+            self._text = "".join([self._text, *self._parts])
+            self._parts = []
+        return self._text
+
+    def __getitem__(self, span: slice) -> str:
+        start = self.start if span.start is None else span.start
+        stop = self.end if span.stop is None else span.stop
+        if start < self.start:
+            raise IndexError(f"text before offset {self.start} was released")
+        return self._joined()[start - self.start:stop - self.start]
+
+    def __str__(self) -> str:
+        return self._joined()
+
+    def release(self, offset: int) -> None:
+        """Drop the text before document offset ``offset``."""
+        if offset <= self.start:
+            return
+        self._text = self._joined()[offset - self.start:]
+        self._held = len(self._text)
+        self.start = offset
+
+
+def _page_sections(start: int, end: int, page_number: int, page: str,
+                   entries: List[Tuple[int, str]], current: Optional[Tuple[int, str]]
+                   ) -> Tuple[List[Section], Optional[Tuple[int, str]]]:
+    """Sections of one PDF page spanning ``[start, end)``, and the outline
+    entry still open after it; ``current`` is the one open before it."""
+    # (offset, level, title) of each outline entry found on the page
+    located = sorted((start + max(page.lower().find(title.lower()), 0), level, title)
+                     for level, title in entries)
+    boundaries = sorted({start, *(offset for offset, _, _ in located)})
+    sections: List[Section] = []
+    entry_index = 0
+    for i, boundary in enumerate(boundaries):
+        section_end = boundaries[i + 1] if i + 1 < len(boundaries) else end
+        while entry_index < len(located) and located[entry_index][0] <= boundary:
+            current = located[entry_index][1:]
+            entry_index += 1
+        if current is None:
+            sections.append(Section(boundary, section_end, f"Page {page_number}", page=page_number))
+        else:
+            level, title = current
+            sections.append(Section(boundary, section_end, _label(title), title, level, page_number))
+    return sections, current
+
+
+def iter_pdf_sections(pages: Iterable[str], outline: Outline, window: TextWindow) -> Iterator[Section]:
+    """Section map of a PDF read page by page, appending its text to ``window``.
+
+    Yields the sections of each page once the next page has been read (so
+    the last one ends where the next page starts), in document order. See
+    `pdf_sections`.
+    """
+    entries: Dict[int, List[Tuple[int, str]]] = {}
+    for level, title, page_number in outline:
+        entries.setdefault(page_number, []).append((level, title.strip()))
+    current: Optional[Tuple[int, str]] = None
+    previous: Optional[Tuple[int, int, str]] = None  # (page number, start, text)
+    for page_number, page in enumerate(pages, start=1):
+        if previous is not None:
+            window.append(_PAGE_SEPARATOR)
+        start = window.end
+        window.append(page)
+        if previous is not None:
+            sections, current = _page_sections(previous[1], start, previous[0], previous[2],
+                                               entries.get(previous[0], []), current)
+            yield from sections
+        previous = (page_number, start, page)
+    if previous is not None:
+        sections, current = _page_sections(previous[1], window.end, previous[0], previous[2],
+                                           entries.get(previous[0], []), current)
+        yield from sections
+
+
+def pdf_sections(pages: Sequence[str], outline: Outline = ()) -> Tuple[str, List[Section]]:
+    """Joined text and section map of a PDF.
+
+    Sections break at every page and at every outline entry, which is
+    located by its title on its page (or the top of the page). Without an
+    outline, pages are labelled "Page N".
+    """
+    window = TextWindow()
+    sections = list(iter_pdf_sections(pages, outline, window))
+    return str(window), sections
+
+
+class DocumentChunker:
+    """Split documents into section-aligned chunks with token counts."""
+
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200, min_chunk_size: int = 200):
+        self.chunk_size = chunk_size
+        self.min_chunk_size = min_chunk_size
+        # Only used inside sections longer than `chunk_size`
+        self._splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=len,
+            separators=_SEPARATORS,
+        )
+
+    @classmethod
+    def from_settings(cls) -> "DocumentChunker":
+        from app.core.config import get_settings
+        settings = get_settings()
+        return cls(chunk_size=settings.policy_chunk_size,
+                   chunk_overlap=settings.policy_chunk_overlap,
+                   min_chunk_size=settings.policy_chunk_min_size)
+
+    # ------------------------------------------------------------------
+    def load(self, path: str | Path) -> List[Document]:
+        """Chunk a markdown or PDF file; returns ``[]`` for unusable files."""
+        parsed = self.parse_stream(path)
+        return list(self.split_stream(*parsed)) if parsed else []
+
+    @staticmethod
+    def parse(path: str | Path, extracted: Optional[Dict[str, Any]] = None
+              ) -> Optional[Tuple[str, List[Section], Dict[str, Any]]]:
+        """Text, section map and file metadata of a markdown or PDF file.
+
+        ``extracted`` is the PDF's `PDFProcessor.extract_pages` result when it
+        was already extracted (e.g. as part of a batch). Returns ``None`` for
+        unsupported or invalid files.
+        """
+        path = Path(path)
+        suffix = path.suffix.lower()
+        if suffix == ".md":
+            text = path.read_text(encoding="utf-8")
+            return text, markdown_sections(text), {"source": str(path)}
+        if suffix == ".pdf":
+            if extracted is None:
+                pdf_processor = get_pdf_processor()
+                if not pdf_processor.is_valid_pdf(path):
+                    logger.error("Invalid PDF file: %s", path)
+                    return None
+                extracted = pdf_processor.extract_pages(path)
+            text, sections = pdf_sections(extracted["pages"], extracted["outline"])
+            return text, sections, {"source": str(path), **extracted["metadata"]}
+        logger.error("Unsupported file type: %s", suffix)
+        return None
+
+    @staticmethod
+    def parse_stream(path: str | Path, extracted: Optional[Dict[str, Any]] = None
+                     ) -> Optional[Tuple[TextWindow, Iterator[Section], Dict[str, Any]]]:
+        """`parse` for reading a document as a stream, for `split_stream`.
+
+        Returns the text window, an iterator over the section map that fills
+        it, and the file metadata. PDF pages are extracted lazily
+        (`PDFProcessor.iter_pages`) unless ``extracted`` already holds them.
+        """
+        path = Path(path)
+        if path.suffix.lower() == ".pdf":
+            if extracted is None:
+                pdf_processor = get_pdf_processor()
+                if not pdf_processor.is_valid_pdf(path):
+                    logger.error("Invalid PDF file: %s", path)
+                    return None
+                extracted = {**pdf_processor.extract_outline(path), "pages": pdf_processor.iter_pages(path)}
+            window = TextWindow()
+            return (window, iter_pdf_sections(extracted["pages"], extracted["outline"], window),
+                    {"source": str(path), **extracted["metadata"]})
+        parsed = DocumentChunker.parse(path)
+        if parsed is None:
+            return None
+        text, sections, metadata = parsed
+        window = TextWindow()
+        window.append(text)
+        return window, iter(sections), metadata
+
+    def split(self, text: str, sections: List[Section], metadata: Dict[str, Any]) -> List[Document]:
+        """Cut ``text`` into chunks along ``sections``.
+
+        Each chunk carries ``metadata`` plus ``section``, ``section_title``,
+        ``token_count`` and, for PDFs, the ``page`` it starts on (and
+        ``page_end`` when it runs onto later pages).
+        """
+        return [chunk for group, label in self._iter_groups(text, sections)
+                for chunk in self._chunks(text, group, label, metadata)]
+
+    def split_stream(self, window: TextWindow, sections: Iterable[Section], metadata: Dict[str, Any],
+                     on_section: Optional[Callable[[TextWindow, Section], None]] = None
+                     ) -> Iterator[Document]:
+        """`split` for a document read as a stream (see `parse_stream`).
+
+        Chunks are yielded as soon as their sections are complete, and the
+        window's text is released behind them, so only the sections of the
+        chunk being cut and one page of look-ahead are held in memory.
+        ``on_section`` sees every section while its text is still held.
+        """
+        def observed() -> Iterator[Section]:
+            for section in sections:
+                on_section(window, section)
+                yield section
+
+        for group, label in self._iter_groups(window, observed() if on_section else sections):
+            yield from self._chunks(window, group, label, metadata)
+            window.release(group[-1].end)
+
+    def _chunks(self, text: str | TextWindow, group: List[Section], label: Section,
+                metadata: Dict[str, Any]) -> Iterator[Document]:
+        first, last = group[0], group[-1]
+        body = text[first.start:last.end].strip()
+        pieces = [body] if len(body) <= self.chunk_size else self._splitter.split_text(body)
+        for piece in pieces:
+            piece_metadata = {**metadata, "section": label.label, "section_title": label.title,
+                              "token_count": count_tokens(piece)}
+            if first.page is not None:
+                piece_metadata["page"] = first.page
+                if last.page != first.page:
+                    piece_metadata["page_end"] = last.page
+            yield Document(page_content=piece, metadata=piece_metadata)
+
+    def _iter_groups(self, text: str | TextWindow, sections: Iterable[Section]
+                     ) -> Iterator[Tuple[List[Section], Section]]:
+        """Sections of each chunk, and the section that labels it.
+
+        A heading at ``_BREAK_LEVEL`` or above always starts a new chunk;
+        deeper subsections are packed together while they fit. A group still
+        shorter than ``min_chunk_size`` – typically a heading with a line of
+        intro – also absorbs the sections nested under it, whatever their depth.
+        Each group is yielded once the section after it has been seen.
+        """
+        open_headings: List[Section] = []
+        group: List[Section] = []
+        enclosing: List[Section] = []  # headings around group[0]
+        for section in sections:
+            if section.level:
+                while open_headings and open_headings[-1].level >= section.level:
+                    open_headings.pop()
+            if text[section.start:section.end].strip():
+                if group:
+                    fits = section.end - group[0].start <= self.chunk_size
+                    short = group[-1].end - group[0].start < self.min_chunk_size
+                    child = section.level > group[0].level
+                    if not (fits and (section.level > _BREAK_LEVEL or (short and child))):
+                        yield group, self._label_section(group, enclosing)
+                        group = []
+                if not group:
+                    enclosing = list(open_headings)
+                group.append(section)
+            if section.level:
+                open_headings.append(section)
+        if group:
+            yield group, self._label_section(group, enclosing)
+
+    @staticmethod
+    def _label_section(group: List[Section], enclosing: List[Section]) -> Section:
+        """The group's first section if it contains the rest, else their common parent."""
+        first = group[0]
+        if all(section.level > first.level for section in group[1:]):
+            return first
+        level = min(section.level for section in group)
+        for heading in reversed(enclosing):
+            if heading.level < level:
+                return heading
+        return first
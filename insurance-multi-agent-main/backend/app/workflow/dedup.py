@@ -0,0 +1,143 @@
+"""Near-duplicate detection for policy chunks (MinHash + LSH).
+
+Policies repeat boilerplate – definitions, claims procedures, general
+conditions – across documents. A chunk is summarised by a MinHash signature
+of its word 3-shingles; signatures are split into LSH bands so candidates are
+found by bucket lookup instead of pairwise comparison, and a candidate counts
+as a duplicate when the estimated Jaccard similarity reaches the threshold.
+
+Duplicates are stored and embedded once. The kept chunk lists every
+occurrence – its own first – in its ``sources`` metadata, so document
+lookups, partition filters and search results still see each source.
+"""
+from __future__ import annotations
+
+import hashlib
+import zlib
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from .lexical_index import tokenize
+from .partitions import partition_keys
+
+# 128 permutations keep the similarity estimate within about ±0.03 near 0.9
+_NUM_PERM = 128
+# 16 bands of 8 rows: pairs above ~0.7 similarity usually share a bucket
+_BANDS = 16
+_ROWS = _NUM_PERM // _BANDS
+_SHINGLE = 3
+# Prime just above 2**32; (a * x + b) stays below 2**64 for 32-bit a, x and b
+_PRIME = np.uint64(4294967311)
+_rng = np.random.default_rng(20240611)
+_A = _rng.integers(1, 2**32, _NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 2**32, _NUM_PERM, dtype=np.uint64)
+
+# Per-occurrence metadata kept in ``sources``
+SOURCE_FIELDS = ("document_id", "source", "policy_type", "section", "section_title", "page",
+                 "category", "language", "file_type")
+
+
+def signature(text: str) -> np.ndarray:
+    """MinHash signature of the text's word shingles."""
+    tokens = tokenize(text)
+    shingles = {" ".join(tokens[i:i + _SHINGLE])
+                for i in range(max(1, len(tokens) - _SHINGLE + 1))}
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles),
+                         dtype=np.uint64, count=len(shingles))
+    return ((hashes[:, None] * _A + _B) % _PRIME).min(axis=0)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(a == b))
+
+
+def lsh_buckets(sig: np.ndarray) -> List[int]:
+    """One signed 64-bit bucket key per band (fits an SQLite INTEGER)."""
+    return [
+        int.from_bytes(hashlib.blake2b(bytes([band]) + sig[band * _ROWS:(band + 1) * _ROWS].tobytes(),
+                                       digest_size=8).digest(), "little", signed=True)
+        for band in range(_BANDS)
+    ]
+
+
+def cluster(texts: Sequence[str], threshold: float) -> List[int]:
+    """Index of the first near-duplicate of each text (itself if none)."""
+    signatures = [signature(text) for text in texts]
+    buckets: Dict[int, List[int]] = {}
+    out: List[int] = []
+    for i, sig in enumerate(signatures):
+        keys = lsh_buckets(sig)
+        match = best_match(sig, {j for key in keys for j in buckets.get(key, ())},
+                           signatures.__getitem__, threshold)
+        out.append(i if match is None else match)
+        if match is None:
+            for key in keys:
+                buckets.setdefault(key, []).append(i)
+    return out
+
+
+def best_match(sig: np.ndarray, candidates, signature_of: Callable[[Any], np.ndarray],
+               threshold: float) -> Optional[Any]:
+    """Most similar candidate at or above ``threshold`` (ties: lowest key)."""
+    best, best_score = None, -1.0
+    for candidate in sorted(candidates):
+        score = similarity(sig, signature_of(candidate))
+        if score >= threshold and score > best_score:
+            best, best_score = candidate, score
+    return best
+
+
+# Sources -------------------------------------------------------------
+def source_of(metadata: Mapping[str, Any]) -> Dict[str, Any]:
+    return {field: metadata[field] for field in SOURCE_FIELDS if metadata.get(field) is not None}
+
+
+def sources_of(metadata: Mapping[str, Any]) -> List[Dict[str, Any]]:
+    """Every occurrence of a chunk; a chunk without duplicates is its own source."""
+    return list(metadata.get("sources") or [source_of(metadata)])
+
+
+def with_sources(metadata: Mapping[str, Any], others: Sequence[Mapping[str, Any]]) -> Dict[str, Any]:
+    """Metadata of a kept chunk extended with the sources of its duplicates."""
+    sources = sources_of(metadata)
+    for other in others:
+        for source in sources_of(other):
+            if source not in sources:
+                sources.append(source)
+    merged = dict(metadata)
+    if len(sources) > 1:
+        merged["sources"] = sources
+    return merged
+
+
+def without_document(metadata: Mapping[str, Any], document_id: str) -> Optional[Dict[str, Any]]:
+    """Metadata after the document's occurrences are gone; ``None`` if none remain.
+
+    When the chunk's own source is removed, the next source takes its place.
+    A chunk without ``sources`` only ever belonged to the one document.
+    """
+    if not metadata.get("sources"):
+        return None
+    remaining = [s for s in sources_of(metadata) if s.get("document_id") != document_id]
+    if not remaining:
+        return None
+    out = {k: v for k, v in metadata.items() if k != "sources"}
+    if metadata.get("document_id") == document_id:
+        out = {k: v for k, v in out.items() if k not in SOURCE_FIELDS}
+        out.update(remaining[0])
+    if len(remaining) > 1:
+        out["sources"] = remaining
+    return out
+
+
+def source_for(metadata: Mapping[str, Any], filters: Optional[Mapping[str, List[str]]]) -> Dict[str, Any]:
+    """The occurrence to present: the first source inside normalised ``filters``."""
+    sources = sources_of(metadata)
+    for source in sources:
+        keys = set(partition_keys({"language": metadata.get("language"), **source}))
+        if all(any((field, value) in keys for value in values)
+               for field, values in (filters or {}).items()):
+            return source
+    return sources[0]
@@ -0,0 +1,92 @@
+"""Diversity re-ranking of policy search candidates.
+
+Maximal marginal relevance (MMR) picks results one at a time, trading each
+candidate's relevance against its similarity to the results already picked,
+so overlapping chunks of one section do not fill the whole top-k. Per
+document and per section caps bound how many results a single source can
+contribute. Everything works on the vectors stored in the index; nothing is
+re-embedded.
+"""
+from __future__ import annotations
+
+from collections import Counter
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class Diversity(NamedTuple):
+    """Search-time diversity options; ``None`` leaves an option off."""
+
+    # 1.0 ranks by relevance only, 0.0 by novelty only
+    mmr_lambda: Optional[float] = None
+    max_per_document: Optional[int] = None
+    max_per_section: Optional[int] = None
+
+    @property
+    def active(self) -> bool:
+        return any(option is not None for option in self)
+
+
+def _capped(source: Tuple[Any, Any], per_document: Counter, per_section: Counter,
+            diversity: Diversity) -> bool:
+    return ((diversity.max_per_document is not None
+             and per_document[source[0]] >= diversity.max_per_document)
+            or (diversity.max_per_section is not None
+                and per_section[source] >= diversity.max_per_section))
+
+
+def mmr_select(relevance: np.ndarray, vectors: Optional[np.ndarray], k: int,
+               sources: Sequence[Tuple[Any, Any]], diversity: Diversity) -> List[int]:
+    """Indices of up to ``k`` candidates, in selection order.
+
+    ``relevance`` scores the candidates against the query, ``vectors`` are
+    their stored embeddings (only needed with ``mmr_lambda``) and ``sources``
+    their ``(document_id, section)``.
+    """
+    relevance = np.asarray(relevance, dtype=np.float64)
+    use_mmr = diversity.mmr_lambda is not None and vectors is not None and len(vectors)
+    if use_mmr:
+        unit = np.asarray(vectors, dtype=np.float64)
+        unit = unit / np.maximum(np.linalg.norm(unit, axis=1, keepdims=True), 1e-12)
+    # Highest cosine similarity of each candidate to anything selected so far
+    redundancy = np.full(len(relevance), -1.0)
+    available = np.ones(len(relevance), dtype=bool)
+    per_document: Counter = Counter()
+    per_section: Counter = Counter()
+    chosen: List[int] = []
+    while len(chosen) < k:
+        for i in np.flatnonzero(available):
+            if _capped(sources[i], per_document, per_section, diversity):
+                available[i] = False
+        if not available.any():
+            break
+        if use_mmr and chosen:
+            score = diversity.mmr_lambda * relevance - (1 - diversity.mmr_lambda) * redundancy
+        else:
+            score = relevance
+        best = int(np.argmax(np.where(available, score, -np.inf)))
+        chosen.append(best)
+        available[best] = False
+        per_document[sources[best][0]] += 1
+        per_section[sources[best]] += 1
+        if use_mmr:
+            redundancy = np.maximum(redundancy, unit @ unit[best])
+    return chosen
+
+
+def cap_results(results: List[Dict[str, Any]], diversity: Diversity) -> List[Dict[str, Any]]:
+    """Drop results beyond the per-document/section caps, keeping order."""
+    if diversity.max_per_document is None and diversity.max_per_section is None:
+        return results
+    per_document: Counter = Counter()
+    per_section: Counter = Counter()
+    out = []
+    for result in results:
+        source = (result.get("document_id"), result.get("section"))
+        if _capped(source, per_document, per_section, diversity):
+            continue
+        per_document[source[0]] += 1
+        per_section[source] += 1
+        out.append(result)
+    return out
@@ -0,0 +1,260 @@
+"""Parallel, batched embedding pipeline for policy index builds.
+
+Chunks are packed into token-bounded batches and embedded with a bounded
+number of concurrent requests, throttled to the deployment's request and
+token rate limits. Finished batches are yielded as they arrive so the caller
+can stream vectors into the index, and progress (chunks done/total, ETA) is
+published through an `IngestProgress` object.
+"""
+from __future__ import annotations
+
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:  # pragma: no cover – offline / tiktoken unavailable
+        logger.warning("tiktoken unavailable – estimating token counts: %s", e)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Token count under the embedding model's tokenizer (estimated if unavailable)."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+@dataclass
+class IngestProgress:
+    """Thread-safe progress of an index build, read by the index status API."""
+
+    stage: str = "idle"  # idle, embedding, saving, done, error
+    total: int = 0
+    done: int = 0
+    batches_total: int = 0
+    batches_done: int = 0
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def start(self, total: int, batches_total: int) -> None:
+        with self._lock:
+            self.stage = "embedding"
+            self.total, self.done = total, 0
+            self.batches_total, self.batches_done = batches_total, 0
+            self.started_at, self.finished_at, self.error = datetime.now(), None, None
+
+    def advance(self, chunks: int) -> None:
+        with self._lock:
+            self.done += chunks
+            self.batches_done += 1
+
+    def set_stage(self, stage: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            self.stage = stage
+            self.error = error
+            if stage in ("done", "error"):
+                self.finished_at = datetime.now()
+
+    @property
+    def is_running(self) -> bool:
+        return self.stage in ("embedding", "saving")
+
+    def eta_seconds(self) -> Optional[float]:
+        """Remaining time extrapolated from the throughput so far."""
+        with self._lock:
+            if not self.started_at or not self.done or self.done >= self.total:
+                return None
+            elapsed = (datetime.now() - self.started_at).total_seconds()
+            return round(elapsed / self.done * (self.total - self.done), 1)
+
+    def as_dict(self) -> Dict[str, Any]:
+        eta = self.eta_seconds()
+        with self._lock:
+            return {
+                "stage": self.stage,
+                "chunks_done": self.done,
+                "chunks_total": self.total,
+                "batches_done": self.batches_done,
+                "batches_total": self.batches_total,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "eta_seconds": eta,
+                "error": self.error,
+            }
+
+
+class RateLimiter:
+    """Token-bucket limiter for requests/minute and tokens/minute (0 = unlimited)."""
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0):
+        self.rpm = requests_per_minute
+        self.tpm = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int) -> None:
+        if not self.rpm and not self.tpm:
+            return
+        # A single batch larger than the whole bucket can never fit; clamp it
+        tokens = min(tokens, self.tpm) if self.tpm else tokens
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                elapsed = now - self._updated
+                self._updated = now
+                if self.rpm:
+                    self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+                if self.tpm:
+                    self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+                need_req = 1 - self._requests if self.rpm else 0
+                need_tok = tokens - self._tokens if self.tpm else 0
+                if need_req <= 0 and need_tok <= 0:
+                    if self.rpm:
+                        self._requests -= 1
+                    if self.tpm:
+                        self._tokens -= tokens
+                    return
+                wait_s = max(need_req * 60 / self.rpm if self.rpm else 0,
+                             need_tok * 60 / self.tpm if self.tpm else 0)
+            time.sleep(min(wait_s, 5.0))
+
+
+class EmbeddingPipeline:
+    """Embed texts in token-bounded batches with bounded concurrency."""
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        max_batch_tokens: int = 16_000,
+        max_batch_size: int = 256,
+        max_concurrency: int = 4,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        max_retries: int = 3,
+    ):
+        self.embeddings = embeddings
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+
+    @classmethod
+    def from_settings(cls, embeddings: Embeddings) -> "EmbeddingPipeline":
+        from app.core.config import get_settings
+        settings = get_settings()
+        return cls(
+            embeddings,
+            max_batch_tokens=settings.embedding_batch_max_tokens,
+            max_batch_size=settings.embedding_batch_max_size,
+            max_concurrency=settings.embedding_max_concurrency,
+            requests_per_minute=settings.embedding_requests_per_minute,
+            tokens_per_minute=settings.embedding_tokens_per_minute,
+        )
+
+    # ------------------------------------------------------------------
+    def pack_batches(self, texts: List[str]) -> List[Tuple[List[int], int]]:
+        """Greedily pack text indices into batches under the token/size budget.
+
+        Returns:
+            List of ``(indices, token_count)`` tuples in input order
+        """
+        batches: List[Tuple[List[int], int]] = []
+        current: List[int] = []
+        current_tokens = 0
+        for i, text in enumerate(texts):
+            tokens = count_tokens(text)
+            if current and (current_tokens + tokens > self.max_batch_tokens
+                            or len(current) >= self.max_batch_size):
+                batches.append((current, current_tokens))
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append((current, current_tokens))
+        return batches
+
+    def _embed_batch(self, texts: List[str], tokens: int) -> np.ndarray:
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire(tokens)
+            try:
+                return np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    raise
+                backoff = 2 ** attempt
+                logger.warning("Embedding batch failed (attempt %s/%s), retrying in %ss: %s",
+                               attempt + 1, self.max_retries + 1, backoff, e)
+                time.sleep(backoff)
+        raise RuntimeError("unreachable")  # pragma: no cover
+
+    # ------------------------------------------------------------------
+    def run(self, texts: List[str], progress: Optional[IngestProgress] = None
+            ) -> Iterator[Tuple[List[int], np.ndarray]]:
+        """Yield ``(indices, vectors)`` per batch in completion order.
+
+        At most ``max_concurrency`` requests are in flight; the caller consumes
+        results on its own thread, so index insertion needs no extra locking.
+        """
+        batches = self.pack_batches(texts)
+        if progress:
+            progress.start(len(texts), len(batches))
+        if not batches:
+            return
+
+        pending = iter(batches)
+        in_flight: Dict[Future, List[int]] = {}
+        with ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                thread_name_prefix="embed") as pool:
+            def submit_next() -> None:
+                batch = next(pending, None)
+                if batch is not None:
+                    indices, tokens = batch
+                    future = pool.submit(self._embed_batch, [texts[i] for i in indices], tokens)
+                    in_flight[future] = indices
+
+            for _ in range(self.max_concurrency):
+                submit_next()
+            try:
+                while in_flight:
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        indices = in_flight.pop(future)
+                        vectors = future.result()
+                        if progress:
+                            progress.advance(len(indices))
+                        yield indices, vectors
+                        submit_next()
+            finally:
+                for future in in_flight:
+                    future.cancel()
+
+    def embed(self, texts: List[str], progress: Optional[IngestProgress] = None) -> np.ndarray:
+        """Embed all texts and return vectors in input order."""
+        out: Optional[np.ndarray] = None
+        for indices, vectors in self.run(texts, progress):
+            if out is None:
+                out = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            out[indices] = vectors
+        return out if out is not None else np.empty((0, 0), dtype=np.float32)
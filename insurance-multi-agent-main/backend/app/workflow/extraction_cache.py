@@ -0,0 +1,252 @@
+"""Persistent cache of extracted PDF text, keyed by file content.
+
+A PDF used to be parsed up to three times per upload – validation,
+validation again when indexing, then extraction – and every index rebuild
+parsed every PDF again. Extractions are now stored in a SQLite file by the
+SHA-256 of the file: per-page text (compressed), outline, page count and
+metadata. Whoever parses a file first fills the cache; validation,
+indexing and rebuilds of an unchanged file read it back instead.
+
+Pages are written and read in batches, so a large PDF streamed through
+`PDFProcessor.iter_pages` is cached without ever being held in memory. An
+entry only counts once all its pages are stored. Entries record the
+PyMuPDF version that produced them, so an upgrade re-extracts. The least
+recently used entries are dropped beyond the size limit.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = Path(__file__).resolve().parent / "data" / "pdf_extraction_cache.sqlite"
+EXTRACTOR = f"pymupdf-{fitz.VersionBind}"
+# Pages per write/read round trip
+_PAGE_BATCH = 64
+# Unfinished entries older than this were abandoned by their writer
+_STALE_SECONDS = 3600
+_DIGEST_MEMO_SIZE = 1024
+
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS pdf_documents (
+        sha256 TEXT PRIMARY KEY, extractor TEXT NOT NULL, complete INTEGER NOT NULL,
+        page_count INTEGER NOT NULL, outline TEXT NOT NULL, metadata TEXT NOT NULL,
+        bytes INTEGER NOT NULL, last_used REAL NOT NULL)""",
+    """CREATE TABLE IF NOT EXISTS pdf_pages (
+        sha256 TEXT NOT NULL, page INTEGER NOT NULL, text BLOB NOT NULL,
+        PRIMARY KEY (sha256, page))""",
+)
+
+
+def file_digest(path: str | Path) -> str:
+    """SHA-256 of a file's content."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+class PDFExtractionCache:
+    """Extracted pages, outline and metadata of PDFs by content hash (thread-safe)."""
+
+    def __init__(self, path: str | Path = DEFAULT_PATH, max_bytes: int = 512 * 1024 * 1024):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # (path, inode, size, mtime) -> digest, so a file is hashed once until it changes
+        self._digests: "OrderedDict[Tuple[str, int, int, int], str]" = OrderedDict()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Shared by every API worker: WAL lets readers run alongside a writer
+        self._db = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        for statement in _SCHEMA:
+            self._db.execute(statement)
+        self._db.commit()
+
+    @classmethod
+    def from_settings(cls) -> Optional["PDFExtractionCache"]:
+        """The configured cache, or ``None`` when it is disabled or unusable."""
+        from app.core.config import get_settings
+
+        max_mb = get_settings().pdf_extraction_cache_max_mb
+        if max_mb <= 0:
+            return None
+        try:
+            return cls(DEFAULT_PATH, max_bytes=max_mb * 1024 * 1024)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("PDF extraction cache disabled: %s", e)
+            return None
+
+    # ------------------------------------------------------------------
+    def digest(self, path: str | Path) -> str:
+        """Content hash of ``path``, re-computed only when the file changes."""
+        stat = os.stat(path)
+        key = (str(Path(path).resolve()), stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            digest = self._digests.get(key)
+            if digest is not None:
+                self._digests.move_to_end(key)
+                return digest
+        digest = file_digest(path)
+        with self._lock:
+            self._digests[key] = digest
+            while len(self._digests) > _DIGEST_MEMO_SIZE:
+                self._digests.popitem(last=False)
+        return digest
+
+    def info(self, digest: str) -> Optional[Dict[str, Any]]:
+        """Page count, outline and raw metadata of a complete entry, else ``None``."""
+        with self._lock:
+            try:
+                row = self._db.execute(
+                    "SELECT page_count, outline, metadata FROM pdf_documents "
+                    "WHERE sha256 = ? AND extractor = ? AND complete = 1", (digest, EXTRACTOR)).fetchone()
+                if row is not None:
+                    self._db.execute("UPDATE pdf_documents SET last_used = ? WHERE sha256 = ?",
+                                     (time.time(), digest))
+                    self._db.commit()
+            except sqlite3.Error as e:
+                self._db.rollback()
+                logger.warning("Could not read PDF extraction cache: %s", e)
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return {"page_count": row[0],
+                "outline": [tuple(entry) for entry in json.loads(row[1])],
+                "metadata": json.loads(row[2])}
+
+    def iter_pages(self, digest: str, page_count: int, start: int = 0) -> Iterator[str]:
+        """Text of pages ``start`` to ``page_count - 1``, read a batch at a time.
+
+        Raises `LookupError` at a page that is missing.
+        """
+        while start < page_count:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT page, text FROM pdf_pages WHERE sha256 = ? AND page >= ? AND page < ? "
+                    "ORDER BY page", (digest, start, min(start + _PAGE_BATCH, page_count))).fetchall()
+            if not rows:
+                raise LookupError(f"page {start} of cached PDF {digest[:12]} is missing")
+            for page, text in rows:
+                if page != start:
+                    raise LookupError(f"page {start} of cached PDF {digest[:12]} is missing")
+                start += 1
+                yield zlib.decompress(text).decode("utf-8")
+
+    # ------------------------------------------------------------------
+    def put(self, digest: str, info: Dict[str, Any], pages: List[str]) -> None:
+        """Store a whole extraction (see `writer` for one arriving page by page)."""
+        writer = self.writer(digest, info)
+        for text in pages:
+            writer.add(text)
+        writer.finish()
+
+    def writer(self, digest: str, info: Dict[str, Any]) -> "_EntryWriter":
+        """Store an extraction page by page; it counts once `finish` is called."""
+        return _EntryWriter(self, digest, info)
+
+    def _execute(self, *statements: Tuple[str, Any], many: bool = False) -> bool:
+        """Run write statements in one transaction; a failure only costs the cache."""
+        with self._lock:
+            try:
+                for sql, params in statements:
+                    (self._db.executemany if many else self._db.execute)(sql, params)
+                self._db.commit()
+                return True
+            except sqlite3.Error as e:
+                self._db.rollback()
+                logger.warning("Could not write PDF extraction cache: %s", e)
+                return False
+
+    def prune(self) -> None:
+        """Drop abandoned entries, then least recently used ones beyond ``max_bytes``."""
+        with self._lock:
+            try:
+                stale = [row[0] for row in self._db.execute(
+                    "SELECT sha256 FROM pdf_documents WHERE complete = 0 AND last_used < ?",
+                    (time.time() - _STALE_SECONDS,))]
+                total = 0
+                for digest, size in self._db.execute(
+                        "SELECT sha256, bytes FROM pdf_documents WHERE complete = 1 "
+                        "ORDER BY last_used DESC").fetchall():
+                    total += size
+                    if total > self.max_bytes:
+                        stale.append(digest)
+                for digest in stale:
+                    self._db.execute("DELETE FROM pdf_pages WHERE sha256 = ?", (digest,))
+                    self._db.execute("DELETE FROM pdf_documents WHERE sha256 = ?", (digest,))
+                self._db.commit()
+            except sqlite3.Error as e:
+                self._db.rollback()
+                logger.warning("Could not prune PDF extraction cache: %s", e)
+                return
+        if stale:
+            logger.info("Dropped %s entries from the PDF extraction cache", len(stale))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM pdf_documents WHERE complete = 1").fetchone()
+            return {"entries": entries, "bytes": size, "hits": self.hits, "misses": self.misses}
+
+
+class _EntryWriter:
+    """One extraction being stored; pages are flushed a batch at a time."""
+
+    def __init__(self, cache: PDFExtractionCache, digest: str, info: Dict[str, Any]):
+        self.cache = cache
+        self.digest = digest
+        self.info = info
+        self.page = 0
+        self.bytes = 0
+        self._batch: List[Tuple[str, int, bytes]] = []
+        # A previous, unfinished attempt's pages are overwritten page by page
+        self.ok = cache._execute((
+            "INSERT OR REPLACE INTO pdf_documents "
+            "(sha256, extractor, complete, page_count, outline, metadata, bytes, last_used) "
+            "VALUES (?, ?, 0, ?, ?, ?, 0, ?)",
+            (digest, EXTRACTOR, info["page_count"], json.dumps(info["outline"]),
+             json.dumps(info["metadata"]), time.time())))
+
+    def add(self, text: str) -> None:
+        if not self.ok:
+            return
+        compressed = zlib.compress(text.encode("utf-8"), 1)
+        self._batch.append((self.digest, self.page, compressed))
+        self.page += 1
+        self.bytes += len(compressed)
+        if len(self._batch) >= _PAGE_BATCH:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._batch:
+            self.ok = self.cache._execute(
+                ("INSERT OR REPLACE INTO pdf_pages (sha256, page, text) VALUES (?, ?, ?)", self._batch),
+                many=True)
+            self._batch = []
+
+    def finish(self) -> None:
+        """Mark the entry complete; it is ignored unless every page was added."""
+        self._flush()
+        if not self.ok or self.page != self.info["page_count"]:
+            return
+        self.cache._execute(("UPDATE pdf_documents SET complete = 1, bytes = ?, last_used = ? "
+                             "WHERE sha256 = ?", (self.bytes, time.time(), self.digest)))
+        self.cache.prune()
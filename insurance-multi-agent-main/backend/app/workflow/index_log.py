@@ -0,0 +1,129 @@
+"""Append-only delta log for incremental policy index maintenance.
+
+Every document added to or removed from the policy index is recorded as one
+JSON line in the log of the current index version instead of rewriting the
+full index. On load the snapshot is opened and the log replayed on top of
+it; other worker processes tail the same log to pick up changes. Once the
+log grows large relative to the snapshot it is folded into a new version
+(compaction) by `PolicyVectorSearch`.
+"""
+from __future__ import annotations
+
+import base64
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DeltaRecord:
+    """A single add/delete operation recorded in the delta log."""
+
+    op: str  # "add" or "delete"
+    document_id: str
+    ids: List[str]
+    texts: List[str] = field(default_factory=list)
+    metadatas: List[Dict[str, Any]] = field(default_factory=list)
+    vectors: Optional[np.ndarray] = None
+
+    def to_json(self) -> str:
+        payload: Dict[str, Any] = {
+            "op": self.op,
+            "document_id": self.document_id,
+            "ids": self.ids,
+        }
+        if self.op == "add":
+            vectors = np.ascontiguousarray(self.vectors, dtype=np.float32)
+            payload.update(
+                texts=self.texts,
+                metadatas=self.metadatas,
+                dim=int(vectors.shape[1]) if vectors.size else 0,
+                vectors=base64.b64encode(vectors.tobytes()).decode("ascii"),
+            )
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+    @classmethod
+    def from_json(cls, line: str) -> "DeltaRecord":
+        payload = json.loads(line)
+        vectors = None
+        if payload["op"] == "add":
+            raw = base64.b64decode(payload.get("vectors", ""))
+            dim = payload.get("dim") or 0
+            vectors = np.frombuffer(raw, dtype=np.float32)
+            vectors = vectors.reshape(-1, dim) if dim else vectors.reshape(0, 0)
+        return cls(
+            op=payload["op"],
+            document_id=payload["document_id"],
+            ids=list(payload["ids"]),
+            texts=list(payload.get("texts", [])),
+            metadatas=list(payload.get("metadatas", [])),
+            vectors=vectors,
+        )
+
+
+class IndexDeltaLog:
+    """Append-only JSONL log of index changes since a version's snapshot.
+
+    Readers track a byte offset and only consume complete lines, so a log can
+    be tailed while another process appends to it. Replay is idempotent.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+
+    # ------------------------------------------------------------------
+    def append(self, *records: DeltaRecord) -> None:
+        """Append records and fsync so acknowledged changes survive a crash.
+
+        Callers serialise appends across processes (see `IndexStore.lock`).
+        """
+        if not records:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = "".join(record.to_json() + "\n" for record in records)
+        with open(self.path, "a+b") as f:
+            # Terminate a torn final write from a crash so it stays one bad line
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    data = "\n" + data
+            f.write(data.encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def read_from(self, offset: int = 0) -> Tuple[List[DeltaRecord], int]:
+        """Records after byte ``offset`` and the offset to continue from.
+
+        A final line without its newline is still being written and is left
+        for the next read.
+        """
+        if not self.path.exists():
+            return [], offset
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        records: List[DeltaRecord] = []
+        for line in data[:end].decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(DeltaRecord.from_json(line))
+            except (ValueError, KeyError) as e:
+                logger.warning("Ignoring unreadable delta log entry in %s: %s", self.path, e)
+        return records, offset + end
+
+    def replay(self) -> Iterator[DeltaRecord]:
+        """Yield every complete record in the log."""
+        yield from self.read_from(0)[0]
+
+    # ------------------------------------------------------------------
+    def size_bytes(self) -> int:
+        return self.path.stat().st_size if self.path.exists() else 0
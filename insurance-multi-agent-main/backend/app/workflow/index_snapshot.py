@@ -0,0 +1,307 @@
+"""Pickle-free, memory-mappable on-disk format for the policy index.
+
+A snapshot is three files written once and never modified:
+
+* ``index.faiss``   – native FAISS index; opened memory-mapped, so loading
+  is near-instant and the page cache is shared by every worker process.
+* ``vectors.npy``   – exact float32 vectors by position (memory-mapped), for
+  re-ranking compressed indexes and for rebuilding during compaction.
+* ``chunks.sqlite`` – chunk text and metadata, the document → chunk map,
+  metadata partitions, BM25 postings and near-duplicate (LSH) buckets, all
+  read lazily by position, id, term or bucket.
+
+FAISS ids are positions 0..n-1. Nothing is unpickled and nothing is
+proportional to the corpus size at open, so cold start stays flat as the
+corpus grows. Changes after the snapshot live in the delta log (see
+`PolicyIndex`).
+"""
+from __future__ import annotations
+
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from .ann_index import AnnIndexConfig, prepare_index
+from .dedup import lsh_buckets, signature, sources_of
+from .lexical_index import tokenize
+from .partitions import occurrence_keys
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 4
+# Format 2 lacks `chunk_documents` and `lsh`: no shared chunks, no duplicate
+# lookup. Before format 4, partitions are per chunk rather than per occurrence.
+_READABLE_FORMATS = (2, 3, SNAPSHOT_FORMAT)
+INDEX_FILE = "index.faiss"
+VECTORS_FILE = "vectors.npy"
+CHUNKS_FILE = "chunks.sqlite"
+SNAPSHOT_FILES = (INDEX_FILE, VECTORS_FILE, CHUNKS_FILE)
+
+_SCHEMA = """
+CREATE TABLE chunks (
+    position INTEGER PRIMARY KEY,
+    chunk_id TEXT NOT NULL UNIQUE,
+    document_id TEXT,
+    text TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+CREATE INDEX chunks_document ON chunks (document_id);
+CREATE TABLE chunk_documents (
+    document_id TEXT NOT NULL, position INTEGER NOT NULL,
+    PRIMARY KEY (document_id, position)
+) WITHOUT ROWID;
+CREATE TABLE partitions (
+    field TEXT NOT NULL, value TEXT NOT NULL, position INTEGER NOT NULL, occurrence INTEGER NOT NULL,
+    PRIMARY KEY (field, value, position, occurrence)
+) WITHOUT ROWID;
+CREATE TABLE postings (
+    term TEXT NOT NULL, position INTEGER NOT NULL, tf INTEGER NOT NULL, doc_len INTEGER NOT NULL,
+    PRIMARY KEY (term, position)
+) WITHOUT ROWID;
+CREATE TABLE lsh (
+    bucket INTEGER NOT NULL, position INTEGER NOT NULL,
+    PRIMARY KEY (bucket, position)
+) WITHOUT ROWID;
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+# SQLite's default limit on bound parameters is 999 on older builds
+_SQL_BATCH = 500
+
+
+def _faiss():
+    from langchain_community.vectorstores.faiss import dependable_faiss_import
+    return dependable_faiss_import()
+
+
+def document_id_of(metadata: Mapping[str, Any]) -> str:
+    # Indexes built before per-document tracking only carry `source`
+    return metadata.get("document_id") or Path(metadata.get("source", "unknown")).name
+
+
+def document_ids_of(metadata: Mapping[str, Any]) -> List[str]:
+    """Every document a (possibly deduplicated) chunk occurs in, its own first."""
+    ids = [document_id_of(metadata)]
+    ids.extend(s["document_id"] for s in sources_of(metadata)
+               if s.get("document_id") and s["document_id"] not in ids)
+    return ids
+
+
+def _fsync(path: Path) -> None:
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+
+
+def write_snapshot(directory: str | Path, index, chunk_ids: List[str], texts: List[str],
+                   metadatas: List[Dict[str, Any]], vectors: np.ndarray) -> None:
+    """Write a complete snapshot into ``directory`` (files are replaced).
+
+    ``index`` must hold the vectors at positions 0..n-1 in the given order.
+    """
+    faiss = _faiss()
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    if index.ntotal != len(chunk_ids) or len(vectors) != len(chunk_ids):
+        raise ValueError("Snapshot index, vectors and chunks disagree in length")
+
+    faiss.write_index(index, str(directory / INDEX_FILE))
+    np.save(directory / VECTORS_FILE, np.ascontiguousarray(vectors, dtype=np.float32))
+
+    db_path = directory / CHUNKS_FILE
+    for suffix in ("", "-journal", "-wal", "-shm"):
+        Path(f"{db_path}{suffix}").unlink(missing_ok=True)
+    db = sqlite3.connect(str(db_path))
+    try:
+        db.execute("PRAGMA journal_mode=OFF")
+        db.execute("PRAGMA synchronous=OFF")
+        db.executescript(_SCHEMA)
+        total_length = 0
+        for start in range(0, len(chunk_ids), _SQL_BATCH):
+            chunk_rows, document_rows, partition_rows, posting_rows, lsh_rows = [], [], [], [], []
+            for position in range(start, min(start + _SQL_BATCH, len(chunk_ids))):
+                text, metadata = texts[position], metadatas[position]
+                chunk_rows.append((position, chunk_ids[position], document_id_of(metadata),
+                                   text, json.dumps(metadata, default=str)))
+                document_rows.extend((document_id, position) for document_id in document_ids_of(metadata))
+                lsh_rows.extend((bucket, position) for bucket in set(lsh_buckets(signature(text))))
+                partition_rows.extend((field, value, position, occurrence)
+                                      for occurrence, keys in enumerate(occurrence_keys(metadata, text))
+                                      for field, value in keys)
+                counts = Counter(tokenize(text))
+                length = sum(counts.values())
+                total_length += length
+                posting_rows.extend((term, position, tf, length) for term, tf in counts.items())
+            db.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?, ?)", chunk_rows)
+            db.executemany("INSERT INTO chunk_documents VALUES (?, ?)", document_rows)
+            db.executemany("INSERT INTO lsh VALUES (?, ?)", lsh_rows)
+            db.executemany("INSERT INTO partitions VALUES (?, ?, ?, ?)", partition_rows)
+            db.executemany("INSERT INTO postings VALUES (?, ?, ?, ?)", posting_rows)
+        db.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("format", str(SNAPSHOT_FORMAT)),
+            ("count", str(len(chunk_ids))),
+            ("total_length", str(total_length)),
+            ("dim", str(vectors.shape[1] if vectors.ndim == 2 else index.d)),
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+    for name in SNAPSHOT_FILES:
+        _fsync(directory / name)
+
+
+def has_snapshot(directory: str | Path) -> bool:
+    return all((Path(directory) / name).exists() for name in SNAPSHOT_FILES)
+
+
+def _read_index(path: Path):
+    """Open an index memory-mapped where the index type allows it."""
+    faiss = _faiss()
+    read_only = faiss.IO_FLAG_READ_ONLY
+    # Flat codes (flat, SQ, PQ, HNSW storage) map directly; IVF maps its lists
+    for flags in (faiss.IO_FLAG_MMAP_IFC | read_only, faiss.IO_FLAG_MMAP | read_only, 0):
+        try:
+            return faiss.read_index(str(path), flags)
+        except RuntimeError:
+            continue
+    raise RuntimeError(f"Could not read FAISS index {path}")
+
+
+class IndexSnapshot:
+    """Read-only view of a snapshot directory.
+
+    Doc ids for BM25 and partitions are positions, so a snapshot is also a
+    segment for `lexical_index.bm25_search`.
+    """
+
+    def __init__(self, directory: str | Path, config: AnnIndexConfig):
+        self.directory = Path(directory)
+        self.index = prepare_index(_read_index(self.directory / INDEX_FILE), config)
+        self.vectors = np.load(self.directory / VECTORS_FILE, mmap_mode="r")
+        # One connection per snapshot keeps the opened file even if the path
+        # is later replaced; snapshot files never change, hence immutable=1.
+        self._db = sqlite3.connect(
+            f"file:{self.directory / CHUNKS_FILE}?mode=ro&immutable=1", uri=True,
+            check_same_thread=False)
+        self._lock = threading.Lock()
+        meta = dict(self._query("SELECT key, value FROM meta"))
+        self.format = int(meta.get("format", 0))
+        if self.format not in _READABLE_FORMATS:
+            raise ValueError(f"Unsupported policy index format {meta.get('format')}")
+        self.size = int(meta["count"])
+        self.dim = int(meta["dim"])
+        self._total_length = int(meta["total_length"])
+        if self.index.ntotal != self.size or len(self.vectors) != self.size:
+            raise ValueError(f"Incomplete policy index snapshot in {self.directory}")
+        self._cached_postings = functools.lru_cache(maxsize=1024)(self._read_postings)
+
+    def _query(self, sql: str, params: Iterable[Any] = ()) -> List[Tuple[Any, ...]]:
+        with self._lock:
+            return self._db.execute(sql, tuple(params)).fetchall()
+
+    def _query_in(self, sql: str, values: Iterable[Any], params: Tuple[Any, ...] = ()
+                  ) -> List[Tuple[Any, ...]]:
+        """Run ``sql`` (with one ``IN ({})`` placeholder) over ``values`` in batches.
+
+        ``params`` bind any placeholders before the ``IN`` list.
+        """
+        values = list(values)
+        rows: List[Tuple[Any, ...]] = []
+        for start in range(0, len(values), _SQL_BATCH):
+            batch = values[start:start + _SQL_BATCH]
+            rows.extend(self._query(sql.format(",".join("?" * len(batch))), params + tuple(batch)))
+        return rows
+
+    # Docstore ---------------------------------------------------------
+    def documents(self, positions: Iterable[int]) -> Dict[int, Document]:
+        return {
+            position: Document(page_content=text, metadata=json.loads(metadata))
+            for position, text, metadata in self._query_in(
+                "SELECT position, text, metadata FROM chunks WHERE position IN ({})", positions)
+        }
+
+    def chunk_ids(self, positions: Iterable[int]) -> Dict[int, str]:
+        return dict(self._query_in(
+            "SELECT position, chunk_id FROM chunks WHERE position IN ({})", positions))
+
+    def positions_of(self, chunk_ids: Iterable[str]) -> Dict[str, int]:
+        return dict(self._query_in(
+            "SELECT chunk_id, position FROM chunks WHERE chunk_id IN ({})", chunk_ids))
+
+    def document_chunks(self, document_id: str) -> List[Tuple[str, int]]:
+        """``(chunk_id, position)`` pairs of a document, in position order.
+
+        Includes chunks the document shares with others through deduplication.
+        """
+        if self.format < 3:
+            return self._query(
+                "SELECT chunk_id, position FROM chunks WHERE document_id = ? ORDER BY position",
+                (document_id,))
+        return self._query(
+            "SELECT c.chunk_id, c.position FROM chunk_documents d JOIN chunks c USING (position) "
+            "WHERE d.document_id = ? ORDER BY c.position", (document_id,))
+
+    def duplicate_candidates(self, buckets: Iterable[int]) -> Set[int]:
+        """Positions sharing at least one LSH bucket."""
+        if self.format < 3:
+            return set()
+        return {row[0] for row in self._query_in(
+            "SELECT DISTINCT position FROM lsh WHERE bucket IN ({})", buckets)}
+
+    def iter_chunks(self, batch_size: int = 1000) -> Iterator[List[Tuple[int, str, str, Dict[str, Any]]]]:
+        """Batches of ``(position, chunk_id, text, metadata)`` in position order."""
+        for start in range(0, self.size, batch_size):
+            rows = self._query(
+                "SELECT position, chunk_id, text, metadata FROM chunks "
+                "WHERE position >= ? AND position < ? ORDER BY position",
+                (start, start + batch_size))
+            yield [(p, c, t, json.loads(m)) for p, c, t, m in rows]
+
+    # Partitions -------------------------------------------------------
+    def resolve(self, filters: Mapping[str, List[str]]) -> Set[int]:
+        """Positions matching normalised filters (see `partitions.normalise_filters`)
+        in one of their occurrences."""
+        occurrence = "occurrence" if self.format >= 4 else "0"
+        matched: Optional[Set[Tuple[int, int]]] = None
+        for field, values in filters.items():
+            members = set(self._query_in(
+                f"SELECT position, {occurrence} FROM partitions WHERE field = ? AND value IN ({{}})",
+                values, (field,)))
+            matched = members if matched is None else matched & members
+            if not matched:
+                return set()
+        return {position for position, _ in matched} if matched else set()
+
+    def partition_sizes(self) -> Dict[str, Dict[str, int]]:
+        out: Dict[str, Dict[str, int]] = {}
+        for field, value, count in self._query(
+                "SELECT field, value, COUNT(DISTINCT position) FROM partitions GROUP BY field, value"):
+            out.setdefault(field, {})[value] = count
+        return out
+
+    # BM25 segment protocol ----------------------------------------------
+    def doc_count(self) -> int:
+        return self.size
+
+    def total_length(self) -> int:
+        return self._total_length
+
+    def postings(self, term: str) -> List[Tuple[int, int, int]]:
+        return self._cached_postings(term)
+
+    def _read_postings(self, term: str) -> List[Tuple[int, int, int]]:
+        return self._query("SELECT position, tf, doc_len FROM postings WHERE term = ?", (term,))
+
+    # ------------------------------------------------------------------
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,166 @@
+"""Versioned policy index directory shared by all worker processes.
+
+Layout under the index path::
+
+    CURRENT              name of the live version, replaced atomically
+    write.lock           serialises writers across processes
+    compact.lock         lets one process compact at a time
+    build.lock           lets one process build while the others wait
+    versions/<name>/     snapshot files plus that version's delta log
+    staging/<name>/      versions being built; moved into versions/ to publish
+
+Every worker memory-maps the files of the version named in ``CURRENT``, so
+the index pages exist once in the page cache however many workers there
+are. A rebuild or compaction writes a new version and flips the pointer;
+workers notice the change, open the new version and drop the old one.
+Versions are never modified after publishing, except for appends to their
+delta log.
+"""
+from __future__ import annotations
+
+import contextlib
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from .index_snapshot import has_snapshot
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover – Windows: writers only serialise within a process
+    fcntl = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+DELTA_LOG_FILE = "deltas.jsonl"
+# Versions kept besides the current one, for workers still switching over
+_KEEP_PREVIOUS_VERSIONS = 1
+# Staging directories older than this are left over from a crashed build
+_STALE_STAGING_SECONDS = 24 * 3600
+
+
+def _fsync_dir(path: Path) -> None:
+    if os.name == "nt":  # pragma: no cover – directories cannot be opened on Windows
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class IndexStore:
+    """Versions of the policy index and the pointer to the live one."""
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self.versions_dir = self.root / "versions"
+        self.staging_dir = self.root / "staging"
+        self._thread_locks = {name: threading.Lock() for name in ("write", "compact", "build")}
+
+    # Pointer ----------------------------------------------------------
+    def current_version(self) -> Optional[str]:
+        """Name of the published version, or ``None`` before the first build."""
+        try:
+            name = (self.root / CURRENT_FILE).read_text(encoding="utf-8").strip()
+        except FileNotFoundError:
+            return None
+        return name if name and has_snapshot(self.versions_dir / name) else None
+
+    def version_dir(self, name: str) -> Path:
+        return self.versions_dir / name
+
+    def delta_log_path(self, name: str) -> Path:
+        return self.versions_dir / name / DELTA_LOG_FILE
+
+    # Building and publishing --------------------------------------------
+    def new_staging_dir(self) -> Path:
+        """Empty directory for the next version; names sort by creation time."""
+        now = time.time_ns()
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(now // 10**9))
+        path = self.staging_dir / f"{stamp}.{now % 10**9:09d}-{uuid.uuid4().hex[:6]}"
+        path.mkdir(parents=True)
+        return path
+
+    def discard(self, staging: Path) -> None:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    def publish(self, staging: Path) -> str:
+        """Move a complete staging directory into place and point ``CURRENT`` at it.
+
+        Callers hold the write lock. Returns the new version's name.
+        """
+        if not has_snapshot(staging):
+            raise ValueError(f"Refusing to publish incomplete index version {staging}")
+        self.versions_dir.mkdir(parents=True, exist_ok=True)
+        target = self.versions_dir / staging.name
+        os.replace(staging, target)
+        _fsync_dir(self.versions_dir)
+
+        pointer = self.root / f"{CURRENT_FILE}.tmp"
+        with open(pointer, "w", encoding="utf-8") as f:
+            f.write(staging.name)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(pointer, self.root / CURRENT_FILE)
+        _fsync_dir(self.root)
+        logger.info("Published policy index version %s", staging.name)
+        self.prune()
+        return staging.name
+
+    def prune(self) -> None:
+        """Remove superseded versions and abandoned staging directories.
+
+        Workers that still map a removed version keep reading it: the files
+        stay on disk until their last mapping is closed.
+        """
+        current = self.current_version()
+        older: List[Path] = sorted(
+            (p for p in self._children(self.versions_dir) if p.name != current),
+            key=lambda p: p.name, reverse=True)
+        for path in older[_KEEP_PREVIOUS_VERSIONS:]:
+            shutil.rmtree(path, ignore_errors=True)
+        cutoff = time.time() - _STALE_STAGING_SECONDS
+        for path in self._children(self.staging_dir):
+            if path.stat().st_mtime < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+
+    @staticmethod
+    def _children(path: Path) -> List[Path]:
+        return [p for p in path.iterdir() if p.is_dir()] if path.exists() else []
+
+    # Locks ------------------------------------------------------------
+    @contextlib.contextmanager
+    def lock(self, name: str = "write", blocking: bool = True) -> Iterator[bool]:
+        """Exclusive lock shared by every process using this directory.
+
+        Yields whether it was acquired (always ``True`` when blocking).
+        """
+        thread_lock = self._thread_locks[name]
+        if not thread_lock.acquire(blocking):
+            yield False
+            return
+        try:
+            if fcntl is None:
+                yield True
+                return
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.root / f"{name}.lock", "a+") as f:
+                flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+                try:
+                    fcntl.flock(f.fileno(), flags)
+                except BlockingIOError:
+                    yield False
+                    return
+                try:
+                    yield True
+                finally:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        finally:
+            thread_lock.release()
@@ -0,0 +1,163 @@
+"""Local BM25 inverted index for exact-term policy search.
+
+Policy checker queries are often exact terms – policy numbers ("UNAuto"),
+Dutch coverage terms ("eigen schade", "schadegarant") or section numbers
+("6.3"). Dense embeddings handle these poorly and cost an embedding round
+trip each; a lexical index answers them locally. Postings are keyed by the
+same positions as the FAISS index; a search spans several segments (the
+on-disk snapshot and the in-memory delta), and `PolicyVectorSearch` fuses
+the lexical and dense rankings with reciprocal-rank fusion.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+
+# Section numbers stay whole ("6.3", "3.2.1"); everything else splits on
+# non-word characters, so "UNAuto-02-2024" → ["unauto", "02", "2024"].
+_TOKEN_RE = re.compile(r"\d+(?:\.\d+)+|\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, strip accents and split text into index terms."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _TOKEN_RE.findall(text)
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = 60) -> Dict[str, float]:
+    """Combine ranked id lists: score(id) = Σ 1 / (k + rank)."""
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + rank)
+    return fused
+
+
+class BM25Index:
+    """Okapi BM25 over chunk texts with incremental add/remove.
+
+    Also serves as an in-memory segment for `bm25_search`, which scores
+    across several segments (e.g. an on-disk snapshot plus recent changes).
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[Hashable, Dict[Hashable, int]] = {}
+        self._doc_terms: Dict[Hashable, Tuple[str, ...]] = {}
+        self._doc_len: Dict[Hashable, int] = {}
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def __contains__(self, doc_id: Hashable) -> bool:
+        return doc_id in self._doc_len
+
+    # ------------------------------------------------------------------
+    def add(self, doc_id: Hashable, text: str) -> None:
+        if doc_id in self._doc_len:
+            self.remove(doc_id)
+        counts = Counter(tokenize(text))
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+        self._doc_terms[doc_id] = tuple(counts)
+        length = sum(counts.values())
+        self._doc_len[doc_id] = length
+        self._total_len += length
+
+    def remove(self, doc_id: Hashable) -> None:
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self._postings[term]
+        self._total_len -= self._doc_len.pop(doc_id)
+
+    # Segment protocol ---------------------------------------------------
+    def doc_count(self) -> int:
+        return len(self._doc_len)
+
+    def total_length(self) -> int:
+        return self._total_len
+
+    def postings(self, term: str) -> List[Tuple[Hashable, int, int]]:
+        """``(doc_id, term frequency, doc length)`` for every doc containing ``term``."""
+        return [(doc_id, tf, self._doc_len[doc_id])
+                for doc_id, tf in self._postings.get(term, {}).items()]
+
+    # ------------------------------------------------------------------
+    def search(self, query: str, k: int = 5, allowed: Optional[Set[Hashable]] = None
+               ) -> List[Tuple[Hashable, float]]:
+        """Return up to ``k`` ``(doc_id, score)`` pairs, best first.
+
+        Args:
+            query: Free-text query
+            k: Number of results
+            allowed: Optional set of doc ids to restrict the search to
+        """
+        return bm25_search([self], query, k, allowed, k1=self.k1, b=self.b)
+
+    def matches_all_terms(self, query: str, allowed: Optional[Set[Hashable]] = None) -> bool:
+        """True if at least one (allowed) chunk contains every query term."""
+        return matches_all_terms([self], query, allowed)
+
+
+# ---------------------------------------------------------------------------
+def bm25_search(segments: Sequence[Any], query: str, k: int = 5,
+                allowed: Optional[Set[Hashable]] = None, excluded: Optional[Set[Hashable]] = None,
+                k1: float = 1.5, b: float = 0.75) -> List[Tuple[Hashable, float]]:
+    """BM25 over several segments with corpus statistics summed across them.
+
+    Segments provide ``doc_count()``, ``total_length()`` and ``postings(term)``
+    and must use disjoint doc ids. As in Lucene, ``excluded`` (deleted) docs
+    still count towards idf and average length until they are compacted away.
+    """
+    terms = set(tokenize(query))
+    n = sum(segment.doc_count() for segment in segments)
+    if not terms or not n:
+        return []
+    avg_len = sum(segment.total_length() for segment in segments) / n
+    scores: Dict[Hashable, float] = {}
+    for term in terms:
+        postings = [p for segment in segments for p in segment.postings(term)]
+        if not postings:
+            continue
+        idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+        for doc_id, tf, doc_len in postings:
+            if allowed is not None and doc_id not in allowed:
+                continue
+            if excluded and doc_id in excluded:
+                continue
+            norm = k1 * (1 - b + b * doc_len / avg_len)
+            scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+    return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+
+def matches_all_terms(segments: Sequence[Any], query: str, allowed: Optional[Set[Hashable]] = None,
+                      excluded: Optional[Set[Hashable]] = None) -> bool:
+    """True if at least one (allowed, not excluded) doc contains every query term."""
+    terms = set(tokenize(query))
+    if not terms:
+        return False
+    doc_sets = []
+    for term in terms:
+        docs = {doc_id for segment in segments for doc_id, _, _ in segment.postings(term)}
+        if not docs:
+            return False
+        doc_sets.append(docs)
+    common = set.intersection(*doc_sets)
+    if allowed is not None:
+        common &= allowed
+    if excluded:
+        common -= excluded
+    return bool(common)
@@ -0,0 +1,146 @@
+"""Metadata partitions for filtered policy search.
+
+Chunks are grouped by ``policy_type``, ``category``, ``language`` and
+``file_type``. A filtered search resolves its filters to the set of chunk
+positions in the matching partitions *before* ranking – FAISS gets an ID-selector
+and BM25 an allow-list – so a query scoped to one policy only scores that
+policy's chunks and can never be crowded out of its top-k by other ones.
+"""
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, Hashable, Iterable, List, Mapping, Optional, Set, Tuple
+
+PARTITION_FIELDS = ("policy_type", "category", "language", "file_type")
+
+# Very common function words – enough to tell Dutch from English policy text
+_STOPWORDS = {
+    "nl": {"de", "het", "een", "en", "van", "je", "is", "niet", "voor", "als", "bij", "op",
+           "wordt", "zijn", "met", "aan", "schade", "verzekerd", "uw", "dit", "dat", "of"},
+    "en": {"the", "and", "of", "to", "for", "is", "not", "in", "on", "with", "your", "by",
+           "are", "be", "this", "that", "or", "coverage", "damage", "insured"},
+}
+_WORD_RE = re.compile(r"[a-zà-ÿ]+")
+
+
+def detect_language(text: str, default: str = "en") -> str:
+    """Classify text as ``nl`` or ``en`` by stopword frequency."""
+    words = _WORD_RE.findall(text[:20_000].lower())
+    scores = {lang: sum(1 for w in words if w in stop) for lang, stop in _STOPWORDS.items()}
+    best = max(scores, key=scores.get)
+    return best if scores[best] > 0 else default
+
+
+def _normalise(value: Any) -> str:
+    return str(value).strip().casefold()
+
+
+def occurrence_keys(metadata: Mapping[str, Any], text: str = "") -> List[Tuple[Tuple[str, str], ...]]:
+    """Normalised ``(field, value)`` partitions of each occurrence of a chunk.
+
+    A deduplicated chunk occurs once per entry of its ``sources``, and a
+    filter on several fields only matches it through an occurrence that
+    matches them all – not one occurrence's policy type and another's
+    category – so occurrences are indexed separately.
+    """
+    language = metadata.get("language")
+    out = []
+    for entry in metadata.get("sources") or [metadata]:
+        if not entry.get("language") and not language:
+            language = detect_language(text)
+        values = {
+            "policy_type": entry.get("policy_type"),
+            # Chunks indexed before categories existed are bundled policies
+            "category": entry.get("category") or "policy",
+            "language": entry.get("language") or language,
+            "file_type": entry.get("file_type"),
+        }
+        out.append(tuple((field, _normalise(value)) for field, value in values.items() if value))
+    return out
+
+
+def partition_keys(metadata: Mapping[str, Any], text: str = "") -> Tuple[Tuple[str, str], ...]:
+    """Normalised ``(field, value)`` partitions a chunk belongs to.
+
+    A deduplicated chunk belongs to the partitions of each of its ``sources``.
+    """
+    keys: Dict[Tuple[str, str], None] = {}
+    for occurrence in occurrence_keys(metadata, text):
+        keys.update(dict.fromkeys(occurrence))
+    return tuple(keys)
+
+
+def normalise_filters(filters: Optional[Mapping[str, Any]]) -> Dict[str, List[str]]:
+    """Validate filters into ``field → normalised values`` (empty ones dropped).
+
+    Raises:
+        ValueError: If a filter names an unknown field
+    """
+    out: Dict[str, List[str]] = {}
+    for field, value in (filters or {}).items():
+        if value is None or value == [] or value == "":
+            continue
+        if field not in PARTITION_FIELDS:
+            raise ValueError(
+                f"Unknown filter '{field}' – expected one of {PARTITION_FIELDS}")
+        values: Iterable[Any] = value if isinstance(value, (list, tuple, set)) else [value]
+        out[field] = [_normalise(v) for v in values]
+    return out
+
+
+class MetadataPartitions:
+    """Inverted index of (field, value) → ``(chunk position, occurrence)``."""
+
+    def __init__(self):
+        self._members: Dict[Tuple[str, str], Set[Tuple[Hashable, int]]] = {}
+        self._keys_by_chunk: Dict[Hashable, List[Tuple[Tuple[str, str], ...]]] = {}
+
+    def add(self, chunk_id: Hashable, metadata: Mapping[str, Any], text: str = "") -> None:
+        if chunk_id in self._keys_by_chunk:
+            self.remove(chunk_id)
+        occurrences = occurrence_keys(metadata, text)
+        for occurrence, keys in enumerate(occurrences):
+            for key in keys:
+                self._members.setdefault(key, set()).add((chunk_id, occurrence))
+        self._keys_by_chunk[chunk_id] = occurrences
+
+    def remove(self, chunk_id: Hashable) -> None:
+        for occurrence, keys in enumerate(self._keys_by_chunk.pop(chunk_id, ())):
+            for key in keys:
+                members = self._members.get(key)
+                if members is not None:
+                    members.discard((chunk_id, occurrence))
+                    if not members:
+                        del self._members[key]
+
+    # ------------------------------------------------------------------
+    def resolve(self, filters: Optional[Mapping[str, Any]]) -> Optional[Set[Hashable]]:
+        """Chunk positions matching all filters (any of the values within a field)
+        in one of their occurrences.
+
+        Returns ``None`` when no filter is set, meaning "search everything".
+
+        Raises:
+            ValueError: If a filter names an unknown field
+        """
+        if not filters:
+            return None
+        matched: Optional[Set[Tuple[Hashable, int]]] = None
+        for field, values in normalise_filters(filters).items():
+            members: Set[Tuple[Hashable, int]] = set()
+            for v in values:
+                members |= self._members.get((field, v), set())
+            matched = members if matched is None else matched & members
+            if not matched:
+                return set()
+        return None if matched is None else {chunk_id for chunk_id, _ in matched}
+
+    def values(self, field: str) -> List[str]:
+        """Distinct (normalised) values present for a field."""
+        return sorted(v for f, v in self._members if f == field)
+
+    def sizes(self) -> Dict[str, Dict[str, int]]:
+        out: Dict[str, Dict[str, int]] = {}
+        for (field, value), members in self._members.items():
+            out.setdefault(field, {})[value] = len({chunk_id for chunk_id, _ in members})
+        return out
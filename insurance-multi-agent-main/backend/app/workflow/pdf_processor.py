@@ -6,22 +6,273 @@ for use in the policy vector search system.
 from __future__ import annotations
 
 import logging
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import Deque, List, Dict, Any, Iterator, Optional, Sequence, Tuple
 
-import fitz  # PyMuPDF
 from langchain_core.documents import Document
 
+from .extraction_cache import PDFExtractionCache
+from .pdf_sandbox import (PDFExtractionError, PDFSandbox, SandboxLimits, default_workers,
+                          extract_page_range, read_info)
+
 logger = logging.getLogger(__name__)
 
+# Page ranges handed to one worker are at least this long, so a small
+# document is extracted by a single worker rather than opened many times
+_MIN_RANGE_PAGES = 8
+_MAX_DEFAULT_WORKERS = 8
+# Files whose last failure is remembered, so retries of a bad upload fail fast
+_FAILURE_MEMO_SIZE = 256
+
 
 class PDFProcessor:
-    """PDF text extraction and processing utility using PyMuPDF."""
+    """PDF text extraction and processing utility using PyMuPDF.
+    
+    PyMuPDF only ever runs in sandbox worker processes (`PDFSandbox`) with
+    page, size, time and memory limits, so a malformed or hostile PDF costs
+    a worker, never the API process. Page text of large PDFs, and of
+    batches of PDFs, is spread across the workers in page ranges and put
+    back in order. With an extraction cache, a file is parsed once and read
+    back from the cache by every later call, validation included, until its
+    content changes.
+    
+    Files that fail raise `PDFExtractionError`; its reason is remembered
+    per file version (see `failure`) and a retry fails without parsing.
+    """
+    
+    def __init__(self, workers: int | None = None, min_parallel_pages: int | None = None,
+                 cache: PDFExtractionCache | None = None, limits: SandboxLimits | None = None):
+        """Initialize the PDF processor.
+        
+        Args:
+            workers: Sandbox worker processes; 0 = one per CPU (up to 8).
+                Defaults to the ``PDF_EXTRACT_WORKERS`` setting.
+            min_parallel_pages: Extractions with fewer pages in total run as
+                one task per file. Defaults to ``PDF_PARALLEL_MIN_PAGES``.
+            cache: Extraction cache to read from and fill; none by default
+                (the shared processor uses the configured one)
+            limits: Page, size, time and memory limits; defaults to the
+                ``PDF_MAX_PAGES``, ``PDF_MAX_MB``, ``PDF_TASK_TIMEOUT`` and
+                ``PDF_WORKER_MEMORY_MB`` settings
+        """
+        from app.core.config import get_settings
+
+        settings = get_settings()
+        workers = settings.pdf_extract_workers if workers is None else workers
+        self.workers = default_workers(workers, _MAX_DEFAULT_WORKERS)
+        self.min_parallel_pages = (settings.pdf_parallel_min_pages
+                                   if min_parallel_pages is None else min_parallel_pages)
+        self.cache = cache
+        self.limits = SandboxLimits.from_settings() if limits is None else limits
+        self._sandbox: PDFSandbox | None = None
+        self._sandbox_lock = threading.Lock()
+        # (path, size, mtime) -> the error that file version failed with
+        self._failures: "OrderedDict[Tuple[str, int, int], PDFExtractionError]" = OrderedDict()
+    
+    # ------------------------------------------------------------------
+    def sandbox(self) -> PDFSandbox:
+        """The sandbox worker pool, started on first use."""
+        with self._sandbox_lock:
+            if self._sandbox is None:
+                self._sandbox = PDFSandbox(self.workers, self.limits)
+            return self._sandbox
+    
+    def close(self) -> None:
+        """Shut down the worker processes; they are started again when needed."""
+        with self._sandbox_lock:
+            sandbox, self._sandbox = self._sandbox, None
+        if sandbox is not None:
+            sandbox.close()
+    
+    @staticmethod
+    def _failure_key(pdf_path: Path) -> Tuple[str, int, int] | None:
+        try:
+            stat = pdf_path.stat()
+        except OSError:
+            return None
+        return str(pdf_path.resolve()), stat.st_size, stat.st_mtime_ns
+    
+    def _remember(self, pdf_path: Path, error: Exception) -> None:
+        """Record why ``pdf_path`` failed, if it is a `PDFExtractionError`."""
+        key = self._failure_key(pdf_path)
+        if key is None or not isinstance(error, PDFExtractionError):
+            return
+        with self._sandbox_lock:
+            known = self._failures.get(key)
+            self._failures[key] = error
+            self._failures.move_to_end(key)
+            while len(self._failures) > _FAILURE_MEMO_SIZE:
+                self._failures.popitem(last=False)
+        if known is None or known.as_dict() != error.as_dict():
+            logger.warning(f"PDF {pdf_path.name} rejected ({error.reason}): {error.detail}")
+    
+    def failure(self, pdf_path: str | Path) -> Dict[str, str] | None:
+        """``reason`` and ``detail`` of the last failure of this version of
+        the file, or ``None`` if it has not failed."""
+        key = self._failure_key(Path(pdf_path))
+        with self._sandbox_lock:
+            error = self._failures.get(key) if key is not None else None
+        return error.as_dict() if error is not None else None
+    
+    def _open_info(self, pdf_path: Path) -> Dict[str, Any]:
+        """Page count, outline and raw metadata, read in a sandbox worker."""
+        return self.sandbox().run(read_info, str(pdf_path))
+    
+    def _info(self, pdf_path: Path) -> Dict[str, Any]:
+        """`_open_info` within the limits, read from the cache (``cached``)
+        when the file was extracted before; carries the file's ``digest``
+        when caching. A file that failed before fails again straight away."""
+        key = self._failure_key(pdf_path)
+        with self._sandbox_lock:
+            error = self._failures.get(key) if key is not None else None
+        if error is not None:
+            raise PDFExtractionError(error.reason, error.detail)
+        try:
+            self.limits.check_size(pdf_path)
+            if self.cache is None:
+                info = self._open_info(pdf_path)
+            else:
+                digest = self.cache.digest(pdf_path)
+                info = self.cache.info(digest)
+                if info is None:
+                    info = self._open_info(pdf_path)
+                else:
+                    info["cached"] = True
+                info["digest"] = digest
+            self.limits.check_pages(info["page_count"])
+        except PDFExtractionError as e:
+            self._remember(pdf_path, e)
+            raise
+        return info
+    
+    def _extract_many(self, pdf_paths: Sequence[Path]) -> List[Dict[str, Any] | Exception]:
+        """Pages, outline and raw metadata of each PDF, or the error it raised.
+        
+        Each result carries an ``extraction`` report: pages, page ranges,
+        workers, wall-clock seconds from the first range starting to the
+        last finishing, CPU seconds, and ``speedup`` – the CPU time of all
+        ranges (about what a serial extraction takes) over that wall time.
+        Files found in the cache are read back instead (``cached`` report).
+        """
+        results: List[Dict[str, Any] | Exception] = []
+        for pdf_path in pdf_paths:
+            try:
+                results.append(self._info(pdf_path))
+            except Exception as e:
+                results.append(e)
+        for i, info in enumerate(results):
+            if isinstance(info, dict) and info.get("cached"):
+                self._load_cached(pdf_paths[i], info)
+        infos = [(i, info) for i, info in enumerate(results)
+                 if not isinstance(info, Exception) and "pages" not in info]
+        total_pages = sum(info["page_count"] for _, info in infos)
+        
+        if self.workers > 1 and total_pages >= self.min_parallel_pages:
+            self._extract_parallel(pdf_paths, infos, total_pages)
+        else:
+            self._extract_serial(pdf_paths, infos)
+        
+        for i, info in infos:
+            if "error" in info:
+                self._remember(pdf_paths[i], info["error"])
+                results[i] = info["error"]
+                continue
+            if "digest" in info:
+                self.cache.put(info["digest"], info, info["pages"])
+            report = info["extraction"]
+            logger.info(
+                f"Extracted {report['pages']} pages from {pdf_paths[i].name} in {report['seconds']}s "
+                f"({report['ranges']} ranges, {report['workers']} workers, speedup {report['speedup']}x)")
+        return results
+    
+    def _load_cached(self, pdf_path: Path, info: Dict[str, Any]) -> None:
+        """Read a cached extraction's pages into ``info``; left out if unreadable."""
+        started = time.perf_counter()
+        try:
+            info["pages"] = list(self.cache.iter_pages(info["digest"], info["page_count"]))
+        except (LookupError, sqlite3.Error) as e:
+            logger.warning(f"Cached extraction of {pdf_path.name} unusable ({e}); extracting again")
+            info.pop("cached")
+            return
+        info["extraction"] = {
+            "pages": info["page_count"], "ranges": 0, "workers": 0,
+            "seconds": round(time.perf_counter() - started, 4), "cpu_seconds": 0.0,
+            "speedup": 1.0, "cached": True,
+        }
+        logger.info(f"Read {info['page_count']} pages of {pdf_path.name} from the extraction cache")
+    
+    @staticmethod
+    def _report(info: Dict[str, Any], ranges: int, workers: int, seconds: float,
+                cpu_seconds: float) -> None:
+        info["extraction"] = {
+            "pages": info["page_count"],
+            "ranges": ranges,
+            "workers": workers,
+            "seconds": round(seconds, 4),
+            "cpu_seconds": round(cpu_seconds, 4),
+            "speedup": round(cpu_seconds / seconds, 2) if seconds > 0 and workers > 1 else 1.0,
+            "cached": False,
+        }
     
-    def __init__(self):
-        """Initialize the PDF processor."""
-        pass
+    def _extract_serial(self, pdf_paths: Sequence[Path], infos: List[Tuple[int, Dict[str, Any]]]) -> None:
+        sandbox = self.sandbox()
+        for i, info in infos:
+            try:
+                pages, cpu_seconds, started, finished = sandbox.run(
+                    extract_page_range, str(pdf_paths[i]), 0, info["page_count"])
+            except Exception as e:
+                info["error"] = e
+                continue
+            info["pages"] = pages
+            self._report(info, 1, 1, finished - started, cpu_seconds)
     
+    def _extract_parallel(self, pdf_paths: Sequence[Path], infos: List[Tuple[int, Dict[str, Any]]],
+                          total_pages: int) -> None:
+        # About two ranges per worker over the whole batch, so a slow range
+        # does not leave the other workers idle at the end
+        range_pages = max(_MIN_RANGE_PAGES, math.ceil(total_pages / (self.workers * 2)))
+        sandbox = self.sandbox()
+        submitted: List[Tuple[Dict[str, Any], List[Future]]] = []
+        for i, info in infos:
+            futures = []
+            for start in range(0, info["page_count"], range_pages):
+                end = min(start + range_pages, info["page_count"])
+                futures.append(sandbox.submit(extract_page_range, str(pdf_paths[i]), start, end))
+            submitted.append((info, futures))
+        
+        for info, futures in submitted:
+            pages: List[str] = []
+            cpu_seconds, started, finished = 0.0, math.inf, 0.0
+            try:
+                # Ranges are collected in submission order, i.e. page order
+                for future in futures:
+                    range_texts, range_cpu, range_started, range_finished = future.result()
+                    pages.extend(range_texts)
+                    cpu_seconds += range_cpu
+                    started, finished = min(started, range_started), max(finished, range_finished)
+            except Exception as e:
+                # The file's other ranges are not worth waiting for
+                for future in futures:
+                    future.cancel()
+                info["error"] = e
+                continue
+            info["pages"] = pages
+            self._report(info, len(futures), min(self.workers, len(futures)) or 1,
+                         max(finished - started, 0.0) if futures else 0.0, cpu_seconds)
+    
+    def _extract_one(self, pdf_path: Path) -> Dict[str, Any]:
+        result = self._extract_many([pdf_path])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+    
+    # ------------------------------------------------------------------
     def extract_text_from_pdf(self, pdf_path: str | Path) -> str:
         """Extract all text content from a PDF file.
         
@@ -40,19 +291,10 @@ class PDFProcessor:
             raise FileNotFoundError(f"PDF file not found: {pdf_path}")
         
         try:
-            doc = fitz.open(str(pdf_path))
-            text_content = []
-            
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text = page.get_text()
-                if text.strip():  # Only add non-empty pages
-                    text_content.append(text)
+            extracted = self._extract_one(pdf_path)
+            full_text = "\n\n".join(text for text in extracted["pages"] if text.strip())
             
-            doc.close()
-            full_text = "\n\n".join(text_content)
-            
-            logger.info(f"Extracted text from PDF: {pdf_path.name} ({len(doc)} pages, {len(full_text)} characters)")
+            logger.info(f"Extracted text from PDF: {pdf_path.name} ({extracted['page_count']} pages, {len(full_text)} characters)")
             return full_text
             
         except Exception as e:
@@ -71,23 +313,9 @@ class PDFProcessor:
         pdf_path = Path(pdf_path)
         
         try:
-            doc = fitz.open(str(pdf_path))
-            
-            # Extract metadata
-            metadata = doc.metadata
-            page_count = len(doc)
-            
-            # Extract text from all pages
-            text_content = []
-            for page_num in range(page_count):
-                page = doc.load_page(page_num)
-                text = page.get_text()
-                if text.strip():
-                    text_content.append(text)
-            
-            doc.close()
-            
-            full_text = "\n\n".join(text_content)
+            extracted = self._extract_one(pdf_path)
+            metadata = extracted["metadata"]
+            full_text = "\n\n".join(text for text in extracted["pages"] if text.strip())
             
             return {
                 "text": full_text,
@@ -99,7 +327,7 @@ class PDFProcessor:
                     "producer": metadata.get("producer", ""),
                     "creation_date": metadata.get("creationDate", ""),
                     "modification_date": metadata.get("modDate", ""),
-                    "page_count": page_count,
+                    "page_count": extracted["page_count"],
                     "file_size": pdf_path.stat().st_size,
                     "filename": pdf_path.name
                 }
@@ -122,66 +350,50 @@ class PDFProcessor:
         pdf_path = Path(pdf_path)
         
         try:
-            doc = fitz.open(str(pdf_path))
+            extracted = self._extract_one(pdf_path)
+            page_count = extracted["page_count"]
             documents = []
             
+            base_metadata: Dict[str, Any] = {}
+            # Add PDF metadata if available
+            pdf_metadata = extracted["metadata"]
+            if pdf_metadata.get("title"):
+                base_metadata["title"] = pdf_metadata["title"]
+            if pdf_metadata.get("author"):
+                base_metadata["author"] = pdf_metadata["author"]
+            
             if chunk_pages:
                 # Create one document per page
-                for page_num in range(len(doc)):
-                    page = doc.load_page(page_num)
-                    text = page.get_text()
-                    
+                for page_num, text in enumerate(extracted["pages"]):
                     if text.strip():  # Only process non-empty pages
                         metadata = {
                             "source": str(pdf_path),
                             "page": page_num + 1,
-                            "total_pages": len(doc),
+                            "total_pages": page_count,
                             "filename": pdf_path.name,
-                            "file_type": "pdf"
+                            "file_type": "pdf",
+                            **base_metadata,
                         }
-                        
-                        # Add PDF metadata if available
-                        pdf_metadata = doc.metadata
-                        if pdf_metadata.get("title"):
-                            metadata["title"] = pdf_metadata["title"]
-                        if pdf_metadata.get("author"):
-                            metadata["author"] = pdf_metadata["author"]
-                        
                         documents.append(Document(
                             page_content=text,
                             metadata=metadata
                         ))
             else:
                 # Create one document for entire PDF
-                text_content = []
-                for page_num in range(len(doc)):
-                    page = doc.load_page(page_num)
-                    text = page.get_text()
-                    if text.strip():
-                        text_content.append(text)
-                
+                text_content = [text for text in extracted["pages"] if text.strip()]
                 if text_content:
-                    full_text = "\n\n".join(text_content)
                     metadata = {
                         "source": str(pdf_path),
-                        "total_pages": len(doc),
+                        "total_pages": page_count,
                         "filename": pdf_path.name,
-                        "file_type": "pdf"
+                        "file_type": "pdf",
+                        **base_metadata,
                     }
-                    
-                    # Add PDF metadata if available
-                    pdf_metadata = doc.metadata
-                    if pdf_metadata.get("title"):
-                        metadata["title"] = pdf_metadata["title"]
-                    if pdf_metadata.get("author"):
-                        metadata["author"] = pdf_metadata["author"]
-                    
                     documents.append(Document(
-                        page_content=full_text,
+                        page_content="\n\n".join(text_content),
                         metadata=metadata
                     ))
             
-            doc.close()
             logger.info(f"Converted PDF to {len(documents)} LangChain documents: {pdf_path.name}")
             return documents
             
@@ -189,28 +401,215 @@ class PDFProcessor:
             logger.error(f"Failed to convert PDF to LangChain documents {pdf_path}: {e}")
             raise Exception(f"PDF to documents conversion failed: {e}")
     
-    def is_valid_pdf(self, pdf_path: str | Path) -> bool:
-        """Check if a file is a valid PDF that can be processed.
+    def extract_pages(self, pdf_path: str | Path) -> Dict[str, Any]:
+        """Extract per-page text and the outline of a PDF file.
         
         Args:
             pdf_path: Path to the PDF file
             
         Returns:
-            True if the file is a valid PDF, False otherwise
+            Dictionary with ``pages`` (text per page, empty pages included so
+            indices match page numbers), ``outline`` (``(level, title, page)``
+            bookmarks, pages 1-based), document ``metadata`` and the
+            ``extraction`` report (pages, ranges, workers, seconds, speedup)
         """
+        result = self.extract_pages_many([pdf_path])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+    
+    def extract_pages_many(self, pdf_paths: Sequence[str | Path],
+                           max_pages: int | None = None) -> List[Dict[str, Any] | Exception | None]:
+        """`extract_pages` for a batch of PDF files, sharing the worker pool.
+        
+        Page ranges of all files are extracted together, so a folder of small
+        PDFs keeps the workers as busy as one large PDF does.
+        
+        Args:
+            pdf_paths: Paths to the PDF files
+            max_pages: Files with more pages are left out (their result is
+                ``None``) so they can be streamed with `iter_pages` instead
+            
+        Returns:
+            One result per path, in order: the `extract_pages` dictionary, the
+            exception raised for that file, or ``None`` for files left out
+        """
+        pdf_paths = [Path(pdf_path) for pdf_path in pdf_paths]
+        results: List[Dict[str, Any] | Exception | None] = [None] * len(pdf_paths)
+        selected = list(range(len(pdf_paths)))
+        if max_pages is not None:
+            selected = []
+            for i, pdf_path in enumerate(pdf_paths):
+                try:
+                    if self._info(pdf_path)["page_count"] <= max_pages:
+                        selected.append(i)
+                except Exception:
+                    selected.append(i)  # reported with the batch
+        extracted_many = self._extract_many([pdf_paths[i] for i in selected])
+        for i, extracted in zip(selected, extracted_many):
+            pdf_path = pdf_paths[i]
+            if isinstance(extracted, Exception):
+                logger.error(f"Failed to extract pages from PDF {pdf_path}: {extracted}")
+                results[i] = Exception(f"PDF processing failed: {extracted}")
+                continue
+            results[i] = {"pages": extracted["pages"], "outline": extracted["outline"],
+                          "metadata": self._page_metadata(pdf_path, extracted),
+                          "extraction": extracted["extraction"]}
+        return results
+    
+    def extract_outline(self, pdf_path: str | Path) -> Dict[str, Any]:
+        """Outline and metadata of a PDF file, without extracting any text.
+        
+        Args:
+            pdf_path: Path to the PDF file
+            
+        Returns:
+            Dictionary with the ``outline`` and ``metadata`` of `extract_pages`,
+            to go with the pages of `iter_pages`
+        """
+        pdf_path = Path(pdf_path)
         try:
-            pdf_path = Path(pdf_path)
-            if not pdf_path.exists():
-                return False
+            info = self._info(pdf_path)
+        except Exception as e:
+            logger.error(f"Failed to read outline of PDF {pdf_path}: {e}")
+            raise Exception(f"PDF processing failed: {e}")
+        return {"outline": info["outline"], "metadata": self._page_metadata(pdf_path, info)}
+    
+    def iter_pages(self, pdf_path: str | Path) -> Iterator[str]:
+        """Yield the text of each page of a PDF file in order, extracting lazily.
+        
+        Empty pages are included so positions match page numbers. A PDF of at
+        least ``min_parallel_pages`` pages is extracted range by range on the
+        sandbox workers, at most two ranges per worker ahead of the consumer;
+        smaller ones a range at a time on one worker. Either way only a window of
+        pages is held in memory, however long the document. Cached files are
+        read back from the cache; others are added to it as they stream.
+        
+        Args:
+            pdf_path: Path to the PDF file
             
-            doc = fitz.open(str(pdf_path))
-            page_count = len(doc)
-            doc.close()
+        Yields:
+            Text of each page
+        """
+        pdf_path = Path(pdf_path)
+        return self._iter_pages(pdf_path, self._info(pdf_path))
+    
+    def _iter_pages(self, pdf_path: Path, info: Dict[str, Any]) -> Iterator[str]:
+        page_count = info["page_count"]
+        next_page = 0
+        if info.get("cached"):
+            try:
+                for text in self.cache.iter_pages(info["digest"], page_count):
+                    next_page += 1
+                    yield text
+                logger.info(f"Read {page_count} pages of {pdf_path.name} from the extraction cache")
+                return
+            except (LookupError, sqlite3.Error) as e:
+                logger.warning(f"Cached extraction of {pdf_path.name} unusable ({e}); extracting the rest")
+        
+        # Only a stream from the first page fills the cache
+        writer = self.cache.writer(info["digest"], info) if self.cache and next_page == 0 else None
+        for text in self._stream_pages(pdf_path, page_count, next_page):
+            if writer is not None:
+                writer.add(text)
+            yield text
+        if writer is not None:
+            writer.finish()
+    
+    def _stream_pages(self, pdf_path: Path, page_count: int, next_page: int) -> Iterator[str]:
+        started = time.time()
+        cpu_seconds = 0.0  # of the worker processes
+        ranges = 0
+        # Small documents keep one range in flight, so they do not occupy
+        # more than one worker
+        in_flight = self.workers * 2 if page_count - next_page >= self.min_parallel_pages else 1
+        sandbox = self.sandbox()
+        pending: Deque[Future] = deque()
+        starts = iter(range(next_page, page_count, _MIN_RANGE_PAGES))
+        try:
+            for start in starts:
+                pending.append(sandbox.submit(extract_page_range, str(pdf_path), start,
+                                              min(start + _MIN_RANGE_PAGES, page_count)))
+                ranges += 1
+                if len(pending) >= in_flight:
+                    break
+            while pending:
+                range_texts, range_cpu, _, _ = pending.popleft().result()
+                start = next(starts, None)
+                if start is not None:
+                    pending.append(sandbox.submit(extract_page_range, str(pdf_path), start,
+                                                  min(start + _MIN_RANGE_PAGES, page_count)))
+                    ranges += 1
+                cpu_seconds += range_cpu
+                yield from range_texts
+        except PDFExtractionError as e:
+            self._remember(pdf_path, e)
+            raise
+        finally:
+            for future in pending:
+                future.cancel()
+        
+        # Wall time includes the consumer's work between pages
+        logger.info(
+            f"Streamed {page_count} pages from {pdf_path.name} in {time.time() - started:.3f}s "
+            f"({ranges} ranges on workers, {cpu_seconds:.3f}s worker CPU)")
+    
+    @staticmethod
+    def _page_metadata(pdf_path: Path, info: Dict[str, Any]) -> Dict[str, Any]:
+        metadata: Dict[str, Any] = {
+            "total_pages": info["page_count"],
+            "filename": pdf_path.name,
+            "file_type": "pdf"
+        }
+        pdf_metadata = info["metadata"]
+        if pdf_metadata.get("title"):
+            metadata["title"] = pdf_metadata["title"]
+        if pdf_metadata.get("author"):
+            metadata["author"] = pdf_metadata["author"]
+        return metadata
+    
+    def validate(self, pdf_path: str | Path) -> Dict[str, str] | None:
+        """Check that a file is a PDF that can be processed within the limits.
+        
+        With an extraction cache, a file not seen before is extracted in
+        full – a stricter check than opening it – and the result cached, so
+        indexing it afterwards does not parse it again.
+        
+        Args:
+            pdf_path: Path to the PDF file
             
-            return page_count > 0
+        Returns:
+            ``None`` if the file can be processed, otherwise the ``reason``
+            (see `PDFExtractionError`) and ``detail`` of the failure, which
+            `failure` reports from then on
+        """
+        pdf_path = Path(pdf_path)
+        try:
+            info = self._info(pdf_path)
+            if self.cache is not None and not info.get("cached"):
+                for _ in self._iter_pages(pdf_path, info):
+                    pass
+            if info["page_count"] == 0:
+                raise PDFExtractionError("empty", "PDF has no pages")
+            return None
+        except PDFExtractionError as e:
+            self._remember(pdf_path, e)
+            return e.as_dict()
+        except Exception as e:
+            error = PDFExtractionError("invalid", f"{type(e).__name__}: {e}")
+            self._remember(pdf_path, error)
+            return error.as_dict()
+    
+    def is_valid_pdf(self, pdf_path: str | Path) -> bool:
+        """Check if a file is a valid PDF that can be processed (see `validate`).
+        
+        Args:
+            pdf_path: Path to the PDF file
             
-        except Exception:
-            return False
+        Returns:
+            True if the file is a valid PDF, False otherwise
+        """
+        return self.validate(pdf_path) is None
 
 
 # Singleton instance for easy access
@@ -221,5 +620,5 @@ def get_pdf_processor() -> PDFProcessor:
     """Get the singleton PDF processor instance."""
     global _pdf_processor_singleton
     if _pdf_processor_singleton is None:
-        _pdf_processor_singleton = PDFProcessor()
+        _pdf_processor_singleton = PDFProcessor(cache=PDFExtractionCache.from_settings())
     return _pdf_processor_singleton 
\ No newline at end of file
@@ -0,0 +1,302 @@
+"""Isolated worker processes for PDF parsing, with resource limits.
+
+PyMuPDF runs native code on untrusted input: a malformed, adversarial or
+simply huge PDF can hang it, exhaust memory or crash it outright. None of
+that may happen in an API process, so every PDF is opened in a sandbox
+worker process instead:
+
+* each worker runs with an address-space limit (``PDF_WORKER_MEMORY_MB``);
+* each task – reading a PDF's outline or a range of its pages – has a wall
+  time limit (``PDF_TASK_TIMEOUT``); a worker that overruns is killed and
+  replaced, as is one that ran out of memory or crashed;
+* files over ``PDF_MAX_MB`` or ``PDF_MAX_PAGES`` are refused before any
+  page is extracted.
+
+Failures surface as `PDFExtractionError` with a machine-readable
+``reason``, which callers record in the document metadata.
+"""
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows: no per-process memory limit
+    resource = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+# Failure reasons after which a worker is not reused
+_FATAL_REASONS = ("timeout", "memory", "crashed")
+# Seconds a new worker may take to start (spawn, import PyMuPDF); not
+# counted against the task timeout
+_START_TIMEOUT = 60.0
+
+
+class PDFExtractionError(Exception):
+    """A PDF that could not be processed, and why.
+
+    ``reason`` is one of ``missing``, ``too_large``, ``too_many_pages``,
+    ``empty``, ``invalid`` (PyMuPDF rejected it), ``timeout``, ``memory``
+    or ``crashed``.
+    """
+
+    def __init__(self, reason: str, detail: str):
+        super().__init__(f"{reason}: {detail}")
+        self.reason = reason
+        self.detail = detail
+
+    def as_dict(self) -> Dict[str, str]:
+        return {"reason": self.reason, "detail": self.detail}
+
+
+class SandboxLimits(NamedTuple):
+    """Resource limits of PDF processing; 0 means unlimited."""
+
+    max_pages: int = 0
+    max_bytes: int = 0
+    timeout: float = 0.0  # seconds per worker task
+    memory_mb: int = 0  # address space per worker process
+
+    @classmethod
+    def from_settings(cls) -> "SandboxLimits":
+        from app.core.config import get_settings
+        settings = get_settings()
+        return cls(max_pages=settings.pdf_max_pages,
+                   max_bytes=settings.pdf_max_mb * 1024 * 1024,
+                   timeout=settings.pdf_task_timeout,
+                   memory_mb=settings.pdf_worker_memory_mb)
+
+    def check_size(self, pdf_path: Path) -> None:
+        if not pdf_path.exists():
+            raise PDFExtractionError("missing", f"PDF file not found: {pdf_path}")
+        size = pdf_path.stat().st_size
+        if self.max_bytes and size > self.max_bytes:
+            raise PDFExtractionError(
+                "too_large", f"{size} bytes exceeds the limit of {self.max_bytes} bytes")
+
+    def check_pages(self, page_count: int) -> None:
+        if self.max_pages and page_count > self.max_pages:
+            raise PDFExtractionError(
+                "too_many_pages", f"{page_count} pages exceeds the limit of {self.max_pages} pages")
+
+
+# Tasks (run in the workers) -------------------------------------------
+def read_info(pdf_path: str) -> Dict[str, Any]:
+    """Page count, outline and raw metadata of a PDF, without extracting text."""
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(pdf_path)
+    try:
+        return {
+            "page_count": len(doc),
+            "outline": [(level, title, page) for level, title, page in doc.get_toc(simple=True)],
+            "metadata": doc.metadata or {},
+        }
+    finally:
+        doc.close()
+
+
+def extract_page_range(pdf_path: str, start: int, end: int) -> Tuple[List[str], float, float, float]:
+    """Text of pages ``start`` to ``end - 1``, with the CPU seconds it took
+    and the wall-clock time it started and finished."""
+    import fitz  # PyMuPDF
+
+    started, cpu_started = time.time(), time.process_time()
+    doc = fitz.open(pdf_path)
+    try:
+        pages = [doc.load_page(page_num).get_text() for page_num in range(start, end)]
+    finally:
+        doc.close()
+    return pages, time.process_time() - cpu_started, started, time.time()
+
+
+def _worker_main(conn, memory_mb: int) -> None:
+    # Interrupts are the parent's to handle; it stops the workers itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if memory_mb and resource is not None:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    try:
+        import fitz  # noqa: F401 – imported once, before any task is timed
+    except (ImportError, MemoryError):
+        pass  # the tasks report it
+    conn.send("ready")
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        if task is None:
+            return
+        fn, args = task
+        try:
+            reply = ("ok", fn(*args))
+        except MemoryError:
+            reply = ("error", "memory", f"worker memory limit of {memory_mb} MB exceeded")
+        except Exception as e:
+            reply = ("error", "invalid", f"{type(e).__name__}: {e}")
+        try:
+            conn.send(reply)
+        except MemoryError:
+            conn.send(("error", "memory", f"worker memory limit of {memory_mb} MB exceeded"))
+
+
+# Pool ------------------------------------------------------------------
+class _Worker:
+    """One sandbox process and the pipe to it."""
+
+    def __init__(self, context, memory_mb: int):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child, memory_mb), daemon=True,
+                                       name="pdf-sandbox")
+        self.process.start()
+        child.close()
+        self.ready = False
+
+    def _receive(self) -> Any:
+        try:
+            return self.conn.recv()
+        except (EOFError, OSError):
+            self.process.join(1)
+            exitcode = self.process.exitcode
+            if exitcode == -signal.SIGKILL:
+                raise PDFExtractionError("memory", "worker was killed (likely out of memory)")
+            raise PDFExtractionError("crashed", f"worker exited with code {exitcode}")
+
+    def call(self, fn: Callable, args: Tuple, timeout: float) -> Any:
+        if not self.ready:
+            if not self.conn.poll(_START_TIMEOUT):
+                raise PDFExtractionError("crashed", f"worker did not start within {_START_TIMEOUT:g}s")
+            self.ready = self._receive() == "ready"
+        self.conn.send((fn, args))
+        if not self.conn.poll(timeout if timeout > 0 else None):
+            raise PDFExtractionError("timeout", f"{fn.__name__} took longer than {timeout:g}s")
+        status, *payload = self._receive()
+        if status == "ok":
+            return payload[0]
+        raise PDFExtractionError(*payload)
+
+    def stop(self, kill: bool = False) -> None:
+        if not kill:
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                kill = True
+            else:
+                self.process.join(5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class PDFSandbox:
+    """Pool of sandbox worker processes running PDF tasks under `SandboxLimits`.
+
+    Workers are spawned (not forked: the API process runs threads whose
+    locks a forked child would inherit) on first use and reused across
+    tasks; one that timed out, ran out of memory or crashed is killed and
+    replaced by a fresh process. `submit` returns a future, `run` blocks;
+    both raise `PDFExtractionError` on failure. Thread-safe.
+    """
+
+    def __init__(self, workers: int, limits: SandboxLimits):
+        self.workers = max(workers, 1)
+        self.limits = limits
+        self.recycled = 0
+        self._context = multiprocessing.get_context("spawn")
+        self._idle: List[_Worker] = []
+        self._live = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._dispatch: Optional[ThreadPoolExecutor] = None
+
+    def _acquire(self) -> _Worker:
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("PDF sandbox is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._live < self.workers:
+                    self._live += 1
+                    break
+                self._condition.wait()
+        try:
+            return _Worker(self._context, self.limits.memory_mb)
+        except Exception:
+            with self._condition:
+                self._live -= 1
+                self._condition.notify()
+            raise
+
+    def _release(self, worker: Optional[_Worker]) -> None:
+        with self._condition:
+            if worker is None:
+                self._live -= 1
+            elif self._closed:
+                self._live -= 1
+                worker.stop()
+            else:
+                self._idle.append(worker)
+            self._condition.notify()
+
+    def run(self, fn: Callable, *args: Any) -> Any:
+        """Run ``fn(*args)`` in a worker and return its result."""
+        worker: Optional[_Worker] = self._acquire()
+        try:
+            return worker.call(fn, args, self.limits.timeout)
+        except PDFExtractionError as e:
+            if e.reason in _FATAL_REASONS:
+                worker.stop(kill=True)
+                worker = None
+                self.recycled += 1
+                logger.warning("Replaced PDF sandbox worker after %s: %s", e.reason, e.detail)
+            raise
+        except BaseException:
+            # The pipe may hold a half-sent task or an unread reply
+            worker.stop(kill=True)
+            worker = None
+            raise
+        finally:
+            self._release(worker)
+
+    def submit(self, fn: Callable, *args: Any) -> Future:
+        """`run` in the background; at most one task per worker runs at a time."""
+        with self._condition:
+            if self._dispatch is None:
+                self._dispatch = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix="pdf-sandbox")
+            dispatch = self._dispatch
+        return dispatch.submit(self.run, fn, *args)
+
+    def close(self) -> None:
+        """Stop all workers; tasks still running finish first."""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._live -= len(idle)
+            dispatch, self._dispatch = self._dispatch, None
+            self._condition.notify_all()
+        if dispatch is not None:
+            dispatch.shutdown(wait=True, cancel_futures=True)
+        for worker in idle:
+            worker.stop()
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            return {"workers": self._live, "idle": len(self._idle), "recycled": self.recycled}
+
+
+def default_workers(workers: int, cap: int = 8) -> int:
+    """Configured worker count; 0 = one per CPU, up to ``cap``."""
+    return workers if workers > 0 else min(os.cpu_count() or 1, cap)
@@ -0,0 +1,320 @@
+"""Per-policy summaries and coverage tables, extracted at index build time.
+
+Most coverage questions – what a policy covers, its limits, deductibles and
+exclusions – are answered by lists the policies state plainly under
+recognisable headings. Those lists are pulled out of each document's
+section map once, when the document is indexed, and kept in a JSON file next
+to the index versions. Lookups are a dictionary access by policy name or
+code, so they need no embedding call or similarity search.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .chunking import Section
+from .lexical_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+FACTS_FILE = "policy_facts.json"
+TOPICS = ("summary", "coverages", "limits", "deductibles", "exclusions")
+
+# Heading patterns per table, most specific first: "Coverage Limits" holds
+# limits and "Deductible Options" deductibles, not coverages.
+_TABLE_HEADINGS: Tuple[Tuple[str, re.Pattern], ...] = (
+    ("exclusions", re.compile(r"exclu|not covered|uitsluiting|niet verzekerd", re.IGNORECASE)),
+    ("deductibles", re.compile(r"deductible|eigen risico", re.IGNORECASE)),
+    ("limits", re.compile(r"\blimits?\b|limiet|verzekerd bedrag", re.IGNORECASE)),
+)
+_COVERAGE_HEADING = re.compile(r"\bcoverages?\b|\bperils\b|dekking", re.IGNORECASE)
+_NOT_COVERAGE_HEADING = re.compile(r"overview|territory|review|overzicht", re.IGNORECASE)
+# Advice to the reader ("Recommendations: Higher Liability Limits") is not policy terms
+_ADVICE_HEADING = re.compile(r"recommend|advies|aanbevel", re.IGNORECASE)
+_OVERVIEW_HEADING = re.compile(r"overview|overzicht|samenvatting", re.IGNORECASE)
+
+_NUMBER_PREFIX_RE = re.compile(r"^Section\s+[\w.]+\s*:\s*", re.IGNORECASE)
+_ITEM_RE = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+(.+?)\s*$", re.MULTILINE)
+# "Collision: $500 per incident"
+_VALUE_RE = re.compile(r"^([^:]{1,60}):\s+(.+)$")
+# "**Policy Code:** COMP-AUTO-001" lines between the title and the first section
+_ATTRIBUTE_RE = re.compile(r"^\s*(?:\*\*)?([A-Z][\w /-]{1,40}?):(?:\*\*)?\s+(.+?)\s*$", re.MULTILINE)
+# Attributes that name a policy, so it can be looked up by them
+_NAMING_ATTRIBUTE_RE = re.compile(r"type|code|name|number", re.IGNORECASE)
+_SUMMARY_CHARS = 600
+# Attributes are only read this far into a document without subheadings
+_PREAMBLE_CHARS = 2000
+# Words that do not tell policies apart in lookup keys
+_KEY_STOPWORDS = {"policy", "insurance", "md", "pdf"}
+
+
+def _heading(section: Section) -> str:
+    return _NUMBER_PREFIX_RE.sub("", section.title).strip()
+
+
+def _body(text: str, section: Section) -> str:
+    """Section text without its heading line."""
+    body = text[section.start:section.end]
+    if section.title and body.lstrip().startswith("#"):
+        body = body.split("\n", 1)[1] if "\n" in body else ""
+    return body.strip()
+
+
+def _table(path: Sequence[Section]) -> Optional[str]:
+    """Table for a section's items given its heading path (own heading first)."""
+    if any(_ADVICE_HEADING.search(section.title) for section in path):
+        return None
+    for section in path:
+        for table, pattern in _TABLE_HEADINGS:
+            if pattern.search(section.title):
+                return table
+    for section in path:
+        if _NOT_COVERAGE_HEADING.search(section.title):
+            return None
+        if _COVERAGE_HEADING.search(section.title):
+            return "coverages"
+    return None
+
+
+def _entry(item: str, section: Section) -> Dict[str, Any]:
+    entry: Dict[str, Any] = {"text": item}
+    value = _VALUE_RE.match(item)
+    if value:
+        entry["item"], entry["value"] = value.group(1).strip(), value.group(2).strip()
+    entry["group"] = _heading(section)
+    entry["section"] = section.label
+    return entry
+
+
+class PolicyFactsCollector:
+    """Summary and coverage tables of one document, built section by section.
+
+    Feed it the document's section map in order with `add` (e.g. as the
+    `DocumentChunker.split_stream` ``on_section`` hook), then read `facts`.
+    Only the preamble and the facts themselves are kept, so it works on
+    documents read as a stream. Facts are a shortcut: an error while
+    collecting is logged and ends collection instead of propagating.
+    """
+
+    def __init__(self, document_id: str, policy_type: str):
+        self.document_id = document_id
+        self.policy_type = policy_type
+        self.failed = False
+        self._preamble: Optional[str] = ""  # None once attributes are read
+        self._attributes: Dict[str, str] = {}
+        self._title: Optional[str] = None
+        self._summary = ""
+        self._first_paragraph = ""
+        self._tables: Dict[str, List[Any]] = {"coverages": [], "limits": [], "deductibles": [],
+                                              "exclusions": []}
+        self._open_headings: List[Section] = []
+
+    def add(self, text, section: Section) -> None:
+        """Take in the next section; ``text`` slices the document by offset."""
+        if self.failed:
+            return
+        try:
+            self._add(text, section)
+        except Exception as e:
+            logger.warning("Could not extract policy facts from %s: %s", self.document_id, e)
+            self.failed = True
+
+    def _add(self, text, section: Section) -> None:
+        if self._preamble is not None:
+            # Attributes sit between the title and the first section heading
+            if section.title and section.level > 1:
+                self._read_attributes()
+            else:
+                self._preamble += text[section.start:min(section.end, section.start + _PREAMBLE_CHARS)]
+                if len(self._preamble) >= _PREAMBLE_CHARS:
+                    self._read_attributes()
+        if self._title is None and section.title and section.level == 1:
+            self._title = section.title
+
+        if section.level:
+            while self._open_headings and self._open_headings[-1].level >= section.level:
+                self._open_headings.pop()
+            self._open_headings.append(section)
+        body = _body(text, section)
+        if not self._first_paragraph:
+            paragraph = body.split("\n\n", 1)[0].strip()
+            if paragraph and not _ITEM_RE.match(paragraph) and not _ATTRIBUTE_RE.match(paragraph):
+                self._first_paragraph = paragraph[:_SUMMARY_CHARS]
+        if not body or not section.title:
+            return
+        if not self._summary and _OVERVIEW_HEADING.search(section.title):
+            self._summary = body.split("\n\n", 1)[0].strip()[:_SUMMARY_CHARS]
+        items = _ITEM_RE.findall(body)
+        table = _table(list(reversed(self._open_headings)))
+        if not items or table is None:
+            return
+        if table == "coverages":
+            self._tables["coverages"].append({"name": _heading(section), "section": section.label,
+                                              "details": items})
+        else:
+            self._tables[table].extend(_entry(item, section) for item in items)
+
+    def _read_attributes(self) -> None:
+        self._attributes = {key.strip(): value.strip().strip("*").strip()
+                            for key, value in _ATTRIBUTE_RE.findall(self._preamble[:_PREAMBLE_CHARS])}
+        self._preamble = None
+
+    def facts(self, language: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """The document's facts, or ``None`` if collecting them failed."""
+        if self.failed:
+            return None
+        if self._preamble is not None:
+            self._read_attributes()
+        return {
+            "document_id": self.document_id,
+            "policy_type": self.policy_type,
+            "title": self._title or self.policy_type,
+            "language": language,
+            "attributes": self._attributes,
+            # No overview heading: the first paragraph of prose stands in
+            "summary": self._summary or self._first_paragraph,
+            **self._tables,
+        }
+
+
+def extract_policy_facts(text: str, sections: List[Section], document_id: str,
+                         policy_type: str, language: Optional[str] = None) -> Dict[str, Any]:
+    """Summary and coverage tables of one document.
+
+    ``sections`` is the document's section map (see `chunking`). Items are
+    the bullet or numbered lines of each section, assigned to a table by the
+    section's heading or the nearest enclosing heading that names one.
+    """
+    collector = PolicyFactsCollector(document_id, policy_type)
+    for section in sections:
+        collector._add(text, section)
+    return collector.facts(language)
+
+
+def policy_key(name: str) -> str:
+    """Lookup key of a policy name, file name or code.
+
+    "Motorcycle Policy", "motorcycle_policy.md" and "Motorcycle Insurance"
+    share the key "motorcycle".
+    """
+    return " ".join(token for token in tokenize(name.replace("_", " "))
+                    if token not in _KEY_STOPWORDS)
+
+
+def _keys_of(facts: Dict[str, Any]) -> List[str]:
+    names = [facts["document_id"], facts["policy_type"], facts.get("title") or ""]
+    names += [value for key, value in facts.get("attributes", {}).items()
+              if _NAMING_ATTRIBUTE_RE.search(key)]
+    return [key for key in (policy_key(name) for name in names) if key]
+
+
+class PolicyFactsStore:
+    """Facts of every indexed document, by document id, in one JSON file.
+
+    The file is rewritten atomically on every change, and each lookup checks
+    its modification time, so all workers see changes made by any of them.
+    Writers serialise on the index write lock.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._facts: Dict[str, Dict[str, Any]] = {}
+        self._by_key: Dict[str, str] = {}
+        self._stamp: Optional[Tuple[int, int]] = None
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    # Reading ------------------------------------------------------------
+    def _current(self) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+        """Facts and key map, re-read if another writer replaced the file."""
+        try:
+            stat = self.path.stat()
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            stamp = None
+        with self._lock:
+            if stamp != self._stamp:
+                facts: Dict[str, Dict[str, Any]] = {}
+                if stamp is not None:
+                    try:
+                        with open(self.path, "r", encoding="utf-8") as f:
+                            facts = json.load(f)
+                    except (OSError, ValueError) as e:
+                        logger.warning("Could not read policy facts %s: %s", self.path, e)
+                self._set(facts, stamp)
+            return self._facts, self._by_key
+
+    def _set(self, facts: Dict[str, Dict[str, Any]], stamp: Optional[Tuple[int, int]]) -> None:
+        by_key: Dict[str, str] = {}
+        for document_id, entry in sorted(facts.items()):
+            for key in _keys_of(entry):
+                by_key.setdefault(key, document_id)
+        self._facts, self._by_key, self._stamp = facts, by_key, stamp
+
+    def get(self, policy: str) -> Optional[Dict[str, Any]]:
+        """Facts of the policy named by document id, policy type, title or code.
+
+        A partial name ("comprehensive") matches when exactly one policy's
+        key contains all its words.
+        """
+        facts, by_key = self._current()
+        key = policy_key(policy)
+        if not key:
+            return None
+        if key in by_key:
+            return facts[by_key[key]]
+        words = set(key.split())
+        matches = {document_id for candidate, document_id in by_key.items()
+                   if words <= set(candidate.split())}
+        return facts[matches.pop()] if len(matches) == 1 else None
+
+    def of_document(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """Facts stored for exactly this document id."""
+        facts, _ = self._current()
+        return facts.get(document_id)
+
+    def policies(self) -> List[Dict[str, Any]]:
+        """Document id, policy type and code of every policy with facts."""
+        facts, _ = self._current()
+        return [{"document_id": entry["document_id"], "policy_type": entry["policy_type"],
+                 "policy_code": entry.get("attributes", {}).get("Policy Code")}
+                for _, entry in sorted(facts.items())]
+
+    # Writing (under the index write lock) ---------------------------------
+    def replace_all(self, facts: Dict[str, Dict[str, Any]]) -> None:
+        self._write(dict(facts))
+
+    def put(self, document_id: str, facts: Dict[str, Any]) -> None:
+        current, _ = self._current()
+        self._write({**current, document_id: facts})
+
+    def update(self, facts: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        """Put or (for ``None``) remove the facts of several documents at once."""
+        current, _ = self._current()
+        updated = {k: v for k, v in current.items() if k not in facts}
+        updated.update({k: v for k, v in facts.items() if v})
+        self._write(updated)
+
+    def remove(self, document_id: str) -> None:
+        current, _ = self._current()
+        if document_id in current:
+            self._write({k: v for k, v in current.items() if k != document_id})
+
+    def _write(self, facts: Dict[str, Dict[str, Any]]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(facts, f, ensure_ascii=False, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        stat = self.path.stat()
+        with self._lock:
+            self._set(facts, (stat.st_mtime_ns, stat.st_size))
@@ -0,0 +1,372 @@
+"""Searchable policy index: an on-disk snapshot plus in-memory changes.
+
+The snapshot (`IndexSnapshot`) is immutable and memory-mapped. Chunks added
+since it was written live in small in-memory `DeltaSegment`s with exact
+flat indexes; removed chunks, in any part, are tombstoned. Positions are
+global – each segment continues where the previous part ends – so dense
+hits, BM25 hits, partition filters and tombstones all share one id space.
+A new segment absorbs the last one while that is no larger, so a run of
+small changes keeps a logarithmic number of segments; compaction folds
+everything into a new snapshot.
+
+A `PolicyIndex` is never modified once published. `with_changes` returns a
+new index that shares the snapshot and existing segments (copy-on-write),
+so searches run without locks against whichever index they started with.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from .ann_index import AnnIndexConfig, compression_of, index_type_of, rerank_exact, search_parameters
+from .dedup import best_match, lsh_buckets, signature
+from .index_snapshot import IndexSnapshot, document_ids_of
+from .lexical_index import BM25Index, bm25_search, matches_all_terms
+from .partitions import MetadataPartitions, normalise_filters
+
+logger = logging.getLogger(__name__)
+
+# (size, deletions, tombstones) at a point in time; see `PolicyIndex.mark`
+Mark = Tuple[int, int, frozenset]
+
+# Segments up to this many chunks are always merged into the next one
+SEGMENT_MERGE_MIN = 256
+
+# Filters letting at most this many snapshot positions through are scored
+# exactly against the stored vectors instead of through an ANN index
+EXACT_FILTER_MAX = 4096
+
+
+def _faiss():
+    from langchain_community.vectorstores.faiss import dependable_faiss_import
+    return dependable_faiss_import()
+
+
+class DeltaSegment:
+    """Chunks added by one change, at positions ``offset`` onwards (read-only once built)."""
+
+    def __init__(self, offset: int, chunk_ids: List[str], documents: List[Document],
+                 vectors: np.ndarray):
+        self.offset = offset
+        self.chunk_ids = list(chunk_ids)
+        self.documents = list(documents)
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.index = _faiss().IndexFlatL2(self.vectors.shape[1])
+        self.index.add(self.vectors)
+        self.lexical = BM25Index()
+        self.partitions = MetadataPartitions()
+        self.position_by_chunk_id: Dict[str, int] = {}
+        self.positions_by_document: Dict[str, List[int]] = {}
+        # LSH bucket → positions, for near-duplicate lookups
+        self.buckets: Dict[int, List[int]] = {}
+        for position, (chunk_id, doc) in enumerate(zip(self.chunk_ids, self.documents), start=offset):
+            self.lexical.add(position, doc.page_content)
+            self.partitions.add(position, doc.metadata, doc.page_content)
+            self.position_by_chunk_id[chunk_id] = position
+            for document_id in document_ids_of(doc.metadata):
+                self.positions_by_document.setdefault(document_id, []).append(position)
+            for bucket in set(lsh_buckets(signature(doc.page_content))):
+                self.buckets.setdefault(bucket, []).append(position)
+
+    def __len__(self) -> int:
+        return len(self.chunk_ids)
+
+    @property
+    def end(self) -> int:
+        return self.offset + len(self.chunk_ids)
+
+
+class PolicyIndex:
+    """Snapshot + delta segments + tombstones, searched as one index."""
+
+    def __init__(self, snapshot: IndexSnapshot, config: AnnIndexConfig,
+                 segments: Tuple[DeltaSegment, ...] = (), tombstones: frozenset = frozenset(),
+                 deleted_chunk_ids: Tuple[str, ...] = ()):
+        self.snapshot = snapshot
+        self.config = config
+        self.segments = segments
+        self.tombstones = tombstones
+        # Chunk ids in deletion order, so compaction can carry later deletes over
+        self.deleted_chunk_ids = deleted_chunk_ids
+        base = snapshot.size
+        self._base_exclusion = np.fromiter((p for p in tombstones if p < base), dtype=np.int64)
+
+    # ------------------------------------------------------------------
+    @property
+    def dim(self) -> int:
+        return self.snapshot.dim
+
+    @property
+    def size(self) -> int:
+        """Positions in use, including tombstoned ones."""
+        return self.segments[-1].end if self.segments else self.snapshot.size
+
+    @property
+    def delta_size(self) -> int:
+        return self.size - self.snapshot.size
+
+    @property
+    def live_count(self) -> int:
+        return self.size - len(self.tombstones)
+
+    @property
+    def index_type(self) -> str:
+        return index_type_of(self.snapshot.index)
+
+    @property
+    def compression(self) -> str:
+        return compression_of(self.snapshot.index)
+
+    def _segment_of(self, position: int) -> DeltaSegment:
+        for segment in self.segments:
+            if position < segment.end:
+                return segment
+        raise IndexError(position)
+
+    # Lookups ----------------------------------------------------------
+    def positions_of(self, chunk_ids: List[str]) -> Dict[str, int]:
+        """Positions of the given chunks that are live."""
+        found = self.snapshot.positions_of(chunk_ids)
+        for segment in self.segments:
+            found.update((c, segment.position_by_chunk_id[c])
+                         for c in chunk_ids if c in segment.position_by_chunk_id)
+        return {c: p for c, p in found.items() if p not in self.tombstones}
+
+    def indexed(self, chunk_ids: List[str]) -> Set[str]:
+        """The given chunks that were ever indexed here (live or tombstoned)."""
+        found = set(self.snapshot.positions_of(chunk_ids))
+        for segment in self.segments:
+            found.update(c for c in chunk_ids if c in segment.position_by_chunk_id)
+        return found
+
+    def document_chunk_ids(self, document_id: str) -> List[str]:
+        chunks = list(self.snapshot.document_chunks(document_id))
+        for segment in self.segments:
+            chunks.extend((segment.chunk_ids[p - segment.offset], p)
+                          for p in segment.positions_by_document.get(document_id, []))
+        return [c for c, p in chunks if p not in self.tombstones]
+
+    def near_duplicates(self, texts: List[str], threshold: float) -> List[Optional[int]]:
+        """Live position of the closest near-duplicate of each text, or ``None``."""
+        signatures = [signature(text) for text in texts]
+        candidates: List[Set[int]] = []
+        for sig in signatures:
+            buckets = lsh_buckets(sig)
+            found = self.snapshot.duplicate_candidates(buckets)
+            for segment in self.segments:
+                found.update(p for bucket in buckets for p in segment.buckets.get(bucket, ()))
+            candidates.append(found - self.tombstones)
+        documents = self.documents(list(set().union(*candidates)))
+        indexed = {p: signature(doc.page_content) for p, doc in documents.items()}
+        return [best_match(sig, found, indexed.__getitem__, threshold)
+                for sig, found in zip(signatures, candidates)]
+
+    def chunk_ids(self, positions: List[int]) -> Dict[int, str]:
+        base = self.snapshot.size
+        out = self.snapshot.chunk_ids(p for p in positions if p < base)
+        for p in positions:
+            if p >= base:
+                segment = self._segment_of(p)
+                out[p] = segment.chunk_ids[p - segment.offset]
+        return out
+
+    def documents(self, positions: List[int]) -> Dict[int, Document]:
+        base = self.snapshot.size
+        out = self.snapshot.documents(p for p in positions if p < base)
+        for p in positions:
+            if p >= base:
+                segment = self._segment_of(p)
+                out[p] = segment.documents[p - segment.offset]
+        return out
+
+    def exact_vectors(self, positions: List[int]) -> np.ndarray:
+        rows = []
+        for p in positions:
+            if p < self.snapshot.size:
+                rows.append(self.snapshot.vectors[p])
+            else:
+                segment = self._segment_of(p)
+                rows.append(segment.vectors[p - segment.offset])
+        return np.vstack(rows).astype(np.float32, copy=False)
+
+    # Changes ----------------------------------------------------------
+    def with_changes(self, chunk_ids: List[str] = (), texts: List[str] = (),
+                     metadatas: List[Dict[str, Any]] = (), vectors: Optional[np.ndarray] = None,
+                     deleted: List[str] = ()) -> "PolicyIndex":
+        """New index with the chunks added, then ``deleted`` tombstoned.
+
+        The chunks form a new segment, which absorbs the trailing segments
+        no larger than it (or than `SEGMENT_MERGE_MIN`). Chunks already
+        present are not added again and ids that are not live are not
+        deleted, so replaying a change is harmless.
+        """
+        present = self.indexed(list(chunk_ids)) if len(chunk_ids) else set()
+        keep = [i for i, chunk_id in enumerate(chunk_ids) if chunk_id not in present]
+        segments = self.segments
+        if keep:
+            ids = [chunk_ids[i] for i in keep]
+            documents = [Document(page_content=texts[i], metadata=metadatas[i]) for i in keep]
+            added = np.asarray(vectors, dtype=np.float32)[keep]
+            while segments and len(segments[-1]) <= max(len(ids), SEGMENT_MERGE_MIN):
+                merged, segments = segments[-1], segments[:-1]
+                ids = merged.chunk_ids + ids
+                documents = merged.documents + documents
+                added = np.vstack([merged.vectors, added])
+            offset = segments[-1].end if segments else self.snapshot.size
+            segments = segments + (DeltaSegment(offset, ids, documents, added),)
+        index = PolicyIndex(self.snapshot, self.config, segments, self.tombstones,
+                            self.deleted_chunk_ids)
+        positions = index.positions_of(list(deleted)) if deleted else {}
+        if not positions:
+            return index
+        return PolicyIndex(self.snapshot, self.config, segments,
+                           self.tombstones | frozenset(positions.values()),
+                           self.deleted_chunk_ids + tuple(positions))
+
+    # Search -----------------------------------------------------------
+    def resolve(self, filters: Optional[Dict[str, Any]]) -> Optional[Set[int]]:
+        """Live positions matching metadata filters; ``None`` means unfiltered.
+
+        Raises:
+            ValueError: If a filter names an unknown field
+        """
+        normalised = normalise_filters(filters)
+        if not normalised:
+            return None
+        allowed = self.snapshot.resolve(normalised)
+        for segment in self.segments:
+            allowed |= segment.partitions.resolve(normalised) or set()
+        return allowed - self.tombstones
+
+    def _lexical_segments(self) -> List[Any]:
+        return [self.snapshot, *(segment.lexical for segment in self.segments)]
+
+    def lexical_search(self, query: str, k: int, allowed: Optional[Set[int]] = None
+                       ) -> List[Tuple[int, float]]:
+        return bm25_search(self._lexical_segments(), query, k, allowed, self.tombstones)
+
+    def matches_all_terms(self, query: str, allowed: Optional[Set[int]] = None) -> bool:
+        return matches_all_terms(self._lexical_segments(), query, allowed, self.tombstones)
+
+    def dense_search(self, vectors: np.ndarray, k: int, allowed: Optional[Set[int]] = None
+                     ) -> List[List[Tuple[int, float]]]:
+        """``(position, squared L2 distance)`` lists per query vector, nearest first.
+
+        The snapshot and each segment are searched separately – pre-filtered
+        by an ID selector for ``allowed`` or the tombstones – and merged.
+        Compressed snapshot hits are re-ranked with exact vectors. HNSW and
+        IVF snapshots score small ``allowed`` sets (up to `EXACT_FILTER_MAX`)
+        exactly and widen their search for larger ones.
+        """
+        faiss = _faiss()
+        base = self.snapshot.size
+        hits: List[List[Tuple[int, float]]] = [[] for _ in range(len(vectors))]
+
+        # Snapshot
+        index = self.snapshot.index
+        live = base - len(self._base_exclusion)
+        selector, limit = None, live
+        if allowed is not None:
+            in_base = np.fromiter((p for p in allowed if p < base), dtype=np.int64)
+            selector, limit = faiss.IDSelectorBatch(in_base), len(in_base)
+        elif len(self._base_exclusion):
+            selector = faiss.IDSelectorNot(faiss.IDSelectorBatch(self._base_exclusion))
+        if limit > 0 and allowed is not None and self.index_type != "flat" and limit <= EXACT_FILTER_MAX:
+            distances, positions = self._exact_search(vectors, k, np.sort(in_base))
+            for row, (row_d, row_p) in enumerate(zip(distances, positions)):
+                hits[row].extend((int(p), float(d)) for d, p in zip(row_d, row_p))
+        elif limit > 0:
+            rerank = self.compression != "none" and self.config.rerank_depth > 0
+            fetch = min(max(k, self.config.rerank_depth) if rerank else k, limit)
+            params = search_parameters(index, self.config, selector, limit / max(live, 1))
+            if params is None:
+                distances, positions = index.search(vectors, fetch)
+            else:
+                distances, positions = index.search(vectors, fetch, params=params)
+            if rerank:
+                candidates = {int(p) for p in positions.ravel() if p != -1}
+                exact = {p: np.asarray(self.snapshot.vectors[p]) for p in candidates}
+                distances, positions = rerank_exact(vectors, distances, positions, exact, min(k, limit))
+            for row, (row_d, row_p) in enumerate(zip(distances, positions)):
+                hits[row].extend((int(p), float(d)) for d, p in zip(row_d, row_p) if p != -1)
+
+        # Segments (exact flat indexes, local ids)
+        for segment in self.segments:
+            if allowed is not None:
+                local = [p - segment.offset for p in allowed if segment.offset <= p < segment.end]
+            else:
+                local = [i for i in range(len(segment)) if i + segment.offset not in self.tombstones]
+            if not local:
+                continue
+            selector = faiss.IDSelectorBatch(np.asarray(local, dtype=np.int64))
+            distances, positions = segment.index.search(
+                vectors, min(k, len(local)), params=faiss.SearchParameters(sel=selector))
+            for row, (row_d, row_p) in enumerate(zip(distances, positions)):
+                hits[row].extend((int(p) + segment.offset, float(d))
+                                 for d, p in zip(row_d, row_p) if p != -1)
+
+        return [sorted(row, key=lambda hit: hit[1])[:k] for row in hits]
+
+    def _exact_search(self, vectors: np.ndarray, k: int, positions: np.ndarray
+                      ) -> Tuple[np.ndarray, np.ndarray]:
+        """Brute-force nearest ``k`` of the snapshot ``positions`` (sorted) per query."""
+        rows = np.asarray(self.snapshot.vectors[positions], dtype=np.float32)
+        queries = np.asarray(vectors, dtype=np.float32)
+        distances = ((queries ** 2).sum(axis=1)[:, None] - 2 * queries @ rows.T
+                     + (rows ** 2).sum(axis=1)[None, :])
+        np.maximum(distances, 0, out=distances)
+        k = min(k, len(positions))
+        nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        nearest_d = np.take_along_axis(distances, nearest, axis=1)
+        order = np.argsort(nearest_d, axis=1)
+        return (np.take_along_axis(nearest_d, order, axis=1),
+                positions[np.take_along_axis(nearest, order, axis=1)])
+
+    # Compaction -------------------------------------------------------
+    def mark(self) -> Mark:
+        """Point-in-time marker for `iter_live` and `changes_since`."""
+        return self.size, len(self.deleted_chunk_ids), self.tombstones
+
+    def iter_live(self, mark: Mark, batch_size: int = 1000
+                  ) -> Iterator[Tuple[List[str], List[str], List[Dict[str, Any]], np.ndarray]]:
+        """Batches of live ``(chunk_ids, texts, metadatas, vectors)`` as of ``mark``."""
+        size, _, tombstones = mark
+        for rows in self.snapshot.iter_chunks(batch_size):
+            rows = [row for row in rows if row[0] not in tombstones]
+            if rows:
+                yield ([r[1] for r in rows], [r[2] for r in rows], [r[3] for r in rows],
+                       np.asarray(self.snapshot.vectors[[r[0] for r in rows]], dtype=np.float32))
+        for segment in self.segments:
+            live = [i for i in range(min(len(segment), size - segment.offset))
+                    if i + segment.offset not in tombstones]
+            if live:
+                yield ([segment.chunk_ids[i] for i in live],
+                       [segment.documents[i].page_content for i in live],
+                       [segment.documents[i].metadata for i in live],
+                       segment.vectors[live])
+
+    def changes_since(self, mark: Mark
+                      ) -> Tuple[List[str], List[str], List[Dict[str, Any]], np.ndarray, List[str]]:
+        """Adds (ids, texts, metadatas, vectors) and deleted ids after ``mark``.
+
+        ``mark`` must come from this index or one it was derived from.
+        """
+        size, num_deleted, _ = mark
+        # (segment, first local index) of everything added after the mark
+        added = [(s, max(size - s.offset, 0)) for s in self.segments if s.end > size]
+        return ([c for s, start in added for c in s.chunk_ids[start:]],
+                [d.page_content for s, start in added for d in s.documents[start:]],
+                [d.metadata for s, start in added for d in s.documents[start:]],
+                np.vstack([s.vectors[start:] for s, start in added]) if added
+                else np.zeros((0, self.dim), dtype=np.float32),
+                list(self.deleted_chunk_ids[num_deleted:]))
+
+    def partition_sizes(self) -> Dict[str, Dict[str, int]]:
+        """Partition sizes of the snapshot (segments are folded in on compaction)."""
+        return self.snapshot.partition_sizes()
+
+    def close(self) -> None:
+        self.snapshot.close()
@@ -8,18 +8,38 @@ dependencies already listed in `pyproject.toml`.
 """
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
-import pickle
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
 
 from langchain_openai import AzureOpenAIEmbeddings
-from langchain_community.document_loaders import DirectoryLoader, TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 
+from .ann_index import AnnIndexConfig, build_index, needs_migration, target_layout
+from .chunking import DocumentChunker
+from .dedup import cluster, source_for, sources_of, with_sources, without_document
+from .diversity import Diversity, cap_results, mmr_select
+from .embedding_pipeline import EmbeddingPipeline, IngestProgress
+from .index_log import DeltaRecord, IndexDeltaLog
+from .index_snapshot import INDEX_FILE, SNAPSHOT_FILES, IndexSnapshot, has_snapshot, write_snapshot
+from .index_store import DELTA_LOG_FILE, IndexStore
+from .lexical_index import reciprocal_rank_fusion, tokenize
+from .partitions import detect_language, normalise_filters
 from .pdf_processor import get_pdf_processor
+from .policy_facts import FACTS_FILE, PolicyFactsCollector, PolicyFactsStore, extract_policy_facts
+from .policy_index import PolicyIndex
+from .query_cache import QueryEmbeddingCache
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -34,21 +54,55 @@ except Exception as import_err:  # pragma: no cover – allow app to boot when F
 
 BASE_DIR = Path(__file__).resolve().parent / "data"
 
+SEARCH_MODES = ("hybrid", "dense", "lexical")
+
+# Identifier-like tokens: policy numbers, codes and section numbers
+_EXACT_TERM_RE = re.compile(r"\d|[a-z][A-Z]|\b[A-Z]{2,}|§")
+
+# Compact once this share of the indexed positions is tombstoned
+_MAX_TOMBSTONE_FRACTION = 0.2
+# ... or once searches span more delta segments than this
+_MAX_SEGMENTS = 16
+# Files of the LangChain `save_local` format, migrated on first load
+_LEGACY_FILES = ("index.pkl", "vectors.sqlite", "vectors.sqlite-wal", "vectors.sqlite-shm")
+
+
+class _SearchPlan(NamedTuple):
+    """A search up to the embedding call: index, scope and query routing."""
+
+    index: PolicyIndex
+    queries: List[str]
+    mode: str
+    filters: Dict[str, List[str]]
+    allowed: Optional[Set[int]]
+    lexical_only: List[bool]
+    # Vectors of dense queries found in the cache; `missing` still need embedding
+    cached: Dict[str, np.ndarray]
+    missing: List[str]
+
 
 class PolicyVectorSearch:  # noqa: D101
-    def __init__(self, policies_dir: str | Path | None = None, index_path: str | Path | None = None):
+    def __init__(self, policies_dir: str | Path | None = None, index_path: str | Path | None = None,
+                 embeddings: Embeddings | None = None):
         """Initialise vector search utility.
 
         By default we look for Markdown policy docs under `app/workflow/data/policies`.
-        A pre-built FAISS index will be kept under `app/workflow/data/policy_index`.
+        Index versions will be kept under `app/workflow/data/policy_index`.
+        Azure OpenAI embeddings are used unless an `embeddings` instance is
+        given (e.g. a deterministic local stand-in for benchmarks).
         """
         self.policies_dir = Path(
             policies_dir) if policies_dir else BASE_DIR / "policies"
         self.index_path = Path(
             index_path) if index_path else BASE_DIR / "policy_index"
-        self.embeddings: AzureOpenAIEmbeddings | None = None
-        self.vectorstore: FAISS | None = None
-        self._init_embeddings()
+        self.embeddings: Embeddings | None = embeddings
+        self.vectorstore: PolicyIndex | None = None
+        if self.embeddings is None:
+            self._init_embeddings()
+        self.embedding_pipeline = EmbeddingPipeline.from_settings(self.embeddings)
+        self.chunker = DocumentChunker.from_settings()
+        self.ann_config = AnnIndexConfig.from_settings()
+        self.build_progress = IngestProgress()
 
         # Fallback for legacy path (before data migrated out of langgraph_insurance)
         if not self.policies_dir.exists():
@@ -63,6 +117,26 @@ class PolicyVectorSearch:  # noqa: D101
             if legacy_idx.exists():
                 self.index_path = legacy_idx
 
+        # Versions shared by all workers; the served version's delta log holds
+        # changes since its snapshot and is tailed from `_log_offset`.
+        self.store = IndexStore(self.index_path)
+        # Summaries and coverage tables per document, kept beside the versions
+        self.facts = PolicyFactsStore(self.index_path / FACTS_FILE)
+        self.version: str | None = None
+        self.delta_log: IndexDeltaLog | None = None
+        self._log_offset = 0
+        # Writers serialise on this lock and publish a new `PolicyIndex`;
+        # searches never lock and keep the index they started with.
+        self._write_lock = threading.RLock()
+        self._compaction_thread: threading.Thread | None = None
+        self._watch_thread: threading.Thread | None = None
+        # Async searches rank here so FAISS never runs on the event loop
+        from app.core.config import get_settings
+        self._search_pool = ThreadPoolExecutor(
+            max_workers=get_settings().policy_search_max_threads,
+            thread_name_prefix="policy-search")
+        self._init_query_cache()
+
     # ------------------------------------------------------------------
     def _init_embeddings(self):
         try:
@@ -71,6 +145,7 @@ class PolicyVectorSearch:  # noqa: D101
 
             self.embeddings = AzureOpenAIEmbeddings(
                 model=settings.azure_openai_embedding_model or "text-embedding-ada-002",
+                dimensions=settings.azure_openai_embedding_dimensions,
                 azure_endpoint=settings.azure_openai_endpoint,
                 api_key=settings.azure_openai_api_key,
                 api_version="2024-02-01",
@@ -80,79 +155,60 @@ class PolicyVectorSearch:  # noqa: D101
             logger.error("Failed to init embeddings: %s", e)
             raise
 
+    def _init_query_cache(self):
+        from app.core.config import get_settings
+        settings = get_settings()
+
+        model = settings.azure_openai_embedding_model or "text-embedding-ada-002"
+        if settings.azure_openai_embedding_dimensions:
+            model = f"{model}@{settings.azure_openai_embedding_dimensions}"
+        self.query_cache = QueryEmbeddingCache(
+            model=model,
+            max_entries=settings.query_embedding_cache_size,
+            persist_path=self.index_path / "query_cache.sqlite"
+            if settings.query_embedding_cache_persist else None,
+        )
+
     # ------------------------------------------------------------------
     def load_and_split_documents(self) -> List[Document]:  # noqa: D401
+        return self._load_policies()[0]
+
+    def _load_policies(self) -> Tuple[List[Document], Dict[str, Dict[str, Any]]]:
+        """Chunks of every policy document, and the facts of each by document id."""
         if not self.policies_dir.exists():
             raise FileNotFoundError(
                 f"Policies directory not found: {self.policies_dir}")
 
-        docs = []
-        
-        # Load Markdown files
-        md_loader = DirectoryLoader(
-            str(self.policies_dir), glob="*.md", loader_cls=TextLoader, loader_kwargs={"encoding": "utf-8"}
-        )
-        md_docs = md_loader.load()
-        docs.extend(md_docs)
-        logger.info("Loaded %s markdown policy documents", len(md_docs))
-        
-        # Load PDF files
+        md_files = sorted(self.policies_dir.glob("*.md"))
+        pdf_files = sorted(self.policies_dir.glob("*.pdf"))
+        # Small PDFs are extracted in one batch, spreading their pages over the
+        # PDF worker processes; large ones are streamed (by parallel page
+        # ranges) while they are chunked, so their text is never held whole
         pdf_processor = get_pdf_processor()
-        pdf_files = list(self.policies_dir.glob("*.pdf"))
-        
-        for pdf_file in pdf_files:
+        extracted = dict(zip(pdf_files, pdf_processor.extract_pages_many(
+            pdf_files, max_pages=pdf_processor.min_parallel_pages))) if pdf_files else {}
+        chunks: List[Document] = []
+        facts: Dict[str, Dict[str, Any]] = {}
+        loaded = 0
+        for path in md_files + pdf_files:
             try:
-                if pdf_processor.is_valid_pdf(pdf_file):
-                    pdf_docs = pdf_processor.pdf_to_langchain_documents(pdf_file, chunk_pages=False)
-                    docs.extend(pdf_docs)
-                    logger.info("Loaded PDF policy document: %s", pdf_file.name)
-                else:
-                    logger.warning("Skipping invalid PDF file: %s", pdf_file.name)
+                if isinstance(extracted.get(path), Exception):
+                    raise extracted[path]
+                document_chunks, document_facts = self._load_document(
+                    path, path.name, extracted=extracted.get(path))
             except Exception as e:
-                logger.error("Failed to load PDF %s: %s", pdf_file.name, e)
+                logger.error("Failed to load policy document %s: %s", path.name, e)
                 continue
-        
-        logger.info("Loaded %s total policy documents (%s markdown, %s PDF)", 
-                   len(docs), len(md_docs), len(pdf_files))
-
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len,
-            separators=["\n\n", "\n", ".", "!", "?", ",", " ", ""],
-        )
-        chunks = splitter.split_documents(docs)
+            if document_chunks:
+                loaded += 1
+            if document_facts:
+                facts[path.name] = document_facts
+            chunks.extend(document_chunks)
 
-        # annotate metadata
-        for chunk in chunks:
-            source_path = Path(chunk.metadata["source"])
-            filename = source_path.stem
-            file_extension = source_path.suffix.lower()
-            
-            # Set policy type based on filename
-            chunk.metadata["policy_type"] = filename.replace("_", " ").title()
-            chunk.metadata["file_type"] = file_extension[1:] if file_extension else "unknown"
-            
-            # For markdown files, try to extract section information
-            section = None
-            if file_extension == ".md":
-                for line in chunk.page_content.split("\n"):
-                    if line.startswith("## Section ") or line.startswith("### Section "):
-                        if ":" in line:
-                            section_part = line.split(":")[0]
-                            if "Section " in section_part:
-                                section = section_part.split(
-                                    "Section ")[-1].strip()
-                        break
-            
-            # For PDF files, use page information if available
-            elif file_extension == ".pdf" and "page" in chunk.metadata:
-                section = f"Page {chunk.metadata['page']}"
-            
-            chunk.metadata["section"] = section or "General"
-            
+        logger.info("Loaded %s total policy documents (%s markdown, %s PDF)",
+                    loaded, len(md_files), len(pdf_files))
         logger.info("Split into %s chunks", len(chunks))
-        return chunks
+        return chunks, facts
 
     # ------------------------------------------------------------------
     def create_index(self, force_rebuild: bool = False):  # noqa: D401
@@ -160,64 +216,558 @@ class PolicyVectorSearch:  # noqa: D101
             raise RuntimeError(
                 "FAISS not available – cannot build policy index. Install faiss-cpu.")
 
-        index_file = self.index_path / "index.faiss"
-        meta_file = self.index_path / "index.pkl"
+        if not force_rebuild and self._load_existing():
+            self._backfill_facts()
+            return
 
-        if not force_rebuild and index_file.exists() and meta_file.exists():
-            try:
-                self.vectorstore = FAISS.load_local(
-                    str(self.index_path), self.embeddings, allow_dangerous_deserialization=True
-                )
-                logger.info("Loaded existing FAISS index")
+        # Single flight across threads and workers: a caller that waited here
+        # opens the version the first one published instead of building again
+        with self.store.lock("build"):
+            if not force_rebuild and self._load_existing():
+                self._backfill_facts()
                 return
+
+            docs, facts = self._load_policies()
+            if not docs:
+                raise ValueError("No documents to index")
+
+            try:
+                staging = self._build_snapshot(docs)
+                self.build_progress.set_stage("saving")
+                # The fresh version starts with an empty delta log
+                with self.store.lock(), self._write_lock:
+                    self._open_version(self.store.publish(staging))
+                    self.facts.replace_all(facts)
+                self.build_progress.set_stage("done")
+            except Exception as e:
+                self.build_progress.set_stage("error", str(e))
+                raise
+        self._start_watching()
+        logger.info("Policy index built and saved (%s docs)", len(docs))
+
+    def _load_existing(self) -> bool:
+        """Serve the published version, migrating an older layout first if needed."""
+        try:
+            if self.store.current_version() is None:
+                with self.store.lock():
+                    self._migrate_unversioned_layout()
+            self.refresh()
+        except Exception as e:
+            logger.warning(
+                "Could not load existing index – rebuilding: %s", e)
+            return False
+        if self.vectorstore is None:
+            return False
+        self._start_watching()
+        return True
+
+    def refresh(self) -> bool:
+        """Catch up with versions and changes published by any worker.
+
+        Opens the current version if it differs from the one being served,
+        otherwise applies delta log entries appended since the last check.
+        Returns whether anything changed.
+        """
+        with self._write_lock:
+            name = self.store.current_version()
+            if name is None:
+                return False
+            if name != self.version:
+                self._open_version(name)
+                return True
+            records, self._log_offset = self.delta_log.read_from(self._log_offset)
+            self.vectorstore = self._apply_records(self.vectorstore, records)
+            return bool(records)
+
+    def _open_version(self, name: str) -> None:
+        """Open a published version and replay its delta log on top of it.
+
+        The index file and exact vectors are memory-mapped and chunk data is
+        read lazily from SQLite, so this takes the same time at any corpus
+        size; only the (bounded) delta log is read in full.
+        """
+        start = time.perf_counter()
+        snapshot = IndexSnapshot(self.store.version_dir(name), self.ann_config)
+        self._check_dimensions(snapshot.dim)
+        index = PolicyIndex(snapshot, self.ann_config)
+        delta_log = IndexDeltaLog(self.store.delta_log_path(name))
+        with self._write_lock:
+            records, offset = delta_log.read_from(0)
+            index = self._apply_records(index, records)
+            self.vectorstore, self.version = index, name
+            self.delta_log, self._log_offset = delta_log, offset
+        logger.info("Opened %s policy index version %s (%s vectors, %s delta log entries) in %.3fs",
+                    index.index_type, name, snapshot.size, len(records), time.perf_counter() - start)
+
+    def _start_watching(self) -> None:
+        """Poll for versions and changes from other workers in the background."""
+        from app.core.config import get_settings
+        interval = get_settings().policy_index_watch_interval
+
+        if interval <= 0 or (self._watch_thread and self._watch_thread.is_alive()):
+            return
+        self._watch_thread = threading.Thread(
+            target=self._watch, args=(interval,), name="policy-index-watcher", daemon=True)
+        self._watch_thread.start()
+
+    def _watch(self, interval: float) -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                self.refresh()
             except Exception as e:
-                logger.warning(
-                    "Could not load existing index – rebuilding: %s", e)
+                logger.warning("Policy index refresh failed: %s", e)
+
+    def _build_snapshot(self, docs: List[Document]) -> Path:
+        """Embed chunks through the batched pipeline into a new staging version.
+
+        Vectors stream into one array in chunk order; the index layout is then
+        chosen for the corpus size, trained and filled. Searches keep using the
+        current version until the caller publishes the returned directory.
+        """
+        docs = self._merge_duplicates(docs)
+        texts = [doc.page_content for doc in docs]
+        vectors: np.ndarray | None = None
+        embedded = np.zeros(len(texts), dtype=bool)
+        for indices, batch in self.embedding_pipeline.run(texts, self.build_progress):
+            if vectors is None:
+                self._check_dimensions(batch.shape[1])
+                vectors = np.empty((len(texts), batch.shape[1]), dtype=np.float32)
+            vectors[indices] = batch
+            embedded[indices] = True
+        if vectors is None or not embedded.all():
+            raise ValueError("No embeddings produced for policy documents")
+
+        index_type, compression = target_layout(self.ann_config, len(vectors))
+        if (index_type, compression) != ("flat", "none"):
+            self.build_progress.set_stage(f"training {index_type} index ({compression})")
+        index = build_index(self.ann_config, vectors, index_type, compression)
+        return self._write_staging(index, [str(uuid.uuid4()) for _ in docs], texts,
+                                   [doc.metadata for doc in docs], vectors)
+
+    def _write_staging(self, index, chunk_ids: List[str], texts: List[str],
+                       metadatas: List[Dict[str, Any]], vectors: np.ndarray) -> Path:
+        """Write a snapshot into a new staging directory, ready to publish."""
+        staging = self.store.new_staging_dir()
+        try:
+            write_snapshot(staging, index, chunk_ids, texts, metadatas, vectors)
+        except Exception:
+            self.store.discard(staging)
+            raise
+        return staging
+
+    def _migrate_unversioned_layout(self) -> None:
+        """Publish an index written straight into the index path as a version.
+
+        Covers snapshots from before versioned directories and pickled
+        LangChain `save_local` indexes; their delta logs move along with them.
+        Caller holds the store's write lock.
+        """
+        root = self.index_path
+        if self.store.current_version() is not None:
+            return
+        if has_snapshot(root):
+            staging = self.store.new_staging_dir()
+            for name in SNAPSHOT_FILES:
+                os.replace(root / name, staging / name)
+        elif (root / "index.pkl").exists() and (root / INDEX_FILE).exists():
+            staging = self._migrate_legacy_index()
+        else:
+            return
+        delta_log = IndexDeltaLog(staging / DELTA_LOG_FILE)
+        for name in (f"{DELTA_LOG_FILE}.compacting", DELTA_LOG_FILE):
+            old_log = IndexDeltaLog(root / name)
+            delta_log.append(*old_log.replay())
+            old_log.path.unlink(missing_ok=True)
+        self.store.publish(staging)
+
+    def _migrate_legacy_index(self) -> Path:
+        """Convert a pickled LangChain `save_local` index into a staging version.
+
+        This is the only place `index.pkl` is unpickled; the pickle files are
+        removed once the snapshot is written.
+        """
+        from langchain_community.docstore.in_memory import InMemoryDocstore
 
-        docs = self.load_and_split_documents()
-        if not docs:
-            raise ValueError("No documents to index")
+        legacy = FAISS.load_local(
+            str(self.index_path), self.embeddings, allow_dangerous_deserialization=True)
+        docstore: InMemoryDocstore = legacy.docstore
+        # Positions emptied by earlier deletes hold an empty id
+        live = [(position, chunk_id) for position, chunk_id in sorted(legacy.index_to_docstore_id.items())
+                if chunk_id and isinstance(docstore.search(chunk_id), Document)]
+        chunk_ids = [chunk_id for _, chunk_id in live]
+        documents = [docstore.search(chunk_id) for chunk_id in chunk_ids]
 
-        self.vectorstore = FAISS.from_documents(docs, self.embeddings)
-        self.index_path.mkdir(parents=True, exist_ok=True)
-        self.vectorstore.save_local(str(self.index_path))
-        logger.info("FAISS index built and saved (%s docs)", len(docs))
+        vectors = self._legacy_exact_vectors(chunk_ids)
+        if vectors is None:
+            positions = np.array([position for position, _ in live], dtype=np.int64)
+            if hasattr(legacy.index, "make_direct_map"):
+                legacy.index.make_direct_map()
+            vectors = legacy.index.reconstruct_batch(positions) if len(positions) \
+                else np.zeros((0, legacy.index.d), dtype=np.float32)
+        self._check_dimensions(vectors.shape[1])
+
+        index = build_index(self.ann_config, vectors, *target_layout(
+            self.ann_config, len(vectors), legacy.index))
+        staging = self._write_staging(index, chunk_ids, [doc.page_content for doc in documents],
+                                      [doc.metadata for doc in documents], vectors)
+        for name in (INDEX_FILE, *_LEGACY_FILES):
+            (self.index_path / name).unlink(missing_ok=True)
+        logger.info("Migrated pickled policy index to snapshot format (%s chunks)", len(chunk_ids))
+        return staging
+
+    def _legacy_exact_vectors(self, chunk_ids: List[str]) -> np.ndarray | None:
+        """Exact vectors kept beside compressed legacy indexes, if all are present."""
+        path = self.index_path / "vectors.sqlite"
+        if not path.exists() or not chunk_ids:
+            return None
+        db = sqlite3.connect(str(path))
+        try:
+            stored = dict(db.execute("SELECT chunk_id, vector FROM vectors").fetchall())
+        finally:
+            db.close()
+        if not all(chunk_id in stored for chunk_id in chunk_ids):
+            return None
+        return np.vstack([np.frombuffer(stored[c], dtype=np.float32) for c in chunk_ids])
+
+    def _check_dimensions(self, dim: int) -> None:
+        """Reject vectors whose size disagrees with the configured embedding dimension."""
+        from app.core.config import get_settings
+        expected = get_settings().azure_openai_embedding_dimensions
+
+        if expected and dim != expected:
+            raise ValueError(
+                f"Index has {dim}-dimensional vectors but AZURE_OPENAI_EMBEDDING_DIMENSIONS "
+                f"is {expected} – rebuild the index")
 
     # ------------------------------------------------------------------
-    def search_policies(self, query: str, k: int = 5, score_threshold: float = 0.3) -> List[Dict[str, Any]]:  # noqa: D401,E501
+    @staticmethod
+    def _apply_records(index: PolicyIndex, records: List[DeltaRecord]) -> PolicyIndex:
+        """Index with delta log records applied (idempotent).
+
+        All adds become one segment and deletes follow them; chunk ids are
+        never reused, so this matches applying the records one by one.
+        """
+        adds = [record for record in records if record.op == "add" and record.ids]
+        deleted = [chunk_id for record in records if record.op == "delete" for chunk_id in record.ids]
+        if not adds and not deleted:
+            return index
+        return index.with_changes(
+            [chunk_id for record in adds for chunk_id in record.ids],
+            [text for record in adds for text in record.texts],
+            [metadata for record in adds for metadata in record.metadatas],
+            np.vstack([record.vectors for record in adds]) if adds else None,
+            deleted)
+
+    # ------------------------------------------------------------------
+    def _embed(self, queries: List[str]) -> Dict[str, np.ndarray]:
+        """Embed uncached queries together in a single request."""
+        if not queries:
+            return {}
+        vectors = np.asarray(self.embeddings.embed_documents(queries), dtype=np.float32)
+        return dict(zip(queries, vectors))
+
+    async def _aembed(self, queries: List[str]) -> Dict[str, np.ndarray]:
+        """Async `_embed`: the request is awaited instead of blocking a thread."""
+        if not queries:
+            return {}
+        vectors = np.asarray(await self.embeddings.aembed_documents(queries), dtype=np.float32)
+        return dict(zip(queries, vectors))
+
+    def _format_result(self, doc: Document, similarity: float,
+                       filters: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        # A deduplicated chunk is shown as the occurrence the filters asked for
+        shown = source_for(doc.metadata, filters) if doc.metadata.get("sources") else doc.metadata
+        result = {
+            "content": doc.page_content,
+            "metadata": doc.metadata,
+            "similarity_score": similarity,
+            "policy_type": shown.get("policy_type", "Unknown"),
+            "section": shown.get("section", "General"),
+            "token_count": doc.metadata.get("token_count"),
+            "source": shown.get("source", "Unknown"),
+            "document_id": shown.get("document_id"),
+        }
+        if doc.metadata.get("sources"):
+            result["sources"] = [
+                {field: source.get(field) for field in ("document_id", "policy_type", "section")}
+                for source in doc.metadata["sources"]
+            ]
+        return result
+
+    def _is_exact_term_query(self, index: PolicyIndex, query: str,
+                             allowed: Optional[Set[int]] = None) -> bool:
+        """Identifier-like queries that some chunk matches verbatim skip embedding."""
+        return (len(tokenize(query)) <= 4 and bool(_EXACT_TERM_RE.search(query))
+                and index.matches_all_terms(query, allowed))
+
+    def _search(self, queries: List[str], k: int, score_threshold: float,
+                mode: str | None, filters: Optional[Dict[str, Any]] = None,
+                diversity: Optional[Diversity] = None) -> List[List[Dict[str, Any]]]:
+        """Rank chunks for each query; returns one result list per query.
+
+        * ``dense`` – FAISS L2 ranking only.
+        * ``lexical`` – BM25 only; no embedding call. ``similarity_score`` is
+          the BM25 score normalised to the best hit.
+        * ``hybrid`` – reciprocal-rank fusion of both rankings. Identifier-like
+          queries with an exact lexical match take the lexical fast path.
+
+        ``filters`` (policy_type, category, language, file_type) restrict both
+        rankings to the matching partitions before scoring. Rankings work on
+        index positions; chunk text and metadata are only read for the hits
+        that are returned.
+
+        ``diversity`` re-ranks a deeper candidate list by maximal marginal
+        relevance and/or caps the hits per document and section; see
+        `_diversify`.
+        """
+        plan = self._plan_search(queries, mode, filters)
+        return self._rank(plan, k, score_threshold, self._embed(plan.missing), diversity)
+
+    async def _asearch(self, queries: List[str], k: int, score_threshold: float,
+                       mode: str | None, filters: Optional[Dict[str, Any]] = None,
+                       diversity: Optional[Diversity] = None) -> List[List[Dict[str, Any]]]:
+        """Async `_search`: planning and ranking run on the search thread pool,
+        the embedding request is awaited on the event loop."""
+        loop = asyncio.get_running_loop()
+        plan = await loop.run_in_executor(self._search_pool, self._plan_search, queries, mode, filters)
+        fresh = await self._aembed(plan.missing)
+        return await loop.run_in_executor(self._search_pool, self._rank, plan, k, score_threshold, fresh,
+                                          diversity)
+
+    def _plan_search(self, queries: List[str], mode: str | None,
+                     filters: Optional[Dict[str, Any]]) -> _SearchPlan:
+        """Resolve filters, route queries and look up cached query vectors."""
+        from app.core.config import get_settings
+        settings = get_settings()
+
+        mode = mode or settings.policy_search_mode
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}' – expected one of {SEARCH_MODES}")
+        # Positions are only meaningful within one index; compaction may swap it
+        index = self.vectorstore
+
+        allowed = index.resolve(filters)
+        if allowed is not None and not allowed:
+            # Nothing in scope – skip the embedding call entirely
+            return _SearchPlan(index, queries, mode, {}, allowed, [True] * len(queries), {}, [])
+
+        lexical_only = [mode == "lexical" or (mode == "hybrid" and self._is_exact_term_query(index, q, allowed))
+                        for q in queries]
+        dense_queries = [q for q, lex in zip(queries, lexical_only) if not lex]
+        cached, missing = self.query_cache.get_many(dense_queries) if dense_queries else ({}, [])
+        return _SearchPlan(index, queries, mode, normalise_filters(filters), allowed, lexical_only,
+                           cached, missing)
+
+    def _rank(self, plan: _SearchPlan, k: int, score_threshold: float,
+              fresh: Dict[str, np.ndarray], diversity: Optional[Diversity] = None
+              ) -> List[List[Dict[str, Any]]]:
+        """Score a planned search given embeddings for its uncached queries."""
+        from app.core.config import get_settings
+        settings = get_settings()
+
+        index, queries, mode, allowed, lexical_only = (
+            plan.index, plan.queries, plan.mode, plan.allowed, plan.lexical_only)
+        if allowed is not None and not allowed:
+            return [[] for _ in queries]
+        depth = max(k, settings.policy_search_candidate_depth)
+        diverse = diversity is not None and diversity.active
+        # Diversified searches choose their k hits from the deeper candidate list
+        fetch = depth if diverse else k
+        if fresh:
+            self.query_cache.put_many(fresh)
+        query_vectors = {**plan.cached, **fresh}
+
+        dense_queries = [q for q, lex in zip(queries, lexical_only) if not lex]
+        dense_hits: Dict[str, List[Tuple[int, float]]] = {}
+        if dense_queries:
+            vectors = np.vstack([query_vectors[q] for q in dense_queries]).astype(np.float32, copy=False)
+            hits = index.dense_search(vectors, depth if mode == "hybrid" else fetch, allowed)
+            dense_hits = dict(zip(dense_queries, hits))
+
+        # (position, similarity, extra result fields, lexical match) per query
+        ranked: List[List[Tuple[int, float, Dict[str, Any], bool]]] = []
+        for query, lex in zip(queries, lexical_only):
+            scored: List[Tuple[int, float, Dict[str, Any], bool]] = []
+            if lex:
+                lexical = index.lexical_search(query, fetch, allowed)
+                top = lexical[0][1] if lexical else 1.0
+                for position, bm25 in lexical:
+                    scored.append((position, bm25 / top, {"lexical_score": round(bm25, 4)}, False))
+            elif mode == "dense":
+                for position, distance in dense_hits[query]:
+                    scored.append((position, 1 / (1 + distance), {}, False))
+            else:
+                dense = dense_hits[query]
+                lexical = index.lexical_search(query, depth, allowed)
+                fused = reciprocal_rank_fusion(
+                    [[p for p, _ in dense], [p for p, _ in lexical]], k=settings.policy_search_rrf_k)
+                distances = dict(dense)
+                bm25_scores = dict(lexical)
+                for position in sorted(fused, key=fused.get, reverse=True)[:fetch]:
+                    distance = distances.get(position)
+                    if distance is None:
+                        distance = self._exact_distance(index, query_vectors[query], position)
+                    scored.append((position, 1 / (1 + distance), {
+                        "fusion_score": round(fused[position], 5),
+                        "lexical_score": round(bm25_scores[position], 4) if position in bm25_scores else None,
+                    }, position in bm25_scores))
+            # Lexical matches are kept even when the dense score is weak
+            ranked.append([hit for hit in scored if hit[1] >= score_threshold or hit[3]])
+
+        wanted = list({hit[0] for scored in ranked for hit in scored})
+        documents = index.documents(wanted)
+        chunk_ids = index.chunk_ids(wanted)
+        out: List[List[Dict[str, Any]]] = []
+        for query, lex, scored in zip(queries, lexical_only, ranked):
+            results, positions = [], []
+            for position, similarity, extra, _ in scored:
+                doc = documents.get(position)
+                if doc is None:
+                    continue
+                result = self._format_result(doc, similarity, plan.filters)
+                result["chunk_id"] = chunk_ids[position]
+                result["search_mode"] = "lexical" if lex else mode
+                result.update(extra)
+                results.append(result)
+                positions.append(position)
+            if diverse and results:
+                results = self._diversify(index, results, positions,
+                                          None if lex else query_vectors[query], k, diversity)
+            out.append(results)
+        return out
+
+    @staticmethod
+    def _diversify(index: PolicyIndex, results: List[Dict[str, Any]], positions: List[int],
+                   query_vector: Optional[np.ndarray], k: int, diversity: Diversity
+                   ) -> List[Dict[str, Any]]:
+        """Choose ``k`` of the ranked candidates by MMR and the per-source caps.
+
+        Relevance is the mode's own score – cosine similarity to the query
+        vector for dense hits, the fusion score for hybrid and BM25 for
+        lexical hits, each relative to the best candidate – and redundancy is
+        the cosine similarity between stored vectors, so nothing is re-embedded.
+        """
+        vectors = index.exact_vectors(positions) if diversity.mmr_lambda is not None else None
+        if results[0].get("fusion_score") is not None:
+            relevance = np.array([r["fusion_score"] for r in results]) / results[0]["fusion_score"]
+        elif query_vector is not None and vectors is not None:
+            norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query_vector)
+            relevance = vectors @ query_vector / np.maximum(norms, 1e-12)
+        else:
+            relevance = np.array([r["similarity_score"] for r in results])
+        sources = [(r["document_id"], r["section"]) for r in results]
+        return [results[i] for i in mmr_select(relevance, vectors, k, sources, diversity)]
+
+    @staticmethod
+    def _exact_distance(index: PolicyIndex, query_vector: np.ndarray, position: int) -> float:
+        """Squared L2 distance to a stored vector (no re-embedding)."""
+        stored = index.exact_vectors([position])[0]
+        return float(np.sum((stored - query_vector) ** 2))
+
+    def _can_search(self) -> bool:
         if FAISS is None:
             logger.warning(
                 "FAISS not available – returning empty results for policy search")
-            return []
+            return False
 
         if not self.vectorstore:
             raise ValueError(
                 "Vectorstore not initialised – call create_index() first")
-        results = self.vectorstore.similarity_search_with_score(query, k=k)
-        out: List[Dict[str, Any]] = []
-        for doc, score in results:
-            similarity = 1 / (1 + score)
-            if similarity >= score_threshold:
-                out.append(
-                    {
-                        "content": doc.page_content,
-                        "metadata": doc.metadata,
-                        "similarity_score": similarity,
-                        "policy_type": doc.metadata.get("policy_type", "Unknown"),
-                        "section": doc.metadata.get("section", "General"),
-                        "source": doc.metadata.get("source", "Unknown"),
-                    }
-                )
+        return True
+
+    def search_policies(self, query: str, k: int = 5, score_threshold: float = 0.3,
+                        mode: str | None = None, filters: Dict[str, Any] | None = None,
+                        diversity: Diversity | None = None) -> List[Dict[str, Any]]:  # noqa: D401,E501
+        if not self._can_search():
+            return []
+        out = self._search([query], k, score_threshold, mode, filters, diversity)[0]
+        logger.info("%s relevant sections for '%s'", len(out), query)
+        return out
+
+    async def asearch_policies(self, query: str, k: int = 5, score_threshold: float = 0.3,
+                               mode: str | None = None, filters: Dict[str, Any] | None = None,
+                               diversity: Diversity | None = None) -> List[Dict[str, Any]]:
+        """Async `search_policies` for use from event loops.
+
+        The embedding call is awaited and the FAISS/BM25 work runs on a
+        bounded thread pool, so concurrent searches overlap instead of
+        blocking the loop one after another.
+        """
+        if not self._can_search():
+            return []
+        out = (await self._asearch([query], k, score_threshold, mode, filters, diversity))[0]
         logger.info("%s relevant sections for '%s'", len(out), query)
         return out
 
+    def search_policies_batch(self, queries: List[str], k: int = 5, score_threshold: float = 0.3,
+                              max_results: int | None = None, mode: str | None = None,
+                              filters: Dict[str, Any] | None = None,
+                              diversity: Diversity | None = None) -> List[Dict[str, Any]]:
+        """Run several queries as one embedding request and one FAISS search.
+
+        Hits are merged and deduplicated by chunk; each keeps its best
+        similarity and lists the queries that matched it in ``matched_queries``.
+        ``diversity`` applies per query, and its caps again to the merged list.
+        """
+        if not self._can_search():
+            return []
+        queries = list(dict.fromkeys(q for q in queries if q and q.strip()))
+        if not queries:
+            return []
+        return self._merge_batch(queries, self._search(queries, k, score_threshold, mode, filters, diversity),
+                                 max_results, diversity)
+
+    async def asearch_policies_batch(self, queries: List[str], k: int = 5, score_threshold: float = 0.3,
+                                     max_results: int | None = None, mode: str | None = None,
+                                     filters: Dict[str, Any] | None = None,
+                                     diversity: Diversity | None = None) -> List[Dict[str, Any]]:
+        """Async `search_policies_batch`; see `asearch_policies`."""
+        if not self._can_search():
+            return []
+        queries = list(dict.fromkeys(q for q in queries if q and q.strip()))
+        if not queries:
+            return []
+        return self._merge_batch(
+            queries, await self._asearch(queries, k, score_threshold, mode, filters, diversity),
+            max_results, diversity)
+
+    @staticmethod
+    def _merge_batch(queries: List[str], per_query: List[List[Dict[str, Any]]],
+                     max_results: int | None, diversity: Diversity | None = None) -> List[Dict[str, Any]]:
+        merged: Dict[str, Dict[str, Any]] = {}
+        for query, results in zip(queries, per_query):
+            for result in results:
+                hit = merged.get(result["chunk_id"])
+                if hit is None:
+                    hit = merged[result["chunk_id"]] = result
+                    hit["matched_queries"] = []
+                hit["similarity_score"] = max(hit["similarity_score"], result["similarity_score"])
+                hit["matched_queries"].append(query)
+
+        out = sorted(merged.values(), key=lambda r: r["similarity_score"], reverse=True)
+        if diversity is not None:
+            out = cap_results(out, diversity)
+        if max_results is not None:
+            out = out[:max_results]
+        logger.info("%s relevant sections for %s batched queries", len(out), len(queries))
+        return out
+
     # ------------------------------------------------------------------
-    def add_document_to_index(self, document_path: str | Path) -> bool:
+    def add_document_to_index(self, document_path: str | Path, document_id: str | None = None,
+                              metadata: Dict[str, Any] | None = None) -> bool:
         """Add a single document to the existing vector index.
-        
+
+        If the document id is already indexed its previous chunks are replaced,
+        so re-indexing a document never leaves stale vectors behind. The change
+        is appended to the delta log rather than rewriting the whole index.
+
         Args:
             document_path: Path to the document file (PDF or markdown)
-            
+            document_id: Stable id used for later delete/replace (defaults to the filename)
+            metadata: Extra chunk metadata, e.g. the upload ``category`` or a
+                ``policy_type`` derived from the original filename
+
         Returns:
             True if document was successfully added, False otherwise
         """
@@ -233,101 +783,576 @@ class PolicyVectorSearch:  # noqa: D101
         if not document_path.exists():
             logger.error(f"Document not found: {document_path}")
             return False
-            
+
+        document_id = document_id or document_path.name
+
         try:
-            docs = []
-            file_extension = document_path.suffix.lower()
-            
-            if file_extension == ".pdf":
-                # Process PDF file
-                pdf_processor = get_pdf_processor()
-                if pdf_processor.is_valid_pdf(document_path):
-                    pdf_docs = pdf_processor.pdf_to_langchain_documents(document_path, chunk_pages=False)
-                    docs.extend(pdf_docs)
-                else:
-                    logger.error(f"Invalid PDF file: {document_path}")
-                    return False
-                    
-            elif file_extension == ".md":
-                # Process markdown file
-                loader = TextLoader(str(document_path), encoding="utf-8")
-                md_docs = loader.load()
-                docs.extend(md_docs)
-                
-            else:
-                logger.error(f"Unsupported file type: {file_extension}")
-                return False
-            
-            if not docs:
-                logger.error(f"No content extracted from document: {document_path}")
+            chunks, facts = self._load_document(document_path, document_id, metadata)
+            if not chunks:
                 return False
-            
-            # Split documents into chunks
-            splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200,
-                length_function=len,
-                separators=["\n\n", "\n", ".", "!", "?", ",", " ", ""],
-            )
-            chunks = splitter.split_documents(docs)
-            
-            # Annotate metadata
-            for chunk in chunks:
-                source_path = Path(chunk.metadata["source"])
-                filename = source_path.stem
-                file_extension = source_path.suffix.lower()
-                
-                chunk.metadata["policy_type"] = filename.replace("_", " ").title()
-                chunk.metadata["file_type"] = file_extension[1:] if file_extension else "unknown"
-                
-                # Extract section information
-                section = None
-                if file_extension == ".md":
-                    for line in chunk.page_content.split("\n"):
-                        if line.startswith("## Section ") or line.startswith("### Section "):
-                            if ":" in line:
-                                section_part = line.split(":")[0]
-                                if "Section " in section_part:
-                                    section = section_part.split("Section ")[-1].strip()
-                            break
-                elif file_extension == ".pdf" and "page" in chunk.metadata:
-                    section = f"Page {chunk.metadata['page']}"
-                
-                chunk.metadata["section"] = section or "General"
-            
-            # Add chunks to existing vectorstore
-            self.vectorstore.add_documents(chunks)
-            
-            # Save updated index
-            self.vectorstore.save_local(str(self.index_path))
-            
-            logger.info(f"Successfully added document to index: {document_path.name} ({len(chunks)} chunks)")
+
+            # Boilerplate repeated within the document is stored once
+            chunks = self._merge_duplicates(chunks)
+            texts = [chunk.page_content for chunk in chunks]
+
+            # Embed outside the write lock – this is the slow network round trip.
+            # Chunks that duplicate indexed ones reuse the stored vector instead.
+            matches = self._match_duplicates(self.vectorstore, document_id, texts)
+            fresh = self._embed_unmatched(texts, matches, {})
+
+            with self.store.lock(), self._write_lock:
+                # Other workers may have changed the document meanwhile
+                self.refresh()
+                index = self.vectorstore
+                matches = self._match_duplicates(index, document_id, texts)
+                fresh = self._embed_unmatched(texts, matches, fresh)
+                ids, add_texts, metadatas, vectors, deleted, replaced = self._document_changes(
+                    index, document_id, chunks, matches, fresh)
+                records = []
+                if deleted:
+                    records.append(DeltaRecord(op="delete", document_id=document_id, ids=deleted))
+                records.append(DeltaRecord(op="add", document_id=document_id, ids=ids,
+                                           texts=add_texts, metadatas=metadatas, vectors=vectors))
+                # Log first so an acknowledged change is never lost
+                self.delta_log.append(*records)
+                # Publish a new index; searches in flight keep the one they started with
+                self.vectorstore = index.with_changes(ids, add_texts, metadatas, vectors, deleted=deleted)
+                self._log_offset = self.delta_log.size_bytes()
+                if facts:
+                    self.facts.put(document_id, facts)
+                else:
+                    self.facts.remove(document_id)
+
+            self._maybe_schedule_compaction()
+            duplicates = sum(match is not None for match in matches)
+            logger.info(f"Successfully added document to index: {document_path.name} "
+                        f"({len(chunks)} chunks, {duplicates} already indexed, {replaced} replaced)")
             return True
             
         except Exception as e:
             logger.error(f"Failed to add document to index {document_path}: {e}")
             return False
 
+    def add_documents_to_index(self, documents: List[Tuple[str | Path, str, Dict[str, Any] | None]],
+                               on_embedding: Callable[[List[str]], None] | None = None,
+                               keep: Callable[[List[str]], Iterable[str]] | None = None
+                               ) -> Dict[str, bool]:
+        """Add several documents with one embedding pass and one index commit.
+
+        Like `add_document_to_index` for each ``(document_path, document_id,
+        metadata)``, but the chunks of all documents that need vectors are
+        embedded together, and all changes are appended to the delta log and
+        published as one new index.
+
+        Args:
+            documents: The documents to add
+            on_embedding: Called with the ids of the documents that were
+                extracted, before they are embedded
+            keep: Called with the ids of the documents about to be
+                committed, under the index write lock; only the ids it
+                returns are committed (e.g. to skip documents deleted while
+                they were being embedded)
+
+        Returns:
+            Whether each document (by id) was added
+        """
+        results = {document_id: False for _, document_id, _ in documents}
+        if FAISS is None or not self.vectorstore:
+            logger.error("Vector index unavailable – cannot add documents to it")
+            return results
+
+        # (document_id, chunks, texts, facts) of every document with content
+        loaded = []
+        for document_path, document_id, metadata in documents:
+            document_path = Path(document_path)
+            if not document_path.exists():
+                logger.error(f"Document not found: {document_path}")
+                continue
+            try:
+                chunks, facts = self._load_document(document_path, document_id, metadata)
+            except Exception as e:
+                logger.error(f"Failed to load document {document_path}: {e}")
+                continue
+            if chunks:
+                chunks = self._merge_duplicates(chunks)
+                loaded.append((document_id, chunks, [chunk.page_content for chunk in chunks], facts))
+        if not loaded:
+            return results
+        if on_embedding is not None:
+            on_embedding([document_id for document_id, *_ in loaded])
+
+        try:
+            # Embed outside the write lock, every document in one pass
+            index = self.vectorstore
+            fresh = self._embed_unmatched_many(
+                [(texts, self._match_duplicates(index, document_id, texts), {})
+                 for document_id, _, texts, _ in loaded])
+
+            with self.store.lock(), self._write_lock:
+                if keep is not None:
+                    wanted = set(keep([document_id for document_id, *_ in loaded]))
+                    kept = [i for i, (document_id, *_) in enumerate(loaded) if document_id in wanted]
+                    if len(kept) < len(loaded):
+                        logger.info("Skipping %s documents withdrawn during their ingest",
+                                    len(loaded) - len(kept))
+                    loaded, fresh = [loaded[i] for i in kept], [fresh[i] for i in kept]
+                    if not loaded:
+                        return results
+                self.refresh()
+                index = self.vectorstore
+                records: List[DeltaRecord] = []
+                for (document_id, chunks, texts, facts), vectors in zip(loaded, fresh):
+                    # Later documents also match chunks of earlier ones
+                    matches = self._match_duplicates(index, document_id, texts)
+                    vectors = self._embed_unmatched(texts, matches, vectors)
+                    ids, add_texts, metadatas, add_vectors, deleted, _ = self._document_changes(
+                        index, document_id, chunks, matches, vectors)
+                    if deleted:
+                        records.append(DeltaRecord(op="delete", document_id=document_id, ids=deleted))
+                    records.append(DeltaRecord(op="add", document_id=document_id, ids=ids,
+                                               texts=add_texts, metadatas=metadatas, vectors=add_vectors))
+                    index = index.with_changes(ids, add_texts, metadatas, add_vectors, deleted=deleted)
+                self.delta_log.append(*records)
+                self.vectorstore = index
+                self._log_offset = self.delta_log.size_bytes()
+                self.facts.update({document_id: facts for document_id, _, _, facts in loaded})
+        except Exception as e:
+            logger.error(f"Failed to add {len(loaded)} documents to index: {e}")
+            return results
+
+        self._maybe_schedule_compaction()
+        for document_id, *_ in loaded:
+            results[document_id] = True
+        logger.info("Added %s documents to index in one batch (%s chunks)",
+                    len(loaded), sum(len(chunks) for _, chunks, _, _ in loaded))
+        return results
+
+    def replace_document_in_index(self, document_id: str, document_path: str | Path,
+                                  metadata: Dict[str, Any] | None = None) -> bool:
+        """Swap the indexed chunks of ``document_id`` for the contents of ``document_path``."""
+        return self.add_document_to_index(document_path, document_id=document_id, metadata=metadata)
+
+    def add_duplicate_to_index(self, document_id: str, source_document_id: str,
+                               metadata: Dict[str, Any] | None = None) -> bool:
+        """Index a document whose file is identical to an indexed one.
+
+        Instead of extracting and embedding the file again, the new document
+        is added as a further source of each of ``source_document_id``'s
+        chunks, keeping their stored vectors; its facts are copied. Any
+        previous chunks of ``document_id`` are replaced, as for
+        `add_document_to_index`.
+
+        Returns:
+            True if added, False if the source document has no indexed chunks
+        """
+        if not self.vectorstore:
+            return False
+
+        with self.store.lock(), self._write_lock:
+            self.refresh()
+            index = self.vectorstore
+            positions = index.positions_of(index.document_chunk_ids(source_document_id))
+            documents = index.documents(list(positions.values()))
+            # One chunk per occurrence of the source, matched to the chunk it is in
+            chunks: List[Document] = []
+            matches: List[Optional[int]] = []
+            for position in positions.values():
+                chunk = documents[position]
+                for source in sources_of(chunk.metadata):
+                    if source.get("document_id") != source_document_id:
+                        continue
+                    chunks.append(Document(page_content=chunk.page_content,
+                                           metadata={**source, **(metadata or {}),
+                                                     "document_id": document_id}))
+                    matches.append(position)
+            if not chunks:
+                return False
+            ids, texts, metadatas, vectors, deleted, replaced = self._document_changes(
+                index, document_id, chunks, matches, {})
+            records = []
+            if deleted:
+                records.append(DeltaRecord(op="delete", document_id=document_id, ids=deleted))
+            records.append(DeltaRecord(op="add", document_id=document_id, ids=ids,
+                                       texts=texts, metadatas=metadatas, vectors=vectors))
+            self.delta_log.append(*records)
+            self.vectorstore = index.with_changes(ids, texts, metadatas, vectors, deleted=deleted)
+            self._log_offset = self.delta_log.size_bytes()
+            facts = self.facts.of_document(source_document_id)
+            if facts:
+                self.facts.put(document_id, {**facts, "document_id": document_id})
+            else:
+                self.facts.remove(document_id)
+
+        self._maybe_schedule_compaction()
+        logger.info("Added document %s as a copy of %s (%s chunks reused, %s replaced)",
+                    document_id, source_document_id, len(positions), replaced)
+        return True
+
+    def delete_document_from_index(self, document_id: str) -> int:
+        """Remove every chunk of a document from the index.
+
+        Returns:
+            Number of chunks removed (0 if the document was not indexed)
+        """
+        if not self.vectorstore:
+            return 0
+
+        with self.store.lock(), self._write_lock:
+            self.refresh()
+            index = self.vectorstore
+            ids, texts, metadatas, vectors, deleted, removed = self._document_changes(index, document_id)
+            if not removed:
+                return 0
+            records = [DeltaRecord(op="delete", document_id=document_id, ids=deleted)]
+            if ids:
+                # Chunks shared with other documents stay, without this source
+                records.append(DeltaRecord(op="add", document_id=document_id, ids=ids, texts=texts,
+                                           metadatas=metadatas, vectors=vectors))
+            self.delta_log.append(*records)
+            self.vectorstore = index.with_changes(ids, texts, metadatas, vectors, deleted=deleted)
+            self._log_offset = self.delta_log.size_bytes()
+            self.facts.remove(document_id)
+
+        self._maybe_schedule_compaction()
+        logger.info("Removed document %s from index (%s chunks, %s still shared)",
+                    document_id, removed, len(ids))
+        return removed
+
+    def get_document_chunk_ids(self, document_id: str) -> List[str]:
+        """Return the chunk ids currently indexed for a document."""
+        if not self.vectorstore:
+            return []
+        return self.vectorstore.document_chunk_ids(document_id)
+
+    def is_document_indexed(self, document_id: str) -> bool:
+        return bool(self.get_document_chunk_ids(document_id))
+
+    # Deduplication ------------------------------------------------------
+    def _merge_duplicates(self, chunks: List[Document]) -> List[Document]:
+        """Fold near-duplicate chunks into their first occurrence (see `dedup`)."""
+        from app.core.config import get_settings
+        threshold = get_settings().policy_dedup_threshold
+        if threshold <= 0 or len(chunks) < 2:
+            return chunks
+        groups: Dict[int, List[Document]] = {}
+        for chunk, first in zip(chunks, cluster([c.page_content for c in chunks], threshold)):
+            groups.setdefault(first, []).append(chunk)
+        merged = [Document(page_content=group[0].page_content,
+                           metadata=with_sources(group[0].metadata, [c.metadata for c in group[1:]]))
+                  for group in groups.values()]
+        if len(merged) < len(chunks):
+            logger.info("Merged %s near-duplicate chunks into their first occurrence (%s → %s)",
+                        len(chunks) - len(merged), len(chunks), len(merged))
+        return merged
+
+    def _match_duplicates(self, index: PolicyIndex, document_id: str, texts: List[str]
+                          ) -> List[Optional[int]]:
+        """Indexed near-duplicate of each new chunk, or ``None`` if it needs embedding.
+
+        The document's own unshared chunks only match when unchanged, so a
+        re-indexed document never keeps outdated wording.
+        """
+        from app.core.config import get_settings
+        threshold = get_settings().policy_dedup_threshold
+        if threshold <= 0:
+            return [None] * len(texts)
+        matches = index.near_duplicates(texts, threshold)
+        own = set(index.positions_of(index.document_chunk_ids(document_id)).values())
+        stale = own.intersection(matches)
+        if stale:
+            documents = index.documents(list(stale))
+            matches = [None if match in stale and not documents[match].metadata.get("sources")
+                       and documents[match].page_content != text else match
+                       for text, match in zip(texts, matches)]
+        return matches
+
+    def _embed_unmatched(self, texts: List[str], matches: List[Optional[int]],
+                         fresh: Dict[int, np.ndarray]) -> Dict[int, np.ndarray]:
+        """Vectors by chunk index for every unmatched chunk not yet in ``fresh``."""
+        missing = [i for i, match in enumerate(matches) if match is None and i not in fresh]
+        if missing:
+            vectors = self.embedding_pipeline.embed([texts[i] for i in missing])
+            fresh = {**fresh, **dict(zip(missing, vectors))}
+        return fresh
+
+    def _embed_unmatched_many(self, pending: List[Tuple[List[str], List[Optional[int]], Dict[int, np.ndarray]]]
+                              ) -> List[Dict[int, np.ndarray]]:
+        """`_embed_unmatched` for several documents' ``(texts, matches, fresh)``
+        in one embedding call."""
+        missing = [(n, i) for n, (_, matches, fresh) in enumerate(pending)
+                   for i, match in enumerate(matches) if match is None and i not in fresh]
+        out = [dict(fresh) for _, _, fresh in pending]
+        if missing:
+            vectors = self.embedding_pipeline.embed([pending[n][0][i] for n, i in missing])
+            for (n, i), vector in zip(missing, vectors):
+                out[n][i] = vector
+        return out
+
+    def _document_changes(self, index: PolicyIndex, document_id: str, chunks: List[Document] = (),
+                          matches: List[Optional[int]] = (), fresh: Dict[int, np.ndarray] | None = None
+                          ) -> Tuple[List[str], List[str], List[Dict[str, Any]], np.ndarray, List[str], int]:
+        """Changes that make ``index`` hold exactly ``chunks`` for the document.
+
+        The document's previous chunks are deleted; those it shared with
+        other documents are re-added without it. A new chunk matching an
+        indexed near-duplicate is folded into that chunk, which is re-added
+        with the extra source and its stored vector. Returns the added
+        ``(ids, texts, metadatas, vectors)``, the deleted ids and the number
+        of the document's previous chunks.
+        """
+        old_positions = list(index.positions_of(index.document_chunk_ids(document_id)).values())
+        matched = [m for m in matches if m is not None]
+        existing = index.documents(list({*old_positions, *matched}))
+        # Re-added (text, metadata) by existing position; None means dropped
+        rewritten: Dict[int, Optional[Tuple[str, Dict[str, Any]]]] = {}
+        for position in old_positions:
+            metadata = without_document(existing[position].metadata, document_id)
+            rewritten[position] = (existing[position].page_content, metadata) if metadata else None
+
+        texts: List[str] = []
+        metadatas: List[Dict[str, Any]] = []
+        rows: List[np.ndarray] = []
+        for i, (chunk, match) in enumerate(zip(chunks, matches)):
+            if match is None:
+                texts.append(chunk.page_content)
+                metadatas.append(chunk.metadata)
+                rows.append(fresh[i])
+                continue
+            current = rewritten.get(match, (existing[match].page_content, existing[match].metadata))
+            if current is None:
+                # The document's own unchanged chunk: keep it with its new metadata
+                rewritten[match] = (chunk.page_content, chunk.metadata)
+            else:
+                rewritten[match] = (current[0], with_sources(current[1], [chunk.metadata]))
+
+        kept = [position for position, value in rewritten.items() if value is not None]
+        texts.extend(rewritten[p][0] for p in kept)
+        metadatas.extend(rewritten[p][1] for p in kept)
+        if kept:
+            rows.extend(index.exact_vectors(kept))
+        deleted = list(index.chunk_ids(list(rewritten)).values())
+        vectors = np.vstack(rows) if rows else np.zeros((0, index.dim), dtype=np.float32)
+        ids = [str(uuid.uuid4()) for _ in texts]
+        return ids, texts, metadatas, vectors, deleted, len(old_positions)
+
     # ------------------------------------------------------------------
+    def _load_document(self, document_path: Path, document_id: str,
+                       metadata: Dict[str, Any] | None = None,
+                       extracted: Dict[str, Any] | None = None
+                       ) -> Tuple[List[Document], Optional[Dict[str, Any]]]:
+        """Load and split a single PDF or markdown file into annotated chunks.
+
+        Also returns the document's summary and coverage tables (see
+        `policy_facts`), collected from the same pass. PDFs are read as a
+        stream of pages, so only the chunks are ever held in full, never the
+        document text. ``extracted`` is the PDF's pages when they were
+        already extracted.
+        """
+        parsed = self.chunker.parse_stream(document_path, extracted)
+        facts = PolicyFactsCollector(document_id, self._policy_type(document_path))
+        chunks = list(self.chunker.split_stream(*parsed, on_section=facts.add)) if parsed else []
+        if not chunks:
+            logger.error(f"No content extracted from document: {document_path}")
+            return [], None
+
+        # Partition metadata is per source document; chunks inherit it.
+        # detect_language reads no further than the first 20k characters.
+        sample: List[str] = []
+        sampled = 0
+        for chunk in chunks:
+            if sampled >= 20_000:
+                break
+            sample.append(chunk.page_content)
+            sampled += len(chunk.page_content)
+        language = detect_language("\n".join(sample))
+        file_extension = document_path.suffix.lower()
+        for chunk in chunks:
+            chunk.metadata.setdefault("category", "policy")
+            chunk.metadata["language"] = language
+            chunk.metadata["policy_type"] = self._policy_type(document_path)
+            chunk.metadata["file_type"] = file_extension[1:] if file_extension else "unknown"
+            chunk.metadata.update(metadata or {})
+            chunk.metadata["document_id"] = document_id
+        return chunks, facts.facts(language)
+
+    @staticmethod
+    def _policy_type(document_path: Path) -> str:
+        return document_path.stem.replace("_", " ").title()
+
+    @staticmethod
+    def _document_facts(text: str, sections, document_id: str, policy_type: str,
+                        language: str | None) -> Optional[Dict[str, Any]]:
+        try:
+            return extract_policy_facts(text, sections, document_id, policy_type, language)
+        except Exception as e:
+            # Facts are a shortcut; the document is still searchable without them
+            logger.warning("Could not extract policy facts from %s: %s", document_id, e)
+            return None
+
+    def _backfill_facts(self) -> None:
+        """Extract facts for an index built before they were stored.
+
+        Only the bundled policies are re-read; uploads get their facts when
+        they are next added.
+        """
+        if self.facts.exists():
+            return
+        with self.store.lock(), self._write_lock:
+            if self.facts.exists():
+                return
+            facts: Dict[str, Dict[str, Any]] = {}
+            paths = sorted(self.policies_dir.glob("*.md")) + sorted(self.policies_dir.glob("*.pdf"))
+            for path in paths:
+                if not self.is_document_indexed(path.name):
+                    continue
+                try:
+                    parsed = self.chunker.parse(path)
+                except Exception as e:
+                    logger.warning("Could not read %s for policy facts: %s", path.name, e)
+                    continue
+                if not parsed:
+                    continue
+                text, sections, _ = parsed
+                document_facts = self._document_facts(text, sections, path.name, self._policy_type(path),
+                                                      detect_language(text))
+                if document_facts:
+                    facts[path.name] = document_facts
+            self.facts.replace_all(facts)
+        logger.info("Extracted policy facts for %s indexed policies", len(facts))
+
+    # ------------------------------------------------------------------
+    def _maybe_schedule_compaction(self) -> None:
+        """Fold the delta log into a new version once it outgrows its budget.
+
+        The threshold is proportional to the snapshot size, so the amortised
+        bytes written per change stay constant as the corpus grows. The index
+        is also compacted once too many of its positions are tombstoned or
+        it has too many delta segments, and once it outgrows its type.
+        """
+        from app.core.config import get_settings
+        settings = get_settings()
+
+        index = self.vectorstore
+        base_bytes = (index.snapshot.directory / INDEX_FILE).stat().st_size
+        threshold = max(settings.policy_index_compaction_min_bytes,
+                        settings.policy_index_compaction_ratio * base_bytes)
+        if (self.delta_log.size_bytes() < threshold
+                and len(index.tombstones) <= _MAX_TOMBSTONE_FRACTION * index.size
+                and len(index.segments) <= _MAX_SEGMENTS
+                and not needs_migration(self.ann_config, index.snapshot.index, index.live_count)):
+            return
+
+        with self._write_lock:
+            if self._compaction_thread and self._compaction_thread.is_alive():
+                return
+            self._compaction_thread = threading.Thread(
+                target=self.compact_index, name="policy-index-compaction", daemon=True)
+            self._compaction_thread.start()
+
+    def compact_index(self) -> None:
+        """Publish a new version holding the live chunks, with an empty delta log.
+
+        Only one worker compacts at a time; others return immediately. Locks
+        are only held to take a marker and, at the end, to carry the changes
+        made since the marker over into the new version's log and publish
+        it. Reading the live rows, training the index and writing files run
+        without blocking adds, deletes or searches. The index type is
+        re-resolved for the current corpus size.
+        """
+        with self.store.lock("compact", blocking=False) as acquired:
+            if not acquired:
+                logger.info("Policy index compaction already running in another worker")
+                return
+            self._compact()
+
+    def _compact(self) -> None:
+        staging: Path | None = None
+        try:
+            with self._write_lock:
+                current, version = self.vectorstore, self.version
+                if not current:
+                    return
+                mark = current.mark()
+
+            chunk_ids: List[str] = []
+            texts: List[str] = []
+            metadatas: List[Dict[str, Any]] = []
+            batches: List[np.ndarray] = []
+            for ids, batch_texts, batch_metadatas, vectors in current.iter_live(mark):
+                chunk_ids.extend(ids)
+                texts.extend(batch_texts)
+                metadatas.extend(batch_metadatas)
+                batches.append(vectors)
+            vectors = np.vstack(batches) if batches else np.zeros((0, current.dim), dtype=np.float32)
+            index = build_index(self.ann_config, vectors, *target_layout(
+                self.ann_config, len(vectors), current.snapshot.index))
+            staging = self._write_staging(index, chunk_ids, texts, metadatas, vectors)
+
+            with self.store.lock(), self._write_lock:
+                self.refresh()
+                if self.version != version:
+                    logger.info("Policy index version changed during compaction – discarding it")
+                    self.store.discard(staging)
+                    return
+                ids, texts, metadatas, vectors, deleted = self.vectorstore.changes_since(mark)
+                # Carried-over changes span documents, hence no document id
+                carried = []
+                if ids:
+                    carried.append(DeltaRecord(op="add", document_id="", ids=ids, texts=texts,
+                                               metadatas=metadatas, vectors=vectors))
+                if deleted:
+                    carried.append(DeltaRecord(op="delete", document_id="", ids=deleted))
+                IndexDeltaLog(staging / DELTA_LOG_FILE).append(*carried)
+                self._open_version(self.store.publish(staging))
+            logger.info("Compacted policy index into a %s version (%s chunks)",
+                        self.vectorstore.index_type, len(chunk_ids))
+        except Exception as e:
+            # The current version and its log are untouched, so nothing is lost
+            logger.error("Policy index compaction failed: %s", e)
+            if staging is not None:
+                self.store.discard(staging)
+
+    # ------------------------------------------------------------------
+    def get_policy_facts(self, policy: str) -> Optional[Dict[str, Any]]:
+        """Summary and coverage tables of a policy, by name, code or document id.
+
+        A dictionary lookup in the facts extracted at index time; no
+        embedding call or search.
+        """
+        return self.facts.get(policy)
+
+    def list_policy_facts(self) -> List[Dict[str, Any]]:
+        """Policies that have facts: document id, policy type and code."""
+        return self.facts.policies()
+
     def get_policy_summary(self, policy_type: str) -> Optional[str]:  # noqa: D401
+        facts = self.facts.get(policy_type)
+        if facts and facts.get("summary"):
+            return facts["summary"]
         if not self.vectorstore:
             raise ValueError(
                 "Vectorstore not initialised – call create_index() first")
         query = f"{policy_type} policy overview coverage"
-        res = self.search_policies(query, k=3, score_threshold=0.3)
+        res = self.search_policies(query, k=3, score_threshold=0.3,
+                                   filters={"policy_type": policy_type})
         return res[0]["content"] if res else None
 
 
 # ---------------------------------------------------------------------------
 _policy_search_singleton: PolicyVectorSearch | None = None
+_policy_search_lock = threading.Lock()
 
 
 def get_policy_search() -> PolicyVectorSearch:  # noqa: D401
     global _policy_search_singleton
     if _policy_search_singleton is None:
-        _policy_search_singleton = PolicyVectorSearch()
-        try:
-            _policy_search_singleton.create_index()
-        except Exception as e:  # pragma: no cover
-            logger.error("Could not build policy index: %s", e)
+        # Single flight: concurrent first callers wait for one initialisation
+        with _policy_search_lock:
+            if _policy_search_singleton is None:
+                policy_search = PolicyVectorSearch()
+                try:
+                    policy_search.create_index()
+                except Exception as e:  # pragma: no cover
+                    logger.error("Could not build policy index: %s", e)
+                _policy_search_singleton = policy_search
     return _policy_search_singleton
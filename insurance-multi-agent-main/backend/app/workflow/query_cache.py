@@ -0,0 +1,104 @@
+"""Query embedding cache for policy search.
+
+The policy checker repeats stock queries ("collision coverage", "exclusions",
+"eigen schade", ...) on nearly every claim. Caching their embeddings saves an
+embedding round trip per repeated query. Entries live in an in-memory LRU and,
+optionally, in a small SQLite file so they survive restarts. Keys include the
+embedding model name, so switching models never serves stale vectors.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """Collapse whitespace so trivially different spellings share an entry."""
+    return " ".join(query.split())
+
+
+class QueryEmbeddingCache:
+    """Thread-safe LRU of query → embedding with optional SQLite persistence."""
+
+    def __init__(self, model: str, max_entries: int = 4096, persist_path: str | Path | None = None):
+        self.model = model
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._db: Optional[sqlite3.Connection] = None
+        if persist_path:
+            try:
+                Path(persist_path).parent.mkdir(parents=True, exist_ok=True)
+                self._db = sqlite3.connect(str(persist_path), check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS query_embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning("Query embedding cache persistence disabled: %s", e)
+                self._db = None
+
+    def _key(self, query: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{normalize_query(query)}".encode("utf-8")).hexdigest()
+
+    # ------------------------------------------------------------------
+    def get_many(self, queries: List[str]) -> Tuple[Dict[str, np.ndarray], List[str]]:
+        """Look up queries; returns (cached vectors by query, uncached queries)."""
+        found: Dict[str, np.ndarray] = {}
+        missing: List[str] = []
+        with self._lock:
+            for query in queries:
+                if query in found or query in missing:
+                    continue
+                key = self._key(query)
+                vector = self._entries.get(key)
+                if vector is None and self._db is not None:
+                    row = self._db.execute(
+                        "SELECT vector FROM query_embeddings WHERE key = ?", (key,)).fetchone()
+                    if row:
+                        vector = np.frombuffer(row[0], dtype=np.float32)
+                        self._remember(key, vector)
+                if vector is None:
+                    missing.append(query)
+                    self.misses += 1
+                else:
+                    self._entries.move_to_end(key)
+                    found[query] = vector
+                    self.hits += 1
+        return found, missing
+
+    def put_many(self, vectors: Dict[str, np.ndarray]) -> None:
+        with self._lock:
+            rows = []
+            for query, vector in vectors.items():
+                key = self._key(query)
+                vector = np.asarray(vector, dtype=np.float32)
+                self._remember(key, vector)
+                rows.append((key, vector.tobytes()))
+            if self._db is not None and rows:
+                try:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO query_embeddings (key, vector) VALUES (?, ?)", rows)
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning("Could not persist query embeddings: %s", e)
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
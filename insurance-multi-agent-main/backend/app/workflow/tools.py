@@ -6,9 +6,12 @@ This module contains all the tools used by the multi-agent insurance claim proce
 These tools provide access to policy details, claimant history, and vehicle information.
 """
 
-from typing import Dict, Any, List
-from langchain_core.tools import tool
+from typing import Dict, Any, List, Optional, Union
+from langchain_core.tools import StructuredTool, tool
 from .policy_search import get_policy_search  # changed to relative import
+from .diversity import Diversity
+from .policy_facts import TOPICS
+import asyncio
 import os
 import base64
 import logging
@@ -229,50 +232,199 @@ def get_vehicle_details(vin: str) -> Dict[str, Any]:
     return vehicle
 
 
-@tool
-def search_policy_documents(query: str) -> Dict[str, Any]:
-    """Search through all policy documents to find relevant information."""
+def _search_filters(policy_type: Optional[str], category: Optional[str],
+                    language: Optional[str], file_type: Optional[str]) -> Dict[str, Any]:
+    return {
+        "policy_type": policy_type,
+        "category": category,
+        "language": language,
+        "file_type": file_type,
+    }
+
+
+def _format_search_response(query: Union[str, List[str]],
+                            search_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    if not search_results:
+        return {
+            "status": "no_results_found",
+            "message": f"No relevant policy information found for query: '{query}'",
+            "query": query,
+        }
+
+    formatted_results = []
+    for r in search_results:
+        formatted = {
+            "policy_type": r["policy_type"],
+            "section": r["section"],
+            "content": r["content"],
+            "relevance_score": round(r["similarity_score"], 3),
+        }
+        if "matched_queries" in r:
+            formatted["matched_queries"] = r["matched_queries"]
+        if r.get("sources"):
+            # Identical wording stored once; name the other policies it appears in
+            formatted["also_in"] = sorted({s["policy_type"] for s in r["sources"]
+                                           if s.get("policy_type")} - {r["policy_type"]})
+        formatted_results.append(formatted)
+    return {
+        "status": "results_found",
+        "query": query,
+        "total_results": len(formatted_results),
+        "results": formatted_results,
+    }
+
+
+def _search_diversity(diversify: bool, max_per_document: Optional[int],
+                      max_per_section: Optional[int]) -> Optional[Diversity]:
+    if not (diversify or max_per_document or max_per_section):
+        return None
+    from app.core.config import get_settings
+    return Diversity(
+        mmr_lambda=get_settings().policy_search_mmr_lambda if diversify else None,
+        max_per_document=max_per_document or None,
+        max_per_section=max_per_section or None,
+    )
+
+
+_VECTORSTORE_MISSING = "Policy vectorstore not initialized. Index may not be built."
+
+
+def _search_policy_documents(
+    query: Union[str, List[str]],
+    search_mode: Optional[str] = None,
+    policy_type: Optional[str] = None,
+    category: Optional[str] = None,
+    language: Optional[str] = None,
+    file_type: Optional[str] = None,
+    diversify: bool = False,
+    max_per_document: Optional[int] = None,
+    max_per_section: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Search through all policy documents to find relevant information.
+
+    Pass a list of queries (e.g. ["collision coverage", "exclusions",
+    "deductible"]) to run them together in one search; duplicate hits are
+    merged and each result lists the queries that matched it.
+
+    ``search_mode`` is "hybrid" (semantic + keyword), "lexical" for exact
+    terms such as policy numbers, Dutch terms or section numbers, or "dense"
+    for purely semantic matching. Left out, the ``POLICY_SEARCH_MODE``
+    setting decides (hybrid unless configured otherwise).
+
+    Optional filters scope the search before ranking: ``policy_type`` (e.g.
+    "Motorcycle Policy"), ``category`` (policy, regulation, reference),
+    ``language`` ("en" or "nl") and ``file_type`` ("md" or "pdf").
+
+    Set ``diversify`` to skip results that repeat what a better result already
+    says, and ``max_per_document`` / ``max_per_section`` to cap the results
+    taken from one policy or one section – useful for broad questions where
+    several policies or clauses should be compared.
+    """
     try:
         policy_search = get_policy_search()
 
         # Check if vectorstore is properly initialized
         if not policy_search.vectorstore:
-            return {
-                "status": "error",
-                "message": "Policy vectorstore not initialized. Index may not be built.",
-                "query": query,
-            }
+            return {"status": "error", "message": _VECTORSTORE_MISSING, "query": query}
+
+        filters = _search_filters(policy_type, category, language, file_type)
+        diversity = _search_diversity(diversify, max_per_document, max_per_section)
+        if isinstance(query, list):
+            search_results = policy_search.search_policies_batch(
+                query, k=5, score_threshold=0.3, mode=search_mode, filters=filters,
+                diversity=diversity)
+        else:
+            search_results = policy_search.search_policies(
+                query, k=5, score_threshold=0.3, mode=search_mode, filters=filters,
+                diversity=diversity)
+        return _format_search_response(query, search_results)
+    except Exception as e:
+        logger.error("Error in search_policy_documents: %s", e, exc_info=True)
+        return {"status": "error", "message": f"Search failed: {str(e)}", "query": query}
 
-        search_results = policy_search.search_policies(
-            query, k=5, score_threshold=0.3)
 
-        if not search_results:
-            return {
-                "status": "no_results_found",
-                "message": f"No relevant policy information found for query: '{query}'",
-                "query": query,
-            }
+async def _asearch_policy_documents(
+    query: Union[str, List[str]],
+    search_mode: Optional[str] = None,
+    policy_type: Optional[str] = None,
+    category: Optional[str] = None,
+    language: Optional[str] = None,
+    file_type: Optional[str] = None,
+    diversify: bool = False,
+    max_per_document: Optional[int] = None,
+    max_per_section: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Async `_search_policy_documents`, used when agents run via ``ainvoke``."""
+    try:
+        # Initialising the index may build it; keep that off the event loop
+        policy_search = await asyncio.to_thread(get_policy_search)
 
-        formatted_results = [
-            {
-                "policy_type": r["policy_type"],
-                "section": r["section"],
-                "content": r["content"],
-                "relevance_score": round(r["similarity_score"], 3),
-            }
-            for r in search_results
-        ]
-        return {
-            "status": "results_found",
-            "query": query,
-            "total_results": len(formatted_results),
-            "results": formatted_results,
-        }
+        if not policy_search.vectorstore:
+            return {"status": "error", "message": _VECTORSTORE_MISSING, "query": query}
+
+        filters = _search_filters(policy_type, category, language, file_type)
+        diversity = _search_diversity(diversify, max_per_document, max_per_section)
+        if isinstance(query, list):
+            search_results = await policy_search.asearch_policies_batch(
+                query, k=5, score_threshold=0.3, mode=search_mode, filters=filters,
+                diversity=diversity)
+        else:
+            search_results = await policy_search.asearch_policies(
+                query, k=5, score_threshold=0.3, mode=search_mode, filters=filters,
+                diversity=diversity)
+        return _format_search_response(query, search_results)
     except Exception as e:
         logger.error("Error in search_policy_documents: %s", e, exc_info=True)
         return {"status": "error", "message": f"Search failed: {str(e)}", "query": query}
 
 
+# One tool with both implementations: `invoke` runs the sync search,
+# `ainvoke` (async agent graphs) awaits the non-blocking one.
+search_policy_documents = StructuredTool.from_function(
+    func=_search_policy_documents,
+    coroutine=_asearch_policy_documents,
+    name="search_policy_documents",
+)
+
+
+@tool
+def lookup_policy_coverage(policy: str, topic: Optional[str] = None) -> Dict[str, Any]:
+    """Look up a policy's summary, coverages, limits, deductibles and exclusions.
+
+    ``policy`` is a policy type (e.g. "Motorcycle Policy"), a policy code
+    (e.g. "COMP-AUTO-001") or a document name. ``topic`` narrows the answer
+    to one of "summary", "coverages", "limits", "deductibles" or
+    "exclusions"; omit it to get all of them. The tables are extracted when
+    the policy is indexed, so this answers in one call without a search;
+    every entry names the ``section`` to cite. Use `search_policy_documents`
+    for wording the tables do not contain.
+    """
+    try:
+        if topic is not None and topic not in TOPICS:
+            return {"status": "error", "message": f"Unknown topic '{topic}' – expected one of {list(TOPICS)}"}
+        policy_search = get_policy_search()
+        facts = policy_search.get_policy_facts(policy)
+        if facts is None:
+            return {
+                "status": "not_found",
+                "message": f"No coverage table found for policy '{policy}'",
+                "available_policies": policy_search.list_policy_facts(),
+            }
+        result = {
+            "status": "found",
+            "policy_type": facts["policy_type"],
+            "document_id": facts["document_id"],
+            "title": facts.get("title"),
+            "attributes": facts.get("attributes", {}),
+        }
+        for name in ([topic] if topic else TOPICS):
+            result[name] = facts.get(name)
+        return result
+    except Exception as e:
+        logger.error("Error in lookup_policy_coverage: %s", e, exc_info=True)
+        return {"status": "error", "message": f"Lookup failed: {str(e)}", "policy": policy}
+
+
 @tool
 def analyze_image(image_path: str) -> Dict[str, Any]:
     """Analyze an image using the Azure OpenAI multimodal model.
@@ -384,6 +536,7 @@ ALL_TOOLS: List = [
     get_claimant_history,
     get_vehicle_details,
     search_policy_documents,
+    lookup_policy_coverage,
     analyze_image,
 ]
 TOOLS_BY_NAME = {t.name: t for t in ALL_TOOLS}
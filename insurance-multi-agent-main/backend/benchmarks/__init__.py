@@ -0,0 +1,4 @@
+"""Offline benchmarks for the policy search stack.
+
+Run from the backend directory, e.g. ``python -m benchmarks.hybrid_search``.
+"""
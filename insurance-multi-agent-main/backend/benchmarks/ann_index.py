@@ -0,0 +1,137 @@
+"""Recall, latency and memory of the policy index types and compressions.
+
+Usage (from the backend directory)::
+
+    python -m benchmarks.ann_index [--n 50000] [--dim 1536] [--queries 500] [--k 10]
+                                   [--nprobe 4,16,64] [--ef-search 32,64,128]
+                                   [--compression none,sq8,pq] [--rerank-depth 50]
+
+Vectors are synthetic (Gaussian clusters, unit-normalised like ada-002
+embeddings), so the corpus size can be scaled well past the bundled
+policies. Recall@k is measured against the exact flat index; latency is per
+single query, as the policy checker issues them; memory is the serialised
+index size. Compressed indexes are measured with and without re-ranking the
+top ``--rerank-depth`` candidates against exact vectors, and each row shows
+the memory saved and recall lost relative to the uncompressed flat index.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from .common import percentile
+from app.workflow.ann_index import AnnIndexConfig, build_index, rerank_exact, search_parameters
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int = 200, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, n)] + 0.5 * rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def measure(index, config: AnnIndexConfig, queries: np.ndarray, truth: np.ndarray, k: int,
+            exact: np.ndarray | None = None) -> Dict[str, float]:
+    """Search each query alone; with ``exact`` given, re-rank like the service does."""
+    import faiss
+
+    params = search_parameters(index, config)
+    fetch = max(k, config.rerank_depth) if exact is not None else k
+    latencies: List[float] = []
+    found = np.empty((len(queries), k), dtype=np.int64)
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        if params is None:
+            distances, ids = index.search(query[None, :], fetch)
+        else:
+            distances, ids = index.search(query[None, :], fetch, params=params)
+        if exact is not None:
+            distances, ids = rerank_exact(
+                query[None, :], distances, ids, {int(p): exact[p] for p in ids[0] if p != -1}, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found[i] = ids[0][:k]
+    recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+    return {
+        f"recall@{k}": round(float(recall), 4),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "memory_mb": round(faiss.serialize_index(index).nbytes / (1024 * 1024), 2),
+    }
+
+
+def run(n: int, dim: int, num_queries: int, k: int, nprobes: List[int], ef_searches: List[int],
+        compressions: List[str], rerank_depth: int) -> List[Dict[str, object]]:
+    vectors = synthetic_vectors(n, dim)
+    queries = synthetic_vectors(num_queries, dim, seed=1)
+    config = AnnIndexConfig(rerank_depth=rerank_depth)
+
+    rows: List[Dict[str, object]] = []
+    indexes = {}
+    build_seconds: Dict[tuple, float] = {}
+    for index_type in ("flat", "hnsw", "ivf_flat"):
+        for compression in compressions:
+            start = time.perf_counter()
+            indexes[index_type, compression] = build_index(config, vectors, index_type, compression)
+            build_seconds[index_type, compression] = round(time.perf_counter() - start, 2)
+
+    baseline = indexes.get(("flat", "none")) or build_index(config, vectors, "flat", "none")
+    _, truth = baseline.search(queries, k)
+    baseline_mb = measure(baseline, config, queries[:1], truth[:1], k)["memory_mb"]
+    for (index_type, compression), index in indexes.items():
+        if index_type == "hnsw":
+            knobs = [("efSearch", ef) for ef in ef_searches]
+        elif index_type.startswith("ivf"):
+            knobs = [("nprobe", nprobe) for nprobe in nprobes]
+        else:
+            knobs = [("-", 0)]
+        reranks = [False, True] if compression != "none" and rerank_depth else [False]
+        for knob, value in knobs:
+            config.hnsw_ef_search = value if knob == "efSearch" else config.hnsw_ef_search
+            config.ivf_nprobe = value if knob == "nprobe" else config.ivf_nprobe
+            for rerank in reranks:
+                result = measure(index, config, queries, truth, k, vectors if rerank else None)
+                rows.append({
+                    "type": index_type, "compression": compression, "rerank": rerank,
+                    "knob": f"{knob}={value}" if value else "-",
+                    "build_s": build_seconds[index_type, compression], **result,
+                    "memory_saved_pct": round(100 * (1 - result["memory_mb"] / baseline_mb), 1),
+                    "recall_lost": round(1 - result[f"recall@{k}"], 4),
+                })
+    return rows
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=50_000, help="corpus size (vectors)")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=_int_list, default=[4, 16, 64])
+    parser.add_argument("--ef-search", type=_int_list, default=[32, 64, 128])
+    parser.add_argument("--compression", type=lambda v: [c for c in v.split(",") if c],
+                        default=["none", "sq8", "pq"])
+    parser.add_argument("--rerank-depth", type=int, default=50, help="0 disables re-ranking")
+    args = parser.parse_args()
+
+    rows = run(args.n, args.dim, args.queries, args.k, args.nprobe, args.ef_search,
+               args.compression, args.rerank_depth)
+    print(f"n={args.n} dim={args.dim} queries={args.queries} "
+          f"auto type: {AnnIndexConfig().resolve_type(args.n)}")
+    print(f"{'type':<9} {'codes':<5} {'rerank':<6} {'knob':<13} {'build s':>8} {'recall':>7} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'MB':>8} {'saved %':>8} {'lost':>7}")
+    for row in rows:
+        print(f"{row['type']:<9} {row['compression']:<5} {'yes' if row['rerank'] else 'no':<6} "
+              f"{row['knob']:<13} {row['build_s']:>8} {row[f'recall@{args.k}']:>7} "
+              f"{row['p50_ms']:>8} {row['p99_ms']:>8} {row['memory_mb']:>8} "
+              f"{row['memory_saved_pct']:>8} {row['recall_lost']:>7}")
+
+
+if __name__ == "__main__":
+    main()
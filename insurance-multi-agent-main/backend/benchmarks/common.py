@@ -0,0 +1,106 @@
+"""Shared helpers for policy search benchmarks."""
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app.workflow.lexical_index import tokenize  # noqa: E402
+from app.workflow.policy_search import PolicyVectorSearch  # noqa: E402
+
+QUERIES_FILE = Path(__file__).resolve().parent / "policy_queries.json"
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic local embedding stand-in (feature-hashed words + trigrams).
+
+    Needs no network or API key, so benchmark runs are reproducible. It only
+    captures surface overlap, so absolute dense quality is far below a real
+    model; compare configurations against each other, not against Azure.
+    """
+
+    def __init__(self, size: int = 256):
+        self.size = size
+        self.calls = 0
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.size, dtype=np.float32)
+        for token in tokenize(text):
+            features = [token] + [token[i:i + 3] for i in range(max(len(token) - 2, 0))]
+            for feature in features:
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.size
+                vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = float(np.linalg.norm(vector))
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def make_embeddings(use_azure: bool) -> Embeddings:
+    """Azure embeddings when requested and configured, else the local stand-in."""
+    if use_azure and os.getenv("AZURE_OPENAI_API_KEY") and os.getenv("AZURE_OPENAI_ENDPOINT"):
+        search = PolicyVectorSearch(index_path=tempfile.mkdtemp())
+        return search.embeddings
+    return HashingEmbeddings()
+
+
+def build_search(embeddings: Embeddings, index_dir: str | Path | None = None,
+                 policies_dir: str | Path | None = None) -> PolicyVectorSearch:
+    """Build a fresh policy index in a scratch directory."""
+    index_dir = Path(index_dir) if index_dir else Path(tempfile.mkdtemp(prefix="policy-bench-"))
+    search = PolicyVectorSearch(policies_dir=policies_dir, index_path=index_dir, embeddings=embeddings)
+    search.create_index(force_rebuild=True)
+    return search
+
+
+def load_queries() -> List[Dict[str, Any]]:
+    with open(QUERIES_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def is_relevant(result: Dict[str, Any], expected: Dict[str, Any]) -> bool:
+    """A hit is the expected policy with the expected section heading in the chunk."""
+    if result.get("document_id") != expected["policy"]:
+        return False
+    section = expected.get("section")
+    return not section or section in result["content"] or section == result.get("section")
+
+
+def first_relevant_rank(results: List[Dict[str, Any]], expected: Dict[str, Any]) -> int | None:
+    for rank, result in enumerate(results, start=1):
+        if is_relevant(result, expected):
+            return rank
+    return None
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def timed(fn: Callable[[], Any]) -> Tuple[Any, float]:
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
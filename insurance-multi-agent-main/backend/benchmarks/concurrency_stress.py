@@ -0,0 +1,189 @@
+"""Stress test: concurrent uploads, deletes, compactions and searches.
+
+Usage (from the backend directory)::
+
+    python -m benchmarks.concurrency_stress [--seconds 20] [--searchers 8] [--writers 3]
+                                            [--documents 6] [--initialisers 4]
+
+First several threads initialise search services on one empty index
+directory at the same time; exactly one index version must be built.
+Then searcher threads run dense, lexical, hybrid and filtered queries while
+writer threads add, replace and delete copies of the bundled policies and a
+compactor thread folds the changes into new versions. It fails (exit code 1)
+if any call raises, a result comes back without its chunk, or the final
+index disagrees with the last operation on each document. The
+deterministic hashing embedding is used, so no API key is needed.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from .common import HashingEmbeddings, percentile
+from app.workflow.policy_search import PolicyVectorSearch
+
+QUERIES = ["theft of motorcycle", "UNAuto", "eigen schade", "windscreen damage", "6.3",
+           "liability limits for commercial vehicles", "high value vehicle agreed value"]
+
+
+def initialise_concurrently(index_dir: Path, embeddings: HashingEmbeddings, count: int
+                            ) -> List[PolicyVectorSearch]:
+    """Start ``count`` services on an empty directory at once; return them."""
+    services = [PolicyVectorSearch(index_path=index_dir, embeddings=embeddings) for _ in range(count)]
+    barrier = threading.Barrier(count)
+
+    def start(service: PolicyVectorSearch) -> None:
+        barrier.wait()
+        service.create_index()
+
+    threads = [threading.Thread(target=start, args=(service,)) for service in services]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return services
+
+
+def run(seconds: float, searchers: int, writers: int, documents: int, initialisers: int
+        ) -> Dict[str, object]:
+    index_dir = Path(tempfile.mkdtemp(prefix="policy-stress-"))
+    upload_dir = Path(tempfile.mkdtemp(prefix="policy-stress-docs-"))
+    embeddings = HashingEmbeddings()
+
+    services = initialise_concurrently(index_dir, embeddings, initialisers)
+    versions_built = sum(1 for p in (index_dir / "versions").iterdir() if p.is_dir())
+    search = services[0]
+    policies = sorted(search.policies_dir.glob("*.md"))
+
+    errors: List[str] = []
+    latencies: List[float] = []
+    counts = {"searches": 0, "adds": 0, "deletes": 0, "compactions": 0}
+    # Last operation per uploaded document id: True = added, False = deleted
+    expected: Dict[str, bool] = {}
+    state_lock = threading.Lock()
+    stop = threading.Event()
+
+    def record_error(message: str) -> None:
+        with state_lock:
+            errors.append(message)
+
+    def searcher(seed: int) -> None:
+        rng = random.Random(seed)
+        while not stop.is_set():
+            query = rng.choice(QUERIES)
+            mode = rng.choice(["dense", "lexical", "hybrid"])
+            filters = rng.choice([None, {"category": "uploaded"}, {"category": "policy"}])
+            start = time.perf_counter()
+            try:
+                results = search.search_policies(query, k=5, score_threshold=0.0, mode=mode,
+                                                 filters=filters)
+            except Exception as e:
+                record_error(f"search {query!r} ({mode}, {filters}): {e!r}")
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            if any(not r.get("chunk_id") or not r.get("content") for r in results):
+                record_error(f"search {query!r} returned a result without its chunk")
+            with state_lock:
+                latencies.append(elapsed)
+                counts["searches"] += 1
+
+    def writer(seed: int) -> None:
+        rng = random.Random(seed)
+        while not stop.is_set():
+            document_id = f"upload-{rng.randrange(documents)}"
+            # One writer per document at a time keeps `expected` well defined
+            with document_locks[document_id]:
+                try:
+                    if rng.random() < 0.7:
+                        path = upload_dir / f"{document_id}-{seed}.md"
+                        shutil.copy(rng.choice(policies), path)
+                        if not search.add_document_to_index(path, document_id=document_id,
+                                                            metadata={"category": "uploaded"}):
+                            raise RuntimeError("add_document_to_index returned False")
+                        added = True
+                    else:
+                        search.delete_document_from_index(document_id)
+                        added = False
+                except Exception as e:
+                    record_error(f"write {document_id}: {e!r}")
+                    continue
+                with state_lock:
+                    expected[document_id] = added
+                    counts["adds" if added else "deletes"] += 1
+
+    def compactor() -> None:
+        while not stop.wait(1.0):
+            try:
+                search.compact_index()
+            except Exception as e:
+                record_error(f"compaction: {e!r}")
+                continue
+            with state_lock:
+                counts["compactions"] += 1
+
+    document_locks = {f"upload-{i}": threading.Lock() for i in range(documents)}
+    threads = [threading.Thread(target=searcher, args=(i,)) for i in range(searchers)]
+    threads += [threading.Thread(target=writer, args=(1000 + i,)) for i in range(writers)]
+    threads.append(threading.Thread(target=compactor))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    if search._compaction_thread:
+        search._compaction_thread.join()
+
+    for document_id, added in expected.items():
+        if search.is_document_indexed(document_id) != added:
+            errors.append(f"{document_id}: expected {'indexed' if added else 'deleted'}")
+    # A second service opened now must see exactly the same documents
+    reopened = PolicyVectorSearch(index_path=index_dir, embeddings=embeddings)
+    reopened.create_index()
+    if reopened.vectorstore.live_count != search.vectorstore.live_count:
+        errors.append(f"reopened index has {reopened.vectorstore.live_count} live chunks, "
+                      f"serving index {search.vectorstore.live_count}")
+
+    return {
+        "initialisers": initialisers,
+        "versions_built": versions_built,
+        **counts,
+        "search_p50_ms": round(percentile(latencies, 50), 2),
+        "search_p99_ms": round(percentile(latencies, 99), 2),
+        "live_chunks": search.vectorstore.live_count,
+        "errors": errors,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--searchers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=3)
+    parser.add_argument("--documents", type=int, default=6, help="distinct uploaded document ids")
+    parser.add_argument("--initialisers", type=int, default=4,
+                        help="services started concurrently on the empty index")
+    args = parser.parse_args()
+
+    report = run(args.seconds, args.searchers, args.writers, args.documents, args.initialisers)
+    errors = report.pop("errors")
+    if report["versions_built"] != 1:
+        errors.append(f"{report['initialisers']} concurrent initialisations built "
+                      f"{report['versions_built']} versions")
+    for key, value in report.items():
+        print(f"{key:<16} {value}")
+    for error in errors[:20]:
+        print(f"ERROR {error}")
+    print(f"{len(errors)} errors")
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
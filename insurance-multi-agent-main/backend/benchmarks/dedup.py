@@ -0,0 +1,96 @@
+"""Index size, embedding calls and repeated hits with and without deduplication.
+
+Usage (from the backend directory)::
+
+    python -m benchmarks.dedup [--policies DIR] [--threshold 0.9] [--k 5] [--azure]
+
+Builds the policy index from ``--policies`` (default: the bundled policies)
+twice – deduplication off, then at ``--threshold`` – and reports chunks
+stored, chunks embedded and embedding requests, snapshot size on disk, and
+how many top-k hits over the benchmark queries are near-duplicates of a
+higher-ranked hit. Point it at a directory of insurer PDFs to see the effect
+on real boilerplate.
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List
+
+from langchain_core.embeddings import Embeddings
+
+from .common import load_queries, make_embeddings
+from app.core.config import get_settings
+from app.workflow.dedup import signature, similarity
+from app.workflow.index_snapshot import SNAPSHOT_FILES
+from app.workflow.policy_search import PolicyVectorSearch
+
+
+class CountingEmbeddings(Embeddings):
+    """Counts the texts and requests sent to the wrapped embeddings."""
+
+    def __init__(self, inner: Embeddings):
+        self.inner = inner
+        self.texts = 0
+        self.requests = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.texts += len(texts)
+        self.requests += 1
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.inner.embed_query(text)
+
+
+def repeated_hits(search: PolicyVectorSearch, k: int, threshold: float) -> int:
+    """Top-k hits that near-duplicate a better-ranked hit of the same query."""
+    repeated = 0
+    for query in load_queries():
+        results = search.search_policies(query["query"], k=k, score_threshold=0.0, mode="hybrid")
+        seen = []
+        for result in results:
+            sig = signature(result["content"])
+            if any(similarity(sig, other) >= threshold for other in seen):
+                repeated += 1
+            seen.append(sig)
+    return repeated
+
+
+def measure(embeddings: Embeddings, policies: Path | None, threshold: float, k: int,
+            check_threshold: float) -> Dict[str, Any]:
+    get_settings().policy_dedup_threshold = threshold
+    counting = CountingEmbeddings(embeddings)
+    search = PolicyVectorSearch(policies_dir=policies, index_path=tempfile.mkdtemp(prefix="policy-dedup-"),
+                                embeddings=counting)
+    search.create_index(force_rebuild=True)
+    version_dir = search.store.version_dir(search.version)
+    return {
+        "chunks_stored": search.vectorstore.live_count,
+        "chunks_embedded": counting.texts,
+        "embedding_requests": counting.requests,
+        "snapshot_kb": round(sum((version_dir / name).stat().st_size for name in SNAPSHOT_FILES) / 1024, 1),
+        f"repeated_in_top{k}": repeated_hits(search, k, check_threshold),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--policies", type=Path, default=None, help="directory of .md/.pdf policies")
+    parser.add_argument("--threshold", type=float, default=get_settings().policy_dedup_threshold)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--azure", action="store_true", help="use Azure OpenAI embeddings")
+    args = parser.parse_args()
+
+    embeddings = make_embeddings(args.azure)
+    off = measure(embeddings, args.policies, 0.0, args.k, args.threshold)
+    on = measure(embeddings, args.policies, args.threshold, args.k, args.threshold)
+    print(f"{'':<20} {'off':>10} {f'@{args.threshold}':>10} {'saved':>8}")
+    for key in off:
+        saved = f"{1 - on[key] / off[key]:.1%}" if off[key] else "-"
+        print(f"{key:<20} {off[key]:>10} {on[key]:>10} {saved:>8}")
+
+
+if __name__ == "__main__":
+    main()
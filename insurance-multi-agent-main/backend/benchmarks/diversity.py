@@ -0,0 +1,89 @@
+"""Redundancy and hit quality of plain versus diversified policy search.
+
+Usage (from the backend directory)::
+
+    python -m benchmarks.diversity [--azure] [--k 5] [--mode hybrid] [--mmr-lambda 0.5]
+
+Runs the benchmark queries without diversity, with MMR re-ranking, with a
+one-hit-per-section cap and with both, and reports hit@k and MRR next to
+what the policy checker pays for: distinct documents and sections per
+result list, mean pairwise cosine similarity of the returned chunks, result
+tokens and latency.
+"""
+from __future__ import annotations
+
+import argparse
+from itertools import combinations
+from typing import Any, Dict, List
+
+import numpy as np
+
+from .common import build_search, first_relevant_rank, load_queries, make_embeddings, percentile, timed
+from app.workflow.diversity import Diversity
+from app.workflow.policy_search import PolicyVectorSearch
+
+
+def redundancy(search: PolicyVectorSearch, results: List[Dict[str, Any]]) -> float:
+    """Mean cosine similarity between the stored vectors of the results."""
+    if len(results) < 2:
+        return 0.0
+    index = search.vectorstore
+    positions = index.positions_of([r["chunk_id"] for r in results])
+    vectors = index.exact_vectors([positions[r["chunk_id"]] for r in results])
+    unit = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    return float(np.mean([unit[i] @ unit[j] for i, j in combinations(range(len(unit)), 2)]))
+
+
+def run(k: int, mode: str, mmr_lambda: float, use_azure: bool) -> Dict[str, Dict[str, float]]:
+    search = build_search(make_embeddings(use_azure))
+    queries = load_queries()
+    configs = {
+        "off": None,
+        "mmr": Diversity(mmr_lambda=mmr_lambda),
+        "section cap 1": Diversity(max_per_section=1),
+        "mmr + cap": Diversity(mmr_lambda=mmr_lambda, max_per_section=1),
+    }
+    report: Dict[str, Dict[str, float]] = {}
+    for name, diversity in configs.items():
+        stats: Dict[str, List[float]] = {key: [] for key in
+                                         ("hit", "rr", "documents", "sections", "redundancy", "tokens", "ms")}
+        for item in queries:
+            results, ms = timed(lambda: search.search_policies(
+                item["query"], k=k, score_threshold=0.0, mode=mode, diversity=diversity))
+            rank = first_relevant_rank(results, item)
+            stats["hit"].append(1.0 if rank else 0.0)
+            stats["rr"].append(1.0 / rank if rank else 0.0)
+            stats["documents"].append(len({r["document_id"] for r in results}))
+            stats["sections"].append(len({(r["document_id"], r["section"]) for r in results}))
+            stats["redundancy"].append(redundancy(search, results))
+            stats["tokens"].append(sum(r.get("token_count") or 0 for r in results))
+            stats["ms"].append(ms)
+        report[name] = {
+            f"hit@{k}": round(float(np.mean(stats["hit"])), 3),
+            "mrr": round(float(np.mean(stats["rr"])), 3),
+            "documents": round(float(np.mean(stats["documents"])), 2),
+            "sections": round(float(np.mean(stats["sections"])), 2),
+            "redundancy": round(float(np.mean(stats["redundancy"])), 3),
+            "tokens": round(float(np.mean(stats["tokens"])), 1),
+            "p50_ms": round(percentile(stats["ms"], 50), 2),
+        }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--mode", default="hybrid", choices=("hybrid", "dense", "lexical"))
+    parser.add_argument("--mmr-lambda", type=float, default=0.5)
+    parser.add_argument("--azure", action="store_true", help="use Azure OpenAI embeddings")
+    args = parser.parse_args()
+
+    report = run(args.k, args.mode, args.mmr_lambda, args.azure)
+    columns = list(next(iter(report.values())))
+    print(f"{'':<14}" + "".join(f"{column:>12}" for column in columns))
+    for name, row in report.items():
+        print(f"{name:<14}" + "".join(f"{row[column]:>12}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
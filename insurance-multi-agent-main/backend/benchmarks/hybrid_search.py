@@ -0,0 +1,66 @@
+"""Latency and hit quality of dense, lexical and hybrid policy search.
+
+Usage (from the backend directory)::
+
+    python -m benchmarks.hybrid_search [--azure] [--k 5] [--repeat 5]
+
+Without ``--azure`` a deterministic hashing embedding stands in for Azure
+OpenAI. Query embeddings are served from the cache after the first repeat,
+so latency reflects the steady state the policy checker sees.
+"""
+from __future__ import annotations
+
+import argparse
+from typing import Dict, List
+
+from .common import (build_search, first_relevant_rank, load_queries, make_embeddings,
+                     percentile, timed)
+
+
+def run(k: int, repeat: int, use_azure: bool) -> Dict[str, Dict[str, Dict[str, float]]]:
+    embeddings = make_embeddings(use_azure)
+    search = build_search(embeddings)
+    queries = load_queries()
+
+    report: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for mode in ("dense", "lexical", "hybrid"):
+        by_kind: Dict[str, Dict[str, List[float]]] = {}
+        for item in queries:
+            stats = by_kind.setdefault(item["kind"], {"latency": [], "hit": [], "rr": []})
+            for _ in range(repeat):
+                results, ms = timed(lambda: search.search_policies(
+                    item["query"], k=k, score_threshold=0.0, mode=mode))
+                stats["latency"].append(ms)
+            rank = first_relevant_rank(results, item)
+            stats["hit"].append(1.0 if rank else 0.0)
+            stats["rr"].append(1.0 / rank if rank else 0.0)
+        report[mode] = {
+            kind: {
+                "queries": len(stats["hit"]),
+                f"hit@{k}": round(sum(stats["hit"]) / len(stats["hit"]), 3),
+                "mrr": round(sum(stats["rr"]) / len(stats["rr"]), 3),
+                "p50_ms": round(percentile(stats["latency"], 50), 3),
+                "p95_ms": round(percentile(stats["latency"], 95), 3),
+            }
+            for kind, stats in by_kind.items()
+        }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--azure", action="store_true", help="use Azure OpenAI embeddings")
+    args = parser.parse_args()
+
+    report = run(args.k, args.repeat, args.azure)
+    print(f"{'mode':<8} {'kind':<9} {'n':>3} {'hit@k':>6} {'mrr':>6} {'p50 ms':>8} {'p95 ms':>8}")
+    for mode, kinds in report.items():
+        for kind, row in kinds.items():
+            print(f"{mode:<8} {kind:<9} {row['queries']:>3} {row[f'hit@{args.k}']:>6} "
+                  f"{row['mrr']:>6} {row['p50_ms']:>8} {row['p95_ms']:>8}")
+
+
+if __name__ == "__main__":
+    main()
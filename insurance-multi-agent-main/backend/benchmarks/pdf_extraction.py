@@ -0,0 +1,102 @@
+"""Serial versus parallel PDF page extraction on the sandbox workers.
+
+Usage (from the backend directory)::
+
+    python -m benchmarks.pdf_extraction [--pages 400] [--small 12] [--workers 4] [--repeat 3]
+
+Generates one large policy-like PDF and a folder of small ones, then times
+`PDFProcessor.extract_pages_many` on one sandbox worker and on several: the
+large PDF alone, and the whole folder as one batch (as the policy folder
+scan does). Pages are checked to come back identical and in order, and each
+document's wall time, CPU time and speedup are reported. Speedups need as
+many free CPU cores as workers.
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+import fitz  # PyMuPDF
+
+from .common import percentile, timed
+from app.workflow.pdf_processor import PDFProcessor
+
+_PARAGRAPH = (
+    "The insurer pays for direct physical loss to the insured vehicle caused by collision, "
+    "fire, theft or vandalism, less the deductible shown in the declarations. Coverage "
+    "applies within the policy territory while the vehicle is driven by a permitted user. "
+)
+
+
+def make_pdf(path: Path, pages: int) -> Path:
+    """A PDF of ``pages`` text-filled pages with a section outline."""
+    doc = fitz.open()
+    toc = []
+    for page_num in range(pages):
+        page = doc.new_page()
+        if page_num % 10 == 0:
+            title = f"Section {page_num // 10 + 1}: Coverage Terms"
+            toc.append([1, title, page_num + 1])
+            page.insert_text((72, 60), title, fontsize=14)
+        page.insert_textbox(fitz.Rect(72, 80, 540, 760), _PARAGRAPH * 12, fontsize=9)
+    doc.set_toc(toc)
+    doc.save(str(path))
+    doc.close()
+    return path
+
+
+def _run(processor: PDFProcessor, paths: List[Path], repeat: int):
+    times = []
+    results = None
+    for _ in range(repeat):
+        results, ms = timed(lambda: processor.extract_pages_many(paths))
+        times.append(ms)
+    return results, percentile(times, 50)
+
+
+def compare(name: str, paths: List[Path], workers: int, repeat: int) -> Dict[str, float]:
+    serial = PDFProcessor(workers=1)
+    parallel = PDFProcessor(workers=workers, min_parallel_pages=0)
+    try:
+        # Start the workers before timing, as a long-running server would have
+        serial.extract_pages_many(paths[:1])
+        parallel.extract_pages_many(paths[:1])
+        serial_results, serial_ms = _run(serial, paths, repeat)
+        parallel_results, parallel_ms = _run(parallel, paths, repeat)
+    finally:
+        serial.close()
+        parallel.close()
+    for before, after in zip(serial_results, parallel_results):
+        assert before["pages"] == after["pages"], "parallel extraction changed page text or order"
+        assert before["outline"] == after["outline"]
+
+    print(f"{name}: {len(paths)} PDFs, {sum(r['extraction']['pages'] for r in serial_results)} pages  "
+          f"serial {serial_ms:.1f} ms  parallel {parallel_ms:.1f} ms  "
+          f"speedup {serial_ms / parallel_ms:.2f}x ({workers} workers)")
+    for path, result in zip(paths, parallel_results):
+        report = result["extraction"]
+        print(f"  {path.name:<18} pages={report['pages']:<5} ranges={report['ranges']:<3} "
+              f"seconds={report['seconds']:<8} cpu={report['cpu_seconds']:<8} speedup={report['speedup']}x")
+    return {"serial_ms": serial_ms, "parallel_ms": parallel_ms}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=400, help="pages of the large PDF")
+    parser.add_argument("--small", type=int, default=12, help="small PDFs in the folder batch")
+    parser.add_argument("--small-pages", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="pdf-bench-") as tmp:
+        large = make_pdf(Path(tmp) / "large_policy.pdf", args.pages)
+        small = [make_pdf(Path(tmp) / f"policy_{i:02d}.pdf", args.small_pages) for i in range(args.small)]
+        compare("large PDF", [large], args.workers, args.repeat)
+        compare("folder", [large] + small, args.workers, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
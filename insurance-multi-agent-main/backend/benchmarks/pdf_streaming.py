@@ -0,0 +1,97 @@
+"""Peak memory of whole-document versus streamed PDF chunking.
+
+Usage (from the backend directory)::
+
+    python -m benchmarks.pdf_streaming [--pages 1000]
+
+Generates a synthetic policy PDF (1000 pages by default) and chunks it
+three ways, measuring peak Python heap with `tracemalloc`:
+
+* ``documents``: `pdf_to_langchain_documents(chunk_pages=False)` – one
+  string of the whole text – split by the chunker;
+* ``whole``: `DocumentChunker.parse` + `split`, the full page list and
+  joined text;
+* ``stream``: `parse_stream` + `split_stream`, pages extracted lazily.
+
+Each is measured keeping every chunk (as indexing does) and, for the
+stream, also discarding chunks as they come, which shows the working set
+the streaming path itself needs. The most text the stream's window held at
+once is reported too; it stays at a few pages whatever ``--pages`` is.
+Extraction runs on one sandbox worker process, outside the measurement;
+it holds one page range at a time.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Tuple
+
+from .pdf_extraction import make_pdf
+from app.workflow.chunking import DocumentChunker, markdown_sections
+from app.workflow.pdf_processor import PDFProcessor
+
+
+def _peak(run: Callable[[], object]) -> Tuple[object, float]:
+    """Result of ``run`` and the peak traced memory (MiB) while it ran."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak / 1024 ** 2
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=1000)
+    args = parser.parse_args()
+
+    processor = PDFProcessor(workers=1)
+    chunker = DocumentChunker.from_settings()
+
+    with tempfile.TemporaryDirectory(prefix="pdf-stream-") as tmp:
+        path = make_pdf(Path(tmp) / "large_policy.pdf", args.pages)
+        text_mb = len(processor.extract_text_from_pdf(path)) / 1024 ** 2
+
+        def documents():
+            document = processor.pdf_to_langchain_documents(path, chunk_pages=False)[0]
+            return chunker.split(document.page_content, markdown_sections(document.page_content),
+                                 document.metadata)
+
+        def whole():
+            return chunker.split(*chunker.parse(path, processor.extract_pages(path)))
+
+        window_peak = [0]
+
+        def stream(keep: bool):
+            pages = {**processor.extract_outline(path), "pages": processor.iter_pages(path)}
+            window, sections, metadata = chunker.parse_stream(path, pages)
+            chunks = []
+            for chunk in chunker.split_stream(window, sections, metadata):
+                window_peak[0] = max(window_peak[0], window.size)
+                if keep:
+                    chunks.append(chunk)
+            return chunks
+
+        whole_chunks, whole_mb = _peak(whole)
+        _, documents_mb = _peak(documents)
+        stream_chunks, stream_mb = _peak(lambda: stream(True))
+        _, discard_mb = _peak(lambda: stream(False))
+
+    assert [(c.page_content, c.metadata) for c in whole_chunks] == \
+        [(c.page_content, c.metadata) for c in stream_chunks], "streamed chunks differ"
+    print(f"{args.pages} pages, {text_mb:.1f} MiB of text, {len(stream_chunks)} chunks")
+    print(f"  documents (one string)   peak {documents_mb:7.1f} MiB")
+    print(f"  whole (pages + text)     peak {whole_mb:7.1f} MiB")
+    print(f"  stream, keeping chunks   peak {stream_mb:7.1f} MiB")
+    print(f"  stream, discarding       peak {discard_mb:7.1f} MiB  "
+          f"(window held at most {window_peak[0] / 1024:.1f} KiB of text)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Coverage questions answered by the facts lookup versus similarity search.
+
+Usage (from the backend directory)::
+
+    python -m benchmarks.policy_facts [--azure] [--repeat 20]
+
+For every bundled policy and every table (coverages, limits, deductibles,
+exclusions) it times `get_policy_facts` against the filtered batch search
+the policy checker would otherwise run, counts embedding requests, and
+checks how many of the policy's listed items each answer contains (the
+lookup returns all of them by construction; the search shows what it misses).
+"""
+from __future__ import annotations
+
+import argparse
+from typing import Dict, List
+
+from .common import build_search, make_embeddings, percentile, timed
+
+# What the policy checker searches for when it needs each table
+TABLE_QUERIES = {
+    "coverages": ["covered perils", "coverage"],
+    "limits": ["coverage limits", "limits per person per accident"],
+    "deductibles": ["deductible", "deductible options"],
+    "exclusions": ["exclusions", "what is not covered"],
+}
+
+
+def _items(facts: Dict, table: str) -> List[str]:
+    if table == "coverages":
+        return [detail for coverage in facts[table] for detail in coverage["details"]]
+    return [entry["text"] for entry in facts[table]]
+
+
+def run(repeat: int, use_azure: bool) -> Dict[str, Dict[str, float]]:
+    embeddings = make_embeddings(use_azure)
+    search = build_search(embeddings)
+    calls_before = getattr(embeddings, "calls", None)
+    stats = {name: {"ms": [], "found": [], "total": 0} for name in ("lookup", "search")}
+    embedding_requests = 0
+    for policy in search.list_policy_facts():
+        facts = search.get_policy_facts(policy["policy_type"])
+        for table, queries in TABLE_QUERIES.items():
+            items = _items(facts, table)
+            if not items:
+                continue
+            for attempt in range(repeat):
+                looked_up, ms = timed(lambda: search.get_policy_facts(policy["policy_type"]))
+                stats["lookup"]["ms"].append(ms)
+                # Fresh query wording each time, as an agent would phrase it
+                searched, ms = timed(lambda: search.search_policies_batch(
+                    [f"{query} {policy['policy_type']} {attempt}" for query in queries], k=5,
+                    score_threshold=0.0, filters={"policy_type": policy["policy_type"]}))
+                stats["search"]["ms"].append(ms)
+            text = "\n".join(r["content"] for r in searched)
+            stats["lookup"]["found"].append(sum(item in _items(looked_up, table) for item in items))
+            stats["search"]["found"].append(sum(item in text for item in items))
+            for name in stats:
+                stats[name]["total"] += len(items)
+    if calls_before is not None:
+        embedding_requests = embeddings.calls - calls_before
+    return {
+        name: {
+            "p50_ms": round(percentile(s["ms"], 50), 3),
+            "p99_ms": round(percentile(s["ms"], 99), 3),
+            "items_returned": f"{sum(s['found'])}/{s['total']}",
+            "embedding_requests": 0 if name == "lookup" else embedding_requests,
+        }
+        for name, s in stats.items()
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--azure", action="store_true", help="use Azure OpenAI embeddings")
+    args = parser.parse_args()
+
+    for name, row in run(args.repeat, args.azure).items():
+        print(f"{name:<8} " + "  ".join(f"{key}={value}" for key, value in row.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""Retrieval quality and latency suite for policy search, with baseline comparison.
+
+Usage (from the backend directory)::
+
+    python -m benchmarks.retrieval_suite [--k 5] [--repeat 5] [--builds 1] [--azure]
+                                         [--output PATH] [--baseline PATH] [--no-compare]
+                                         [--update-baseline] [--strict]
+
+Builds the policy index from ``app/workflow/data/policies`` and runs the
+labelled queries in ``policy_queries.json`` through every search mode. It
+reports recall@k and MRR (overall and per language/kind), p50/p95/p99
+search latency with warm query embeddings, index build time, index size on
+disk and process RSS. The deterministic hashing embedding is used unless
+``--azure`` is given, so runs are comparable across machines and need no
+API key. The bundled policies are English only, so Dutch retrieval is not
+measured (see ``benchmarks/README.md``).
+
+Results are written as JSON (default ``benchmarks/results/``) and compared
+with the stored baseline ``benchmarks/baselines/retrieval_suite.json``: a
+quality metric more than ``--quality-tolerance`` below the baseline fails
+the run (exit code 1). Latency, build time, size and memory more than
+``--perf-tolerance`` above the baseline are reported, and fail the run only
+with ``--strict`` – they depend on the machine. ``--update-baseline``
+stores this run as the new baseline.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from .common import BACKEND_DIR, first_relevant_rank, load_queries, make_embeddings, percentile, timed
+from app.core.config import get_settings
+from app.workflow.policy_search import SEARCH_MODES, PolicyVectorSearch
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+RESULTS_DIR = BENCHMARKS_DIR / "results"
+BASELINE_FILE = BENCHMARKS_DIR / "baselines" / "retrieval_suite.json"
+RESULTS_FORMAT = 1
+
+# Metric name suffixes and the direction that counts as better
+_HIGHER_IS_BETTER = ("recall@", "mrr")
+_LOWER_IS_BETTER = ("_ms", "seconds", "bytes", "rss_mb")
+
+
+# Measurements ---------------------------------------------------------
+def environment(search: PolicyVectorSearch) -> Dict[str, Any]:
+    """What the numbers depend on: code, embedding and index settings."""
+    settings = get_settings()
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "embeddings": type(search.embeddings).__name__,
+        "dim": search.vectorstore.dim,
+        "index_type": search.vectorstore.index_type,
+        "compression": search.vectorstore.compression,
+        "chunk_size": settings.policy_chunk_size,
+        "chunk_overlap": settings.policy_chunk_overlap,
+        "dedup_threshold": settings.policy_dedup_threshold,
+        "candidate_depth": settings.policy_search_candidate_depth,
+        "rrf_k": settings.policy_search_rrf_k,
+    }
+
+
+def index_bytes(search: PolicyVectorSearch) -> int:
+    """Bytes of the served version on disk: snapshot files and delta log."""
+    version_dir = search.store.version_dir(search.version)
+    return sum(path.stat().st_size for path in version_dir.rglob("*") if path.is_file())
+
+
+def memory() -> Dict[str, float]:
+    """Current and peak resident set size of this process in MiB."""
+    current_mb = None
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    current_mb = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    peak_mb = peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+    return {"rss_mb": round(current_mb if current_mb is not None else peak_mb, 1),
+            "peak_rss_mb": round(peak_mb, 1)}
+
+
+def build(embeddings, builds: int) -> Tuple[PolicyVectorSearch, Dict[str, Any]]:
+    """Build the index ``builds`` times from scratch; keep the last one."""
+    seconds: List[float] = []
+    search = None
+    for _ in range(builds):
+        search = PolicyVectorSearch(index_path=tempfile.mkdtemp(prefix="policy-suite-"),
+                                    embeddings=embeddings)
+        _, ms = timed(lambda: search.create_index(force_rebuild=True))
+        seconds.append(ms / 1000)
+    return search, {
+        "seconds": round(float(np.median(seconds)), 3),
+        "chunks": search.vectorstore.live_count,
+        "index_bytes": index_bytes(search),
+    }
+
+
+def _quality(ranks: List[int | None], k: int) -> Dict[str, float]:
+    return {
+        "queries": len(ranks),
+        f"recall@{k}": round(sum(1 for rank in ranks if rank) / len(ranks), 4),
+        "mrr": round(sum(1 / rank for rank in ranks if rank) / len(ranks), 4),
+    }
+
+
+def evaluate(search: PolicyVectorSearch, queries: List[Dict[str, Any]], k: int,
+             repeat: int) -> Dict[str, Any]:
+    """Quality and latency of each search mode over the labelled queries.
+
+    Each query expects one policy section, so recall@k is the share of
+    queries with that section in the top k. Latency is measured after one
+    warm-up pass, with query embeddings served from the cache.
+    """
+    report: Dict[str, Any] = {}
+    for mode in SEARCH_MODES:
+        ranks: List[int | None] = []
+        groups: Dict[str, List[int | None]] = {}
+        latencies: List[float] = []
+        for item in queries:
+            results = search.search_policies(item["query"], k=k, score_threshold=0.0, mode=mode)
+            rank = first_relevant_rank(results, item)
+            ranks.append(rank)
+            groups.setdefault(f"{item['language']}/{item['kind']}", []).append(rank)
+        for _ in range(repeat):
+            for item in queries:
+                _, ms = timed(lambda: search.search_policies(
+                    item["query"], k=k, score_threshold=0.0, mode=mode))
+                latencies.append(ms)
+        report[mode] = {
+            **_quality(ranks, k),
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+            "by_group": {group: _quality(group_ranks, k) for group, group_ranks in sorted(groups.items())},
+        }
+    return report
+
+
+def run(k: int, repeat: int, builds: int, use_azure: bool) -> Dict[str, Any]:
+    embeddings = make_embeddings(use_azure)
+    search, build_report = build(embeddings, builds)
+    queries = load_queries()
+    return {
+        "format": RESULTS_FORMAT,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "k": k,
+        "environment": environment(search),
+        "build": build_report,
+        "search": evaluate(search, queries, k, repeat),
+        "memory": memory(),
+    }
+
+
+# Baseline comparison -------------------------------------------------
+def _flatten(tree: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for key, value in tree.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            out.update(_flatten(value, f"{path}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            out[path] = float(value)
+    return out
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], quality_tolerance: float,
+            perf_tolerance: float) -> List[Dict[str, Any]]:
+    """One row per metric in both runs, flagged when worse than the tolerance."""
+    current = _flatten({key: results[key] for key in ("build", "search", "memory")})
+    previous = _flatten({key: baseline.get(key, {}) for key in ("build", "search", "memory")})
+    rows = []
+    for metric, before in previous.items():
+        after = current.get(metric)
+        if after is None:
+            continue
+        name = metric.rsplit(".", 1)[-1]
+        if name.startswith(_HIGHER_IS_BETTER):
+            kind, regressed = "quality", after < before - quality_tolerance
+        elif name.endswith(_LOWER_IS_BETTER):
+            kind, regressed = "performance", after > before * (1 + perf_tolerance) and after - before > 0.01
+        else:
+            continue
+        rows.append({"metric": metric, "kind": kind, "baseline": before, "current": after,
+                     "regressed": regressed})
+    return rows
+
+
+def _print_report(results: Dict[str, Any]) -> None:
+    k = results["k"]
+    build_report = results["build"]
+    print(f"build    {build_report['seconds']}s  {build_report['chunks']} chunks  "
+          f"{build_report['index_bytes'] / 1024:.1f} KiB  rss {results['memory']['rss_mb']} MiB "
+          f"(peak {results['memory']['peak_rss_mb']})")
+    columns = [f"recall@{k}", "mrr", "p50_ms", "p95_ms", "p99_ms"]
+    print(f"{'mode':<8}" + "".join(f"{column:>11}" for column in columns))
+    for mode, row in results["search"].items():
+        print(f"{mode:<8}" + "".join(f"{row[column]:>11}" for column in columns))
+        for group, quality in row["by_group"].items():
+            print(f"  {group:<14}{quality[f'recall@{k}']:>7}{quality['mrr']:>11}   ({quality['queries']} queries)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5, help="timed passes over the query set")
+    parser.add_argument("--builds", type=int, default=1, help="index builds; the median time is reported")
+    parser.add_argument("--azure", action="store_true", help="use Azure OpenAI embeddings")
+    parser.add_argument("--output", type=Path, default=None, help="results JSON path")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--no-compare", action="store_true", help="skip the baseline comparison")
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--quality-tolerance", type=float, default=0.02,
+                        help="allowed absolute drop in recall@k / MRR")
+    parser.add_argument("--perf-tolerance", type=float, default=0.5,
+                        help="allowed relative increase in latency, build time, size and RSS")
+    parser.add_argument("--strict", action="store_true", help="fail on performance regressions too")
+    args = parser.parse_args()
+
+    results = run(args.k, args.repeat, args.builds, args.azure)
+    _print_report(results)
+
+    output = args.output or RESULTS_DIR / f"retrieval_suite-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    print(f"results  {output}")
+
+    failed = False
+    if not args.no_compare and args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if baseline.get("k") != results["k"] or \
+                baseline["environment"].get("embeddings") != results["environment"]["embeddings"]:
+            print("baseline uses a different k or embedding – comparison skipped")
+        else:
+            rows = compare(results, baseline, args.quality_tolerance, args.perf_tolerance)
+            regressions = [row for row in rows if row["regressed"]]
+            print(f"baseline {args.baseline} ({baseline['environment'].get('commit')}, "
+                  f"{baseline['created']}): {len(rows)} metrics, {len(regressions)} worse")
+            for row in regressions:
+                print(f"  WORSE {row['kind']:<11} {row['metric']:<40} "
+                      f"{row['baseline']:>10g} -> {row['current']:g}")
+            failed = any(row["kind"] == "quality" or args.strict for row in regressions)
+    elif not args.no_compare:
+        print(f"no baseline at {args.baseline} – run with --update-baseline to store one")
+
+    if args.update_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+        print(f"baseline updated: {args.baseline}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Concurrent adds, deletes, compactions and searches keep the index consistent.
+
+A bounded version of ``benchmarks/concurrency_stress.py``: a few threads for
+a few seconds over the bundled policies, with the hashing embedding.
+"""
+from __future__ import annotations
+
+import random
+import shutil
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from benchmarks.common import HashingEmbeddings
+from app.workflow.policy_search import PolicyVectorSearch
+
+SECONDS = 3.0
+DOCUMENTS = [f"upload-{n}" for n in range(3)]
+QUERIES = ["theft of motorcycle", "windscreen damage", "liability limits for commercial vehicles"]
+
+
+def _documents_of(result: Dict) -> set:
+    return {result["document_id"], *(s["document_id"] for s in result.get("sources", []))}
+
+
+def test_concurrent_writes_never_serve_removed_chunks(tmp_path):
+    search = PolicyVectorSearch(index_path=tmp_path / "index", embeddings=HashingEmbeddings())
+    search.create_index()
+    policies = sorted(search.policies_dir.glob("*.md"))
+
+    errors: List[str] = []
+    # Per document: (indexed after its last operation, operation in progress, operations started)
+    state: Dict[str, Tuple[bool, bool, int]] = {document_id: (False, False, 0) for document_id in DOCUMENTS}
+    locks = {document_id: threading.Lock() for document_id in DOCUMENTS}
+    state_lock = threading.Lock()
+    stop = threading.Event()
+
+    def searcher(seed: int) -> None:
+        rng = random.Random(seed)
+        while not stop.is_set():
+            with state_lock:
+                before = dict(state)
+            try:
+                results = search.search_policies(
+                    rng.choice(QUERIES), k=5, score_threshold=0.0,
+                    mode=rng.choice(["dense", "lexical", "hybrid"]),
+                    filters=rng.choice([None, {"category": "uploaded"}]))
+            except Exception as e:
+                errors.append(f"search: {e!r}")
+                continue
+            with state_lock:
+                after = dict(state)
+            for result in results:
+                if not result.get("chunk_id") or not result.get("content"):
+                    errors.append("result without its chunk")
+                for document_id in _documents_of(result) & set(DOCUMENTS):
+                    indexed, busy, _ = before[document_id]
+                    # Not indexed before the search started and untouched since
+                    if not indexed and not busy and after[document_id] == before[document_id]:
+                        errors.append(f"search returned unindexed document {document_id}")
+
+    def writer(seed: int) -> None:
+        rng = random.Random(seed)
+        while not stop.is_set():
+            document_id = rng.choice(DOCUMENTS)
+            with locks[document_id]:
+                with state_lock:
+                    indexed, _, operations = state[document_id]
+                    # An add is visible to searches before it returns
+                    state[document_id] = (indexed, True, operations + 1)
+                try:
+                    if rng.random() < 0.6:
+                        path = tmp_path / f"{document_id}-{seed}.md"
+                        shutil.copy(rng.choice(policies), path)
+                        indexed = search.add_document_to_index(
+                            path, document_id=document_id, metadata={"category": "uploaded"})
+                        if not indexed:
+                            errors.append(f"add {document_id} returned False")
+                    else:
+                        search.delete_document_from_index(document_id)
+                        indexed = False
+                except Exception as e:
+                    errors.append(f"write {document_id}: {e!r}")
+                    indexed = search.is_document_indexed(document_id)
+                with state_lock:
+                    state[document_id] = (indexed, False, operations + 1)
+
+    def compactor() -> None:
+        while not stop.wait(0.5):
+            try:
+                search.compact_index()
+            except Exception as e:
+                errors.append(f"compaction: {e!r}")
+
+    threads = [threading.Thread(target=searcher, args=(n,)) for n in range(3)]
+    threads += [threading.Thread(target=writer, args=(100 + n,)) for n in range(2)]
+    threads.append(threading.Thread(target=compactor))
+    for thread in threads:
+        thread.start()
+    time.sleep(SECONDS)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    if search._compaction_thread:
+        search._compaction_thread.join()
+
+    assert errors == []
+    assert all(operations for _, _, operations in state.values())
+    for document_id, (indexed, _, _) in state.items():
+        assert search.is_document_indexed(document_id) == indexed, document_id
+    # Every result of the settled index is a live chunk
+    index = search.vectorstore
+    for query in QUERIES:
+        for result in search.search_policies(query, k=10, score_threshold=0.0):
+            assert index.positions_of([result["chunk_id"]]), result["chunk_id"]
+    # A service opened now sees the same index
+    reopened = PolicyVectorSearch(index_path=tmp_path / "index", embeddings=HashingEmbeddings())
+    reopened.create_index()
+    assert reopened.vectorstore.live_count == index.live_count
@@ -0,0 +1,62 @@
+"""Delta segments of `PolicyIndex`: merging on append and compaction marks."""
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from app.workflow.ann_index import AnnIndexConfig, build_index
+from app.workflow.index_snapshot import IndexSnapshot, write_snapshot
+from app.workflow.policy_index import SEGMENT_MERGE_MIN, PolicyIndex
+
+DIM = 8
+
+
+def _chunks(start: int, count: int):
+    ids = [f"chunk-{i}" for i in range(start, start + count)]
+    texts = [f"clause {i}" for i in range(start, start + count)]
+    metadatas = [{"document_id": f"doc-{i}"} for i in range(start, start + count)]
+    vectors = np.random.default_rng(start).standard_normal((count, DIM)).astype(np.float32)
+    return ids, texts, metadatas, vectors
+
+
+@pytest.fixture
+def index(tmp_path):
+    config = AnnIndexConfig(index_type="flat")
+    ids, texts, metadatas, vectors = _chunks(0, 10)
+    write_snapshot(tmp_path, build_index(config, vectors), ids, texts, metadatas, vectors)
+    snapshot = IndexSnapshot(tmp_path, config)
+    yield PolicyIndex(snapshot, config)
+    snapshot.close()
+
+
+def test_small_changes_share_a_segment(index):
+    for start in range(10, 10 + 3 * SEGMENT_MERGE_MIN, 2):
+        index = index.with_changes(*_chunks(start, 2))
+    assert index.size == 10 + 3 * SEGMENT_MERGE_MIN
+    assert len(index.segments) <= 3
+    assert index.positions_of(["chunk-10"]) == {"chunk-10": 10}
+    # Replaying a change adds nothing
+    assert index.with_changes(*_chunks(10, 2)).size == index.size
+
+
+def test_segments_stay_logarithmic(index):
+    for start in range(10, 10 + 64 * SEGMENT_MERGE_MIN, SEGMENT_MERGE_MIN):
+        index = index.with_changes(*_chunks(start, SEGMENT_MERGE_MIN))
+    assert len(index.segments) <= 7
+
+
+def test_changes_since_survive_merges(index):
+    index = index.with_changes(*_chunks(10, 5))
+    mark = index.mark()
+    index = index.with_changes(*_chunks(15, 5), deleted=["chunk-3", "chunk-12"])
+    # The new chunks were merged into the segment that existed at the mark
+    assert len(index.segments) == 1
+
+    ids, texts, metadatas, vectors, deleted = index.changes_since(mark)
+    assert ids == [f"chunk-{i}" for i in range(15, 20)]
+    assert texts[0] == "clause 15" and len(metadatas) == 5
+    assert np.array_equal(vectors, _chunks(15, 5)[3])
+    assert deleted == ["chunk-3", "chunk-12"]
+
+    live = [chunk_id for batch in index.iter_live(mark) for chunk_id in batch[0]]
+    assert live == [f"chunk-{i}" for i in range(15)]
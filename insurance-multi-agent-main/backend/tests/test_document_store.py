@@ -0,0 +1,147 @@
+"""SQLite document store: schema upgrades, keyset pages and document counts."""
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services import document_store
+from app.services.document_store import SORT_COLUMNS, DocumentStore, _MIGRATIONS
+
+NAMES = ["beta.pdf", "Alpha.pdf", "alpha-2.md", "gamma.pdf", "Beta-notes.md", "delta.pdf", "alpha.pdf"]
+
+
+def _docs():
+    start = datetime(2024, 1, 1)
+    # Equal sizes and upload dates, so pages must break ties by id
+    return [{"id": f"doc-{n}", "filename": name, "original_filename": name,
+             "category": "policy" if n % 2 else "claim", "size": 100 * (n % 3),
+             "upload_date": start + timedelta(hours=n // 2), "indexed": n % 3 == 0}
+            for n, name in enumerate(NAMES)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = DocumentStore(tmp_path / "documents.sqlite", None, tmp_path / "blobs")
+    store.put_many(_docs())
+    return store
+
+
+def _walk(store: DocumentStore, **kwargs) -> list:
+    ids, cursor = [], None
+    while True:
+        docs, cursor = store.page(limit=3, cursor=cursor, **kwargs)
+        ids += [doc["id"] for doc in docs]
+        if cursor is None:
+            return ids
+
+
+def test_upgrade_from_first_schema(tmp_path):
+    path = tmp_path / "documents.sqlite"
+    db = sqlite3.connect(str(path))
+    for statement in _MIGRATIONS[0]:
+        db.execute(statement)
+    db.executemany(
+        "INSERT INTO documents (id, filename, original_filename, category, size, content_type, "
+        "upload_date, indexed) VALUES (?, ?, ?, ?, 1, 'application/pdf', ?, ?)",
+        [("a", "a.pdf", "Zeta.pdf", "policy", "2024-01-01T00:00:00", 1),
+         ("b", "b.pdf", "eta.pdf", "policy", "2024-01-02T00:00:00", 0)])
+    db.execute("PRAGMA user_version = 1")
+    db.commit()
+    db.close()
+
+    store = DocumentStore(path, None, tmp_path / "blobs")
+    assert store._db.execute("PRAGMA user_version").fetchone()[0] == len(_MIGRATIONS)
+    # Rows from before each migration get the later columns filled in
+    docs, _ = store.page(sort="original_filename", descending=False)
+    assert [doc["id"] for doc in docs] == ["b", "a"]
+    assert store.count("policy") == 2 and store.count(indexed=True) == 1
+    assert [store.get(i)["ingest_status"] for i in ("a", "b")] == ["indexed", None]
+    # Opening an up-to-date store again changes nothing
+    DocumentStore(path, None, tmp_path / "blobs")
+    assert store.count() == 2
+
+
+@pytest.mark.parametrize("sort", list(SORT_COLUMNS))
+@pytest.mark.parametrize("descending", [True, False])
+def test_pages_walk_the_whole_order(store, sort, descending):
+    key = {"upload_date": lambda d: d["upload_date"], "size": lambda d: d["size"],
+           "original_filename": lambda d: d["original_filename"].lower()}[sort]
+    expected = [d["id"] for d in sorted(_docs(), key=lambda d: (key(d), d["id"]), reverse=descending)]
+    assert _walk(store, sort=sort, descending=descending) == expected
+
+
+def test_filtered_and_prefix_pages(store, monkeypatch):
+    docs = _docs()
+    assert _walk(store, category="policy") == [
+        d["id"] for d in sorted(docs, key=lambda d: (d["upload_date"], d["id"]), reverse=True)
+        if d["category"] == "policy"]
+    expected = ["doc-2", "doc-1", "doc-6"]
+    assert _walk(store, prefix="ALPHA", sort="original_filename", descending=False) == expected
+    # Many matches are filtered while walking the sort index instead
+    monkeypatch.setattr(document_store, "_PREFIX_SORT_LIMIT", 0)
+    assert _walk(store, prefix="alpha", sort="size") == ["doc-2", "doc-1", "doc-6"]
+
+
+def test_cursor_belongs_to_its_sort(store):
+    _, cursor = store.page(sort="size", limit=2)
+    with pytest.raises(ValueError):
+        store.page(sort="upload_date", limit=2, cursor=cursor)
+    with pytest.raises(ValueError):
+        store.page(sort="size", descending=False, limit=2, cursor=cursor)
+    with pytest.raises(ValueError):
+        store.page(cursor="not-a-cursor")
+
+
+def test_counts_follow_every_write(store):
+    def check():
+        docs = store.list()
+        for category in (None, "policy", "claim"):
+            for indexed in (None, True, False):
+                assert store.count(category, indexed) == sum(
+                    (category is None or d["category"] == category)
+                    and (indexed is None or d["indexed"] == indexed) for d in docs)
+
+    check()
+    store.update("doc-1", indexed=True)
+    store.set_indexed(["doc-0", "doc-2"], False)
+    check()
+    # An upsert that moves a document to another category
+    store.put({**_docs()[3], "category": "policy", "indexed": False})
+    check()
+    store.delete("doc-4")
+    store.set_indexed(None, True)
+    check()
+    assert store.count(indexed=False) == 0
+
+
+def _upload(store: DocumentStore, doc_id: str, content: bytes) -> bool:
+    incoming = store.incoming_path(".pdf")
+    incoming.write_bytes(content)
+    blob = store.blob_name(hashlib.sha256(content).hexdigest(), ".pdf")
+    doc = {"id": doc_id, "filename": f"{doc_id}.pdf", "upload_date": datetime(2024, 1, 1), "blob": blob}
+    return store.add([(doc, incoming)])[0]
+
+
+def test_shared_blob_outlives_one_of_its_documents(tmp_path):
+    store = DocumentStore(tmp_path / "documents.sqlite", None, tmp_path / "blobs")
+    assert _upload(store, "first", b"%PDF same") is False
+    assert _upload(store, "second", b"%PDF same") is True
+    _upload(store, "other", b"%PDF other")
+    blob = store.get("first")["blob"]
+    assert store.blob_refs(blob) == 2
+    # The copy's upload was dropped in favour of the stored blob
+    assert list((tmp_path / "blobs" / "incoming").iterdir()) == []
+
+    store.delete("first")
+    assert store.blob_refs(blob) == 1
+    assert store.blob_path(blob).read_bytes() == b"%PDF same"
+    assert store.get("second")["blob"] == blob
+
+    # The last reference takes the file with it; other blobs stay
+    store.delete("second")
+    assert store.blob_refs(blob) == 0
+    assert not store.blob_path(blob).exists()
+    assert store.blob_path(store.get("other")["blob"]).exists()
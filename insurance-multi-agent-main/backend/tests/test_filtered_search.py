@@ -0,0 +1,60 @@
+"""Filtered dense search over approximate (HNSW / IVF) snapshots."""
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from app.workflow import policy_index
+from app.workflow.ann_index import AnnIndexConfig, build_index
+from app.workflow.index_snapshot import IndexSnapshot, write_snapshot
+from app.workflow.policy_index import PolicyIndex
+
+NUM_VECTORS = 20_000
+DIM = 32
+K = 5
+
+
+def _vectors(n: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((100, DIM)).astype(np.float32)
+    vectors = centres[rng.integers(0, 100, n)] + 0.5 * rng.standard_normal((n, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture(scope="module", params=["hnsw", "ivf_flat"])
+def index(request, tmp_path_factory):
+    config = AnnIndexConfig(index_type=request.param)
+    vectors = _vectors(NUM_VECTORS, seed=0)
+    directory = tmp_path_factory.mktemp(request.param)
+    write_snapshot(directory, build_index(config, vectors, request.param, "none"),
+                   [f"chunk-{i}" for i in range(NUM_VECTORS)],
+                   [f"chunk {i}" for i in range(NUM_VECTORS)],
+                   [{"document_id": f"doc-{i % 100}"} for i in range(NUM_VECTORS)], vectors)
+    snapshot = IndexSnapshot(directory, config)
+    yield PolicyIndex(snapshot, config), vectors
+    snapshot.close()
+
+
+def _recall(index: PolicyIndex, vectors: np.ndarray, allowed_count: int) -> float:
+    rng = np.random.default_rng(1)
+    allowed = {int(p) for p in rng.choice(NUM_VECTORS, allowed_count, replace=False)}
+    queries = _vectors(20, seed=2)
+    candidates = np.array(sorted(allowed))
+    found = 0
+    for query, hits in zip(queries, index.dense_search(queries, K, allowed)):
+        assert all(position in allowed for position, _ in hits)
+        distances = ((vectors[candidates] - query) ** 2).sum(axis=1)
+        truth = set(candidates[np.argsort(distances)[:K]].tolist())
+        found += len(truth & {position for position, _ in hits})
+    return found / (len(queries) * K)
+
+
+@pytest.mark.parametrize("allowed_count", [50, 1000])
+def test_small_filter_is_scored_exactly(index, allowed_count):
+    assert _recall(*index, allowed_count) == 1.0
+
+
+@pytest.mark.parametrize("allowed_count", [200, 2000])
+def test_selective_filter_widens_the_search(index, allowed_count, monkeypatch):
+    monkeypatch.setattr(policy_index, "EXACT_FILTER_MAX", 0)
+    assert _recall(*index, allowed_count) >= 0.9
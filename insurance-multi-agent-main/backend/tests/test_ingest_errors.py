@@ -0,0 +1,68 @@
+"""Queued uploads record why a PDF was rejected, as validating it on upload does."""
+from __future__ import annotations
+
+from datetime import datetime
+
+import pytest
+
+from benchmarks.common import HashingEmbeddings
+from app.api.v1.endpoints import documents
+from app.services import document_store
+from app.services.document_store import DocumentStore
+from app.workflow import chunking
+from app.workflow.pdf_processor import PDFProcessor
+from app.workflow.policy_search import PolicyVectorSearch
+
+
+@pytest.fixture(scope="module")
+def search(tmp_path_factory):
+    search = PolicyVectorSearch(index_path=tmp_path_factory.mktemp("index"), embeddings=HashingEmbeddings())
+    search.create_index()
+    return search
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    processor = PDFProcessor(workers=1)
+    monkeypatch.setattr(documents, "get_pdf_processor", lambda: processor)
+    monkeypatch.setattr(chunking, "get_pdf_processor", lambda: processor)
+    yield processor
+    processor.close()
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch, search):
+    store = DocumentStore(tmp_path / "documents.sqlite", None, tmp_path / "blobs")
+    monkeypatch.setattr(document_store, "_document_store_singleton", store)
+    monkeypatch.setattr(documents, "get_policy_search", lambda: search)
+    return store
+
+
+def _ingest(store: DocumentStore, content: bytes) -> dict:
+    blob = store.blob_name("ab" * 32, ".pdf")
+    store.blob_path(blob).parent.mkdir(parents=True)
+    store.blob_path(blob).write_bytes(content)
+    store.put({"id": "upload", "filename": "bad.pdf", "upload_date": datetime(2024, 1, 1),
+               "blob": blob, "ingest_status": "queued"})
+    documents.ingest_documents(store.claim_queued(1))
+    return store.get("upload")
+
+
+def test_malformed_pdf_keeps_the_sandbox_reason(store, processor):
+    content = b"%PDF-1.4\nnot a PDF after all\n%%EOF"
+    doc = _ingest(store, content)
+    assert doc["ingest_status"] == "failed"
+    error = doc["metadata"]["ingest_error"]
+    assert error["reason"] == "invalid"
+    # What validating the file on upload reports
+    assert {"reason": error["reason"], "detail": error["detail"]} == processor.validate(
+        store.blob_path(doc["blob"]))
+
+
+def test_pdf_without_pages_is_reported_empty(store, processor, monkeypatch):
+    # A failure validation reports itself rather than the sandbox raising it
+    monkeypatch.setattr(processor, "_open_info", lambda path: {"page_count": 0, "outline": [], "metadata": {}})
+    doc = _ingest(store, b"%PDF-1.4\n%%EOF")
+    assert doc["ingest_status"] == "failed"
+    assert doc["metadata"]["ingest_error"]["reason"] == "empty"
+    assert processor.failure(store.blob_path(doc["blob"]))["reason"] == "empty"
@@ -0,0 +1,112 @@
+"""Background ingest queue over the document store."""
+from __future__ import annotations
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.document_store import DocumentStore
+from app.services.ingest_queue import IngestQueue
+
+
+def _queued(store: DocumentStore, count: int) -> list:
+    start = datetime(2024, 1, 1)
+    ids = [f"doc-{n}" for n in range(count)]
+    store.put_many([{"id": doc_id, "filename": f"{doc_id}.md", "upload_date": start + timedelta(minutes=n),
+                     "ingest_status": "queued"} for n, doc_id in enumerate(ids)])
+    return ids
+
+
+def _wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return DocumentStore(tmp_path / "documents.sqlite", None, tmp_path / "blobs")
+
+
+def test_batch_failing_partway_keeps_recorded_outcomes(store):
+    ids = _queued(store, 3)
+
+    def process(docs):
+        store.update(docs[0]["id"], indexed=True, ingest_status="indexed")
+        raise RuntimeError("embedding service unavailable")
+
+    queue = IngestQueue(store, process, batch_size=3, batch_wait=0)
+    queue.start()
+    try:
+        _wait_for(lambda: all(store.get(i)["ingest_status"] in ("indexed", "failed") for i in ids))
+    finally:
+        queue.stop(5)
+    assert [store.get(i)["ingest_status"] for i in ids] == ["indexed", "failed", "failed"]
+    assert store.get(ids[0])["indexed"]
+
+
+def _status(store: DocumentStore, ids) -> list:
+    return [store.get(i)["ingest_status"] for i in ids]
+
+
+def test_claims_are_oldest_first_and_exclusive(store, tmp_path):
+    ids = _queued(store, 5)
+    # A second connection, as another API worker process would have
+    other = DocumentStore(tmp_path / "documents.sqlite", None, tmp_path / "blobs")
+    first = store.claim_queued(2, "worker-a")
+    assert [doc["id"] for doc in first] == ids[:2]
+    assert all(doc["ingest_status"] == "extracting" for doc in first)
+    assert [doc["id"] for doc in other.claim_queued(10, "worker-b")] == ids[2:]
+    assert store.claim_queued(10, "worker-a") == []
+    assert _status(store, ids) == ["extracting"] * 5
+
+
+def test_only_lapsed_leases_are_requeued(store):
+    ids = _queued(store, 4)
+    store.claim_queued(2, "alive", lease=60)
+    store.claim_queued(1, "gone", lease=0.3)
+    # Claimed before leases existed: no owner, no lease
+    store._db.execute("UPDATE documents SET ingest_status = 'embedding' WHERE id = ?", (ids[3],))
+    assert store.requeue_interrupted() == 1
+    assert _status(store, ids) == ["extracting", "extracting", "extracting", "queued"]
+
+    time.sleep(0.4)
+    assert store.requeue_interrupted() == 1
+    assert _status(store, ids) == ["extracting", "extracting", "queued", "queued"]
+    assert store._db.execute("SELECT ingest_owner, ingest_lease FROM documents WHERE id = ?",
+                             (ids[2],)).fetchone() == (None, None)
+    # Requeued documents are claimed again, oldest first
+    assert [doc["id"] for doc in store.claim_queued(5, "alive")] == ids[2:]
+
+
+def test_renewal_keeps_claims_alive(store):
+    ids = _queued(store, 3)
+    store.claim_queued(3, "worker", lease=0.2)
+    store.update(ids[0], indexed=True, ingest_status="indexed")
+    # Finished documents are no longer renewed
+    assert store.renew_leases("worker", 60) == 2
+    assert store.renew_leases("someone-else", 60) == 0
+    time.sleep(0.3)
+    assert store.requeue_interrupted() == 0
+    assert _status(store, ids) == ["indexed", "extracting", "extracting"]
+
+
+def test_queue_takes_over_claims_of_a_vanished_worker(store):
+    ids = _queued(store, 3)
+    store.claim_queued(2, "vanished", lease=0.5)
+    store.claim_queued(1, "alive", lease=60)
+
+    def process(docs):
+        for doc in docs:
+            store.update(doc["id"], indexed=True, ingest_status="indexed")
+
+    # Started while the lapsing lease still holds; its heartbeat requeues them
+    queue = IngestQueue(store, process, batch_wait=0, lease=0.3)
+    queue.start()
+    try:
+        _wait_for(lambda: _status(store, ids[:2]) == ["indexed", "indexed"])
+    finally:
+        queue.stop(5)
+    assert _status(store, ids) == ["indexed", "indexed", "extracting"]
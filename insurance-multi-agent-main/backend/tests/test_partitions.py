@@ -0,0 +1,65 @@
+"""Metadata filters over deduplicated chunks, in the snapshot and in segments."""
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from app.workflow.ann_index import AnnIndexConfig, build_index
+from app.workflow.index_snapshot import IndexSnapshot, write_snapshot
+from app.workflow.policy_index import PolicyIndex
+
+DIM = 8
+
+# A clause shared by a bundled auto policy and an uploaded home policy
+SHARED = {"document_id": "auto", "policy_type": "Auto", "category": "policy", "language": "en",
+          "sources": [{"document_id": "auto", "policy_type": "Auto", "category": "policy", "language": "en"},
+                      {"document_id": "home", "policy_type": "Home", "category": "uploaded",
+                       "language": "en"}]}
+ALONE = {"document_id": "home", "policy_type": "Home", "category": "uploaded", "language": "en"}
+
+
+def _chunks(start: int):
+    ids = [f"chunk-{start}", f"chunk-{start + 1}"]
+    vectors = np.random.default_rng(start).standard_normal((2, DIM)).astype(np.float32)
+    return ids, ["shared clause", "home clause"], [SHARED, ALONE], vectors
+
+
+def _index(tmp_path, ids, texts, metadatas, vectors) -> PolicyIndex:
+    config = AnnIndexConfig(index_type="flat")
+    write_snapshot(tmp_path, build_index(config, vectors), ids, texts, metadatas, vectors)
+    return PolicyIndex(IndexSnapshot(tmp_path, config), config)
+
+
+@pytest.fixture(params=["snapshot", "segment"])
+def index(request, tmp_path):
+    """The chunks, and their ids, in the snapshot or in a delta segment."""
+    if request.param == "snapshot":
+        index = _index(tmp_path, *_chunks(0))
+        yield index, "chunk-0", "chunk-1"
+    else:
+        ids, texts, _, vectors = _chunks(0)
+        index = _index(tmp_path, ids, texts, [{"document_id": "other", "policy_type": "Travel"}] * 2, vectors)
+        yield index.with_changes(*_chunks(2)), "chunk-2", "chunk-3"
+    index.close()
+
+
+def _matching(index: PolicyIndex, filters) -> set:
+    return set(index.chunk_ids(sorted(index.resolve(filters))).values())
+
+
+def test_every_filter_must_match_the_same_occurrence(index):
+    index, shared, alone = index
+    assert _matching(index, {"policy_type": "Home", "category": "uploaded"}) == {shared, alone}
+    assert _matching(index, {"policy_type": "Auto", "category": "policy"}) == {shared}
+    # Auto only occurs as a bundled policy, the upload is a home policy
+    assert _matching(index, {"policy_type": "Auto", "category": "uploaded"}) == set()
+    assert _matching(index, {"policy_type": ["Auto", "Travel"], "category": "Uploaded"}) == set()
+    assert shared in _matching(index, {"category": "policy"})
+
+
+def test_partition_sizes_count_chunks(tmp_path):
+    index = _index(tmp_path, *_chunks(0))
+    sizes = index.partition_sizes()
+    assert sizes["category"] == {"policy": 1, "uploaded": 2}
+    assert sizes["language"] == {"en": 2}
+    index.close()
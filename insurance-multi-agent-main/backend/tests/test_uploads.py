@@ -0,0 +1,90 @@
+"""Streaming multipart uploads: limits (413) and cleanup of partial files."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.services import uploads
+from app.services.uploads import UploadLimits, receive_uploads
+
+BOUNDARY = "test-boundary"
+LIMITS = UploadLimits(max_file_bytes=5000, max_request_bytes=12000, max_files=2)
+
+
+def _body(*files) -> bytes:
+    parts = [f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"note\"\r\n\r\nignored\r\n".encode()]
+    for filename, content in files:
+        parts.append(f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"files\"; "
+                     f"filename=\"{filename}\"\r\nContent-Type: application/octet-stream\r\n\r\n".encode()
+                     + content + b"\r\n")
+    return b"".join(parts) + f"--{BOUNDARY}--\r\n".encode()
+
+
+@pytest.fixture
+def receive(tmp_path, monkeypatch):
+    """Receive a body arriving in 1000-byte chunks; files go to ``tmp_path``."""
+    # Write as data arrives, so a refused request has files half written
+    monkeypatch.setattr(uploads, "_FLUSH_BYTES", 100)
+    targets = []
+
+    def target(filename):
+        targets.append(filename)
+        return tmp_path / f"{len(targets)}-{filename}"
+
+    def run(body: bytes, declare_length: bool = False):
+        headers = [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())]
+        if declare_length:
+            headers.append((b"content-length", str(len(body)).encode()))
+        chunks = [body[start:start + 1000] for start in range(0, len(body), 1000)]
+
+        async def receive_message():
+            chunk = chunks.pop(0)
+            return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+
+        request = Request({"type": "http", "method": "POST", "headers": headers}, receive_message)
+        return asyncio.run(receive_uploads(request, target, limits=LIMITS))
+
+    run.targets = targets
+    return run
+
+
+def test_files_are_written_hashed_and_sniffed(receive):
+    pdf, text = b"%PDF-1.7 " + b"x" * 3000, b"# Policy\n" * 100
+    a, b = receive(_body(("a.pdf", pdf), ("b.md", text)))
+    assert (a.size, a.sha256, a.content_type) == (len(pdf), hashlib.sha256(pdf).hexdigest(), "application/pdf")
+    assert b.content_type == "text/markdown"
+    assert a.path.read_bytes() == pdf and b.path.read_bytes() == text
+
+
+@pytest.mark.parametrize("files", [
+    [("a.pdf", b"a" * 4000), ("b.pdf", b"b" * 6000)],                          # a file over its limit
+    [("a.pdf", b"a" * 4900), ("b.pdf", b"b" * 4900), ("c.pdf", b"c" * 4900)],  # the request over its limit
+    [("a.pdf", b"a" * 900), ("b.pdf", b"b" * 900), ("c.pdf", b"c" * 900)],     # too many files
+])
+def test_limits_refuse_and_remove_partial_files(receive, tmp_path, files):
+    with pytest.raises(HTTPException) as refused:
+        receive(_body(*files))
+    assert refused.value.status_code == 413
+    # Files were written before the limit was reached, and are gone again
+    assert receive.targets[:2] == ["a.pdf", "b.pdf"]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_declared_length_over_limit_is_refused_before_reading(receive, tmp_path):
+    with pytest.raises(HTTPException) as refused:
+        receive(_body(("a.pdf", b"a" * 4000), ("b.pdf", b"b" * 4000), ("c.pdf", b"c" * 4000)),
+                declare_length=True)
+    assert refused.value.status_code == 413
+    assert receive.targets == []
+
+
+def test_truncated_body_removes_partial_files(receive, tmp_path):
+    with pytest.raises(HTTPException) as refused:
+        receive(_body(("a.pdf", b"a" * 3000))[:2000])
+    assert refused.value.status_code == 400
+    assert receive.targets == ["a.pdf"]
+    assert list(tmp_path.iterdir()) == []
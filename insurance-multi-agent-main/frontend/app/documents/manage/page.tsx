@@ -23,7 +23,9 @@ import {
   Search,
   RefreshCw,
   CheckCircle,
-  Clock
+  Clock,
+  Loader2,
+  AlertCircle
 } from 'lucide-react'
 import {
   Select,
@@ -55,13 +57,25 @@ interface DocumentMetadata {
   upload_date: string
   indexed: boolean
   metadata: Record<string, unknown>
+  ingest_status: 'queued' | 'extracting' | 'embedding' | 'indexed' | 'failed' | 'cancelled' | null
 }
 
 interface DocumentListResponse {
   documents: DocumentMetadata[]
   total: number
+  next_cursor: string | null
 }
 
+const PAGE_SIZE = 50
+
+// Background ingest states still in progress, and how they are shown
+const INGEST_LABELS: Record<string, string> = {
+  queued: 'Queued',
+  extracting: 'Extracting',
+  embedding: 'Embedding',
+}
+const INGEST_POLL_MS = 3000
+
 interface DocumentUploadResponse {
   success: boolean
   documents: DocumentMetadata[]
@@ -70,26 +84,48 @@ interface DocumentUploadResponse {
 
 export default function DocumentManagePage() {
   const [documents, setDocuments] = useState<DocumentMetadata[]>([])
+  const [total, setTotal] = useState(0)
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
   const [isLoading, setIsLoading] = useState(true)
+  const [isLoadingMore, setIsLoadingMore] = useState(false)
   const [isUploading, setIsUploading] = useState(false)
   const [searchTerm, setSearchTerm] = useState('')
+  const [debouncedSearch, setDebouncedSearch] = useState('')
   const [categoryFilter, setCategoryFilter] = useState<string>('all')
   const [indexedFilter, setIndexedFilter] = useState<string>('all')
   const [uploadFiles, setUploadFiles] = useState<File[]>([])
   const [uploadCategory, setUploadCategory] = useState<string>('policy')
 
-  // Fetch documents
-  const fetchDocuments = useCallback(async () => {
+  // Search as the user pauses typing, not on every keystroke
+  useEffect(() => {
+    const timer = setTimeout(() => setDebouncedSearch(searchTerm.trim()), 300)
+    return () => clearTimeout(timer)
+  }, [searchTerm])
+
+  // Fetch documents: the first page, or the page after `cursor`.
+  // Filtering, search and sorting happen on the server.
+  const fetchDocuments = useCallback(async (cursor?: string) => {
+    if (cursor) {
+      setIsLoadingMore(true)
+    }
     try {
       const apiUrl = await getApiUrl()
-      const params = new URLSearchParams()
+      const params = new URLSearchParams({ limit: String(PAGE_SIZE) })
       
       if (categoryFilter !== 'all') {
         params.append('category', categoryFilter)
       }
       
-      if (indexedFilter === 'indexed') {
-        params.append('indexed_only', 'true')
+      if (indexedFilter !== 'all') {
+        params.append('indexed', indexedFilter === 'indexed' ? 'true' : 'false')
+      }
+      
+      if (debouncedSearch) {
+        params.append('q', debouncedSearch)
+      }
+      
+      if (cursor) {
+        params.append('cursor', cursor)
       }
       
       const response = await fetch(`${apiUrl}/api/v1/documents?${params}`)
@@ -98,14 +134,44 @@ export default function DocumentManagePage() {
       }
       
       const data: DocumentListResponse = await response.json()
-      setDocuments(data.documents)
+      setDocuments(previous => cursor ? [...previous, ...data.documents] : data.documents)
+      setTotal(data.total)
+      setNextCursor(data.next_cursor)
     } catch (error) {
       console.error('Failed to fetch documents:', error)
       toast.error('Failed to load documents')
     } finally {
       setIsLoading(false)
+      setIsLoadingMore(false)
     }
-  }, [categoryFilter, indexedFilter])
+  }, [categoryFilter, indexedFilter, debouncedSearch])
+
+  // Follow documents that are still being indexed in the background
+  useEffect(() => {
+    const pending = documents.filter(doc => doc.ingest_status && doc.ingest_status in INGEST_LABELS)
+    if (pending.length === 0) {
+      return
+    }
+    const timer = setTimeout(async () => {
+      try {
+        const apiUrl = await getApiUrl()
+        const updated = await Promise.all(pending.map(async doc => {
+          const response = await fetch(`${apiUrl}/api/v1/documents/${doc.id}`)
+          if (response.status === 404) {
+            return { id: doc.id, document: null }
+          }
+          return { id: doc.id, document: response.ok ? (await response.json()).document as DocumentMetadata : doc }
+        }))
+        const byId = new Map(updated.map(({ id, document }) => [id, document]))
+        setDocuments(previous => previous
+          .map(doc => byId.has(doc.id) ? byId.get(doc.id) ?? null : doc)
+          .filter((doc): doc is DocumentMetadata => doc !== null))
+      } catch (error) {
+        console.error('Failed to refresh ingest status:', error)
+      }
+    }, INGEST_POLL_MS)
+    return () => clearTimeout(timer)
+  }, [documents])
 
   // Upload documents
   const handleUpload = async () => {
@@ -212,19 +278,7 @@ export default function DocumentManagePage() {
     })
   }
 
-  // Filter documents
-  const filteredDocuments = documents.filter(doc => {
-    const matchesSearch = doc.original_filename.toLowerCase().includes(searchTerm.toLowerCase()) ||
-                         doc.category.toLowerCase().includes(searchTerm.toLowerCase())
-    
-    const matchesCategory = categoryFilter === 'all' || doc.category === categoryFilter
-    
-    const matchesIndexed = indexedFilter === 'all' || 
-                          (indexedFilter === 'indexed' && doc.indexed) ||
-                          (indexedFilter === 'not-indexed' && !doc.indexed)
-    
-    return matchesSearch && matchesCategory && matchesIndexed
-  })
+  const hasFilters = debouncedSearch !== '' || categoryFilter !== 'all' || indexedFilter !== 'all'
 
   useEffect(() => {
     fetchDocuments()
@@ -251,7 +305,7 @@ export default function DocumentManagePage() {
                 Upload, organize, and manage documents for policy search indexing
               </p>
             </div>
-            <Button onClick={fetchDocuments} variant="outline" size="sm">
+            <Button onClick={() => fetchDocuments()} variant="outline" size="sm">
               <RefreshCw className="h-4 w-4 mr-2" />
               Refresh
             </Button>
@@ -320,7 +374,7 @@ export default function DocumentManagePage() {
             <CardHeader>
               <CardTitle className="flex items-center gap-2">
                 <FileText className="h-5 w-5" />
-                Document Library ({filteredDocuments.length})
+                Document Library ({total})
               </CardTitle>
             </CardHeader>
             <CardContent>
@@ -329,7 +383,7 @@ export default function DocumentManagePage() {
                   <div className="relative">
                     <Search className="absolute left-3 top-1/2 transform -translate-y-1/2 text-muted-foreground h-4 w-4" />
                     <Input
-                      placeholder="Search documents..."
+                      placeholder="Search by file name..."
                       value={searchTerm}
                       onChange={(e) => setSearchTerm(e.target.value)}
                       className="pl-10"
@@ -367,20 +421,20 @@ export default function DocumentManagePage() {
                   <RefreshCw className="h-8 w-8 animate-spin mx-auto mb-4 text-muted-foreground" />
                   <p className="text-muted-foreground">Loading documents...</p>
                 </div>
-              ) : filteredDocuments.length === 0 ? (
+              ) : documents.length === 0 ? (
                 <div className="text-center py-8">
                   <FileText className="h-12 w-12 mx-auto mb-4 text-muted-foreground" />
                   <h3 className="text-lg font-medium mb-2">No documents found</h3>
                   <p className="text-muted-foreground">
-                    {documents.length === 0 
-                      ? "Upload some documents to get started"
-                      : "Try adjusting your search or filters"
+                    {hasFilters
+                      ? "Try adjusting your search or filters"
+                      : "Upload some documents to get started"
                     }
                   </p>
                 </div>
               ) : (
                 <div className="space-y-3">
-                  {filteredDocuments.map((doc) => (
+                  {documents.map((doc) => (
                     <div
                       key={doc.id}
                       className="flex items-center justify-between p-4 border rounded-lg hover:bg-muted/50 transition-colors"
@@ -394,11 +448,21 @@ export default function DocumentManagePage() {
                             <Badge variant="secondary" className="text-xs">
                               {doc.category}
                             </Badge>
-                            {doc.indexed ? (
+                            {doc.ingest_status && doc.ingest_status in INGEST_LABELS ? (
+                              <Badge variant="outline" className="text-xs">
+                                <Loader2 className="h-3 w-3 mr-1 animate-spin" />
+                                {INGEST_LABELS[doc.ingest_status]}
+                              </Badge>
+                            ) : doc.indexed ? (
                               <Badge variant="default" className="text-xs">
                                 <CheckCircle className="h-3 w-3 mr-1" />
                                 Indexed
                               </Badge>
+                            ) : doc.ingest_status === 'failed' ? (
+                              <Badge variant="destructive" className="text-xs">
+                                <AlertCircle className="h-3 w-3 mr-1" />
+                                Indexing Failed
+                              </Badge>
                             ) : (
                               <Badge variant="outline" className="text-xs">
                                 <Clock className="h-3 w-3 mr-1" />
@@ -451,6 +515,21 @@ export default function DocumentManagePage() {
                       </div>
                     </div>
                   ))}
+                  
+                  {nextCursor && (
+                    <div className="flex justify-center pt-3">
+                      <Button
+                        variant="outline"
+                        onClick={() => fetchDocuments(nextCursor)}
+                        disabled={isLoadingMore}
+                      >
+                        {isLoadingMore ? (
+                          <RefreshCw className="h-4 w-4 mr-2 animate-spin" />
+                        ) : null}
+                        Load more ({documents.length} of {total})
+                      </Button>
+                    </div>
+                  )}
                 </div>
               )}
             </CardContent>